@@ -0,0 +1,139 @@
+"""Efeito do arquivamento nas leituras e duração das transações de arquivamento.
+
+Gera um banco sintético, marca uma fração dos pedidos como 'Arquivado' há
+mais de um ano (como num sistema em uso há anos), mede listagem, busca e
+estatísticas pelo test client, arquiva em lotes enquanto uma thread comenta
+sem parar, e mede tudo de novo.
+
+    python benchmarks/arquivamento.py --pedidos 50000 --fracao-arquivada 0.8 --lote 500
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+CONSULTAS = {
+    'listar': '/api/pedidos?limit=20',
+    'listar_status': '/api/pedidos?limit=20&status=Pendente',
+    'buscar': '/api/pedidos/buscar?q=oracao&limit=20',
+    'buscar_pagina_5': '/api/pedidos/buscar?q=oracao&limit=20&cursor={deslocamento}',
+    'estatisticas': '/api/pedidos/estatisticas',
+}
+
+
+def _envelhecer(caminho, fracao, semente):
+    """Marca `fracao` dos pedidos como 'Arquivado' com última alteração em 2020"""
+    import sqlite3
+    aleatorio = random.Random(semente)
+    with sqlite3.connect(caminho) as conexao:
+        ids = [linha[0] for linha in conexao.execute('SELECT id FROM pedido')]
+        escolhidos = aleatorio.sample(ids, int(len(ids) * fracao))
+        conexao.executemany(
+            "UPDATE pedido SET status = 'Arquivado', data_ultima_atualizacao = ? WHERE id = ?",
+            [(datetime(2020, 1, 1) + timedelta(minutes=i), i) for i in escolhidos]
+        )
+    return len(escolhidos)
+
+
+def _medir_leituras(cliente, cabecalhos, repeticoes):
+    from benchmarks.carga import _percentil
+    from src.utils.paginacao import codificar_cursor
+
+    resultado = {}
+    for nome, caminho in CONSULTAS.items():
+        caminho = caminho.format(deslocamento=codificar_cursor(80))
+        tempos = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            resposta = cliente.get(caminho, headers=cabecalhos)
+            tempos.append((time.perf_counter() - inicio) * 1000)
+            assert resposta.status_code == 200, resposta.get_data(as_text=True)
+        tempos.sort()
+        resultado[nome] = {'p50_ms': round(_percentil(tempos, 50), 2), 'p99_ms': round(_percentil(tempos, 99), 2)}
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pedidos', type=int, default=20000)
+    parser.add_argument('--usuarios', type=int, default=100)
+    parser.add_argument('--fracao-arquivada', type=float, default=0.8)
+    parser.add_argument('--lote', type=int, default=200, help='Pedidos por transação de arquivamento')
+    parser.add_argument('--repeticoes', type=int, default=100)
+    parser.add_argument('--semente', type=int, default=42)
+    args = parser.parse_args()
+
+    os.environ['CACHE_RESPOSTAS'] = 'desligado'
+    from benchmarks.carga import _percentil, _token
+    from benchmarks.dados_sinteticos import preparar_banco
+    from src.main import create_app
+    from src.models.arquivo import arquivar_pedidos
+    from src.models.user import db
+
+    caminho = os.path.join(tempfile.mkdtemp(prefix='pedidos-arquivo-'), 'app.db')
+    resumo = preparar_banco(caminho, args.usuarios, args.pedidos, args.semente)
+    resumo['envelhecidos'] = _envelhecer(caminho, args.fracao_arquivada, args.semente)
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{caminho}'})
+    cliente = app.test_client()
+    # Um usuário comum: a listagem dele usa os dois ramos de visibilidade
+    cabecalhos = {'Authorization': f'Bearer {_token(2)}'}
+    resultado = {'parametros': vars(args), 'dados': resumo}
+    resultado['antes'] = _medir_leituras(cliente, cabecalhos, args.repeticoes)
+
+    # Comentários contínuos durante o arquivamento: a latência de escrita mostra
+    # quanto tempo cada transação de arquivamento segura o lock
+    parar = threading.Event()
+    escritas = []
+
+    def comentar():
+        admin = {'Authorization': f'Bearer {_token(1)}'}
+        while not parar.is_set():
+            inicio = time.perf_counter()
+            cliente.post('/api/pedidos/1/comentarios', headers=admin, json={'conteudo': 'Amém!'})
+            escritas.append((time.perf_counter() - inicio) * 1000)
+
+    duracoes = []
+    marcador = [time.perf_counter()]
+
+    def ao_mover(ids):
+        agora = time.perf_counter()
+        duracoes.append((agora - marcador[0]) * 1000)
+        marcador[0] = agora
+
+    escritor = threading.Thread(target=comentar)
+    escritor.start()
+    inicio = time.perf_counter()
+    with app.app_context():
+        marcador[0] = time.perf_counter()
+        movidos = arquivar_pedidos(db.engine, datetime.utcnow(), args.lote, pausa=0, ao_mover=ao_mover)
+    total = time.perf_counter() - inicio
+    parar.set()
+    escritor.join()
+
+    duracoes.sort()
+    escritas.sort()
+    resultado['arquivamento'] = {
+        'movidos': movidos,
+        'segundos': round(total, 2),
+        'lotes': len(duracoes),
+        'lote_p50_ms': round(_percentil(duracoes, 50), 2),
+        'lote_max_ms': round(duracoes[-1], 2) if duracoes else None,
+        'comentarios_durante': len(escritas),
+        'comentario_p99_ms': round(_percentil(escritas, 99), 2) if escritas else None,
+        'comentario_max_ms': round(escritas[-1], 2) if escritas else None,
+    }
+    resultado['depois'] = _medir_leituras(cliente, cabecalhos, args.repeticoes)
+    print(json.dumps(resultado, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,294 @@
+"""Teste de carga reprodutível dos endpoints de pedidos e autenticação.
+
+Gera um banco sintético (benchmarks/dados_sinteticos.py), ou usa um já
+gerado, e dispara as cargas abaixo pelo test client do Flask e/ou por um
+gunicorn local. Para cada carga reporta p50/p95/p99, vazão e, no test
+client, consultas SQL por requisição. A saída JSON pode ser comparada
+entre versões.
+
+    python benchmarks/carga.py --pedidos 20000 --requisicoes 500 --saida antes.json
+    python benchmarks/carga.py --modo gunicorn --workers 4 --threads 4 --concorrencia 16
+
+Cargas: listar, buscar, detalhe, estatisticas, comentarios, comentar, login.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from urllib.parse import urlencode
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from benchmarks.dados_sinteticos import SENHA_PADRAO, STATUS, TEMAS, preparar_banco  # noqa: E402
+
+CARGAS = ['listar', 'buscar', 'detalhe', 'estatisticas', 'comentarios', 'comentar', 'login']
+
+
+def _requisicao(carga, aleatorio, resumo):
+    """(método, caminho, corpo JSON) de uma requisição da carga"""
+    pedido_id = aleatorio.randint(1, resumo['pedidos'])
+    if carga == 'listar':
+        if aleatorio.random() < 0.5:
+            return 'GET', '/api/pedidos?limit=20', None
+        return 'GET', '/api/pedidos?' + urlencode({'limit': 20, 'status': aleatorio.choice(STATUS)}), None
+    if carga == 'buscar':
+        return 'GET', '/api/pedidos/buscar?' + urlencode({'q': aleatorio.choice(TEMAS), 'limit': 20}), None
+    if carga == 'detalhe':
+        return 'GET', f'/api/pedidos/{pedido_id}', None
+    if carga == 'estatisticas':
+        return 'GET', '/api/pedidos/estatisticas', None
+    if carga == 'comentarios':
+        return 'GET', f'/api/pedidos/{pedido_id}/comentarios?limit=20', None
+    if carga == 'comentar':
+        return 'POST', f'/api/pedidos/{pedido_id}/comentarios', {'conteudo': 'Orando. Amém!'}
+    if carga == 'login':
+        indice = aleatorio.randint(1, resumo['usuarios'] - 1)
+        return 'POST', '/api/auth/login', {'username': f'usuario{indice:05d}', 'password': SENHA_PADRAO}
+    raise ValueError(f'Carga desconhecida: {carga}')
+
+
+def _percentil(ordenados, p):
+    """Percentil por posição mais próxima"""
+    if not ordenados:
+        return None
+    indice = max(0, min(len(ordenados) - 1, int(round(p / 100 * len(ordenados))) - 1))
+    return ordenados[indice]
+
+
+def _resumir(amostras, duracao):
+    tempos = sorted(tempo for tempo, _, _ in amostras)
+    status = Counter(codigo for _, codigo, _ in amostras)
+    consultas = [total for _, _, total in amostras if total is not None]
+    return {
+        'requisicoes': len(amostras),
+        'erros': sum(n for codigo, n in status.items() if codigo >= 400),
+        'status': {str(codigo): n for codigo, n in sorted(status.items())},
+        'p50_ms': round(_percentil(tempos, 50), 3),
+        'p95_ms': round(_percentil(tempos, 95), 3),
+        'p99_ms': round(_percentil(tempos, 99), 3),
+        'media_ms': round(sum(tempos) / len(tempos), 3),
+        'req_por_s': round(len(amostras) / duracao, 1),
+        'consultas_por_requisicao': round(sum(consultas) / len(consultas), 2) if consultas else None,
+    }
+
+
+def _executar(carga, requisicoes, concorrencia, semente, resumo, enviar):
+    """Distribui as requisições entre `concorrencia` threads e mede cada uma"""
+    amostras = []
+    lock = threading.Lock()
+
+    def trabalhador(indice, quantidade):
+        aleatorio = random.Random(f'{semente}-{carga}-{indice}')
+        locais = []
+        for _ in range(quantidade):
+            metodo, caminho, corpo = _requisicao(carga, aleatorio, resumo)
+            inicio = time.perf_counter()
+            codigo, consultas = enviar(metodo, caminho, corpo, indice)
+            locais.append(((time.perf_counter() - inicio) * 1000, codigo, consultas))
+        with lock:
+            amostras.extend(locais)
+
+    cotas = [requisicoes // concorrencia + (1 if i < requisicoes % concorrencia else 0)
+             for i in range(concorrencia)]
+    threads = [threading.Thread(target=trabalhador, args=(i, cota)) for i, cota in enumerate(cotas)]
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return _resumir(amostras, time.perf_counter() - inicio)
+
+
+def _token(user_id):
+    import jwt
+    from src.routes.auth import JWT_SECRET
+    return jwt.encode(
+        {'user_id': user_id, 'exp': datetime.utcnow() + timedelta(hours=1)},
+        JWT_SECRET, algorithm='HS256'
+    )
+
+
+def medir_cliente(caminho_banco, cargas, requisicoes, concorrencia, semente, resumo):
+    """Cargas pelo test client, no mesmo processo, com contagem de consultas"""
+    from sqlalchemy import event
+    from src.main import create_app
+    from src.models.user import db
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{caminho_banco}'})
+    cabecalhos = {'Authorization': f'Bearer {_token(1)}'}
+    # O test client atende na thread de quem chama: um contador por thread
+    # separa as consultas de requisições concorrentes
+    local = threading.local()
+
+    def contar(*args):
+        local.consultas = getattr(local, 'consultas', 0) + 1
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', contar)
+    cliente = app.test_client()
+
+    def enviar(metodo, caminho, corpo, indice):
+        local.consultas = 0
+        resposta = cliente.open(
+            caminho, method=metodo, json=corpo, headers=cabecalhos,
+            environ_base={'REMOTE_ADDR': f'10.0.0.{indice % 250 + 1}'}
+        )
+        resposta.close()
+        return resposta.status_code, local.consultas
+
+    try:
+        return {carga: _executar(carga, requisicoes, concorrencia, semente, resumo, enviar)
+                for carga in cargas}
+    finally:
+        with app.app_context():
+            event.remove(db.engine, 'before_cursor_execute', contar)
+
+
+def _porta_livre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _aguardar_porta(porta, processo, limite=30):
+    fim = time.monotonic() + limite
+    while time.monotonic() < fim:
+        if processo.poll() is not None:
+            raise RuntimeError('gunicorn terminou durante a inicialização')
+        try:
+            socket.create_connection(('127.0.0.1', porta), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError('gunicorn não respondeu a tempo')
+
+
+def medir_gunicorn(caminho_banco, cargas, requisicoes, concorrencia, semente, resumo,
+                   workers, threads):
+    """Cargas via HTTP contra um gunicorn local (sem contagem de consultas)"""
+    porta = _porta_livre()
+    ambiente = dict(os.environ,
+                    SQLALCHEMY_DATABASE_URI=f'sqlite:///{caminho_banco}',
+                    GUNICORN_THREADS=str(threads))
+    processo = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-w', str(workers), '--threads', str(threads),
+         '-b', f'127.0.0.1:{porta}', '--log-level', 'warning', 'src.main:app'],
+        cwd=RAIZ, env=ambiente
+    )
+    try:
+        _aguardar_porta(porta, processo)
+        cabecalhos = {'Authorization': f'Bearer {_token(1)}', 'Content-Type': 'application/json'}
+        conexoes = threading.local()
+
+        def enviar(metodo, caminho, corpo, indice):
+            # Uma conexão keep-alive por thread
+            if getattr(conexoes, 'conexao', None) is None:
+                conexoes.conexao = http.client.HTTPConnection('127.0.0.1', porta, timeout=60)
+            conexao = conexoes.conexao
+            dados = json.dumps(corpo).encode('utf-8') if corpo is not None else None
+            try:
+                conexao.request(metodo, caminho, body=dados, headers=cabecalhos)
+                resposta = conexao.getresponse()
+                resposta.read()
+            except (http.client.HTTPException, OSError):
+                conexao.close()
+                conexoes.conexao = None
+                return 599, None
+            return resposta.status, None
+
+        return {carga: _executar(carga, requisicoes, concorrencia, semente, resumo, enviar)
+                for carga in cargas}
+    finally:
+        processo.terminate()
+        processo.wait(timeout=30)
+
+
+def _resumo_banco(caminho):
+    """Tamanho de um banco gerado anteriormente"""
+    import sqlite3
+    with sqlite3.connect(caminho) as conexao:
+        return {
+            tabela: conexao.execute(f'SELECT count(*) FROM {nome}').fetchone()[0]
+            for tabela, nome in (('usuarios', '"user"'), ('pedidos', 'pedido'), ('comentarios', 'comentario'))
+        }
+
+
+def _versao():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--banco', help='SQLite já gerado por dados_sinteticos.py (senão, um temporário)')
+    parser.add_argument('--usuarios', type=int, default=100)
+    parser.add_argument('--pedidos', type=int, default=10000)
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--modo', choices=['cliente', 'gunicorn', 'ambos'], default='cliente')
+    parser.add_argument('--cargas', default=','.join(CARGAS))
+    parser.add_argument('--requisicoes', type=int, default=300, help='Requisições por carga')
+    parser.add_argument('--concorrencia', type=int, default=4)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--saida', help='Arquivo JSON de resultado (padrão: stdout)')
+    args = parser.parse_args()
+
+    cargas = [c.strip() for c in args.cargas.split(',') if c.strip()]
+    desconhecidas = set(cargas) - set(CARGAS)
+    if desconhecidas:
+        parser.error(f"cargas desconhecidas: {', '.join(sorted(desconhecidas))}")
+
+    # Login passa a medir o hash de senha, não o limitador de tentativas
+    os.environ.setdefault('AUTH_RAJADA', '1000000')
+    os.environ.setdefault('AUTH_POR_SEGUNDO', '1000000')
+
+    if args.banco:
+        caminho = os.path.abspath(args.banco)
+        resumo = _resumo_banco(caminho)
+    else:
+        caminho = os.path.join(tempfile.mkdtemp(prefix='pedidos-carga-'), 'carga.db')
+        resumo = preparar_banco(caminho, args.usuarios, args.pedidos, args.semente)
+
+    resultado = {
+        'versao': _versao(),
+        'data': datetime.utcnow().isoformat(timespec='seconds'),
+        'parametros': {
+            'requisicoes': args.requisicoes, 'concorrencia': args.concorrencia,
+            'workers': args.workers, 'threads': args.threads,
+        },
+        'dados': resumo,
+        'modos': {},
+    }
+    if args.modo in ('cliente', 'ambos'):
+        resultado['modos']['cliente'] = medir_cliente(
+            caminho, cargas, args.requisicoes, args.concorrencia, args.semente, resumo
+        )
+    if args.modo in ('gunicorn', 'ambos'):
+        resultado['modos']['gunicorn'] = medir_gunicorn(
+            caminho, cargas, args.requisicoes, args.concorrencia, args.semente, resumo,
+            args.workers, args.threads
+        )
+
+    saida = json.dumps(resultado, ensure_ascii=False, indent=2)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(saida + '\n')
+    else:
+        print(saida)
+
+
+if __name__ == '__main__':
+    main()
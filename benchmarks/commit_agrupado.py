@@ -0,0 +1,104 @@
+"""Vazão de comentários: commit por requisição x commit agrupado.
+
+Carrega um banco sintético pequeno e dispara comentários concorrentes em
+poucos pedidos "quentes" (como durante uma transmissão ao vivo) pelo test
+client, uma vez com o commit por requisição e outra com COMMIT_AGRUPADO.
+
+    python benchmarks/commit_agrupado.py --threads 32 --comentarios 100 --synchronous FULL
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+
+def _medir(app, threads, comentarios, pedidos_quentes):
+    from benchmarks.carga import _percentil, _token
+
+    cabecalhos = {'Authorization': f'Bearer {_token(1)}'}
+    cliente = app.test_client()
+    tempos = []
+    erros = []
+    lock = threading.Lock()
+
+    def trabalhador(indice):
+        locais = []
+        for n in range(comentarios):
+            pedido_id = (indice + n) % pedidos_quentes + 1
+            inicio = time.perf_counter()
+            resposta = cliente.post(
+                f'/api/pedidos/{pedido_id}/comentarios', headers=cabecalhos, json={'conteudo': 'Amém!'}
+            )
+            locais.append((time.perf_counter() - inicio) * 1000)
+            if resposta.status_code != 201:
+                with lock:
+                    erros.append(resposta.get_data(as_text=True))
+        with lock:
+            tempos.extend(locais)
+
+    grupo = [threading.Thread(target=trabalhador, args=(i,)) for i in range(threads)]
+    inicio = time.perf_counter()
+    for thread in grupo:
+        thread.start()
+    for thread in grupo:
+        thread.join()
+    duracao = time.perf_counter() - inicio
+
+    tempos.sort()
+    resultado = {
+        'comentarios': len(tempos),
+        'erros': len(erros),
+        'comentarios_por_s': round(len(tempos) / duracao, 1),
+        'p50_ms': round(_percentil(tempos, 50), 2),
+        'p99_ms': round(_percentil(tempos, 99), 2),
+    }
+    gravador = app.extensions.get('commit_agrupado')
+    if gravador is not None:
+        resultado['gravador'] = gravador.estatisticas()
+    if erros:
+        resultado['primeiro_erro'] = erros[0][:200]
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--comentarios', type=int, default=100, help='Comentários por thread')
+    parser.add_argument('--pedidos-quentes', type=int, default=5)
+    parser.add_argument('--intervalo-ms', type=float, default=5)
+    parser.add_argument('--synchronous', default='NORMAL', help='PRAGMA synchronous do banco (NORMAL, FULL)')
+    args = parser.parse_args()
+
+    # Lido por src.config na importação: precisa vir antes de qualquer import do app
+    os.environ['SQLITE_SYNCHRONOUS'] = args.synchronous
+    os.environ.setdefault('GUNICORN_THREADS', str(args.threads))
+    os.environ['CACHE_RESPOSTAS'] = 'desligado'
+
+    from benchmarks.dados_sinteticos import preparar_banco
+    from src.main import create_app
+
+    resultado = {'parametros': vars(args)}
+    for modo, agrupado in (('por_requisicao', False), ('agrupado', True)):
+        # Banco novo por modo, para que os dois partam do mesmo estado
+        caminho = os.path.join(tempfile.mkdtemp(prefix='pedidos-commit-'), 'app.db')
+        preparar_banco(caminho, usuarios=20, pedidos=200)
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f'sqlite:///{caminho}',
+            'COMMIT_AGRUPADO': agrupado,
+            'COMMIT_AGRUPADO_INTERVALO_MS': args.intervalo_ms,
+        })
+        resultado[modo] = _medir(app, args.threads, args.comentarios, args.pedidos_quentes)
+
+    print(json.dumps(resultado, ensure_ascii=False, indent=2))
+    if any(resultado[modo]['erros'] for modo in ('por_requisicao', 'agrupado')):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""Escritores e leitores concorrentes contra um SQLite temporário.
+
+Sobe N processos (como workers do gunicorn), cada um com T threads, que
+alternam POST /api/pedidos e GET /api/pedidos pelo test client do Flask.
+Termina com código 1 se alguma requisição falhar, em especial com
+"database is locked". A verificação automática (sem medir tempos) fica em
+tests/test_concorrencia_sqlite.py.
+
+    python benchmarks/concorrencia_sqlite.py --processos 4 --threads 4 --operacoes 50
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+
+def _cabecalho(app):
+    import jwt
+    from src.routes.auth import JWT_SECRET
+    token = jwt.encode(
+        {'user_id': 1, 'exp': datetime.utcnow() + timedelta(hours=1)},
+        JWT_SECRET, algorithm='HS256'
+    )
+    return {'Authorization': f'Bearer {token}'}
+
+
+def _worker(threads, operacoes, fila):
+    from src.main import app
+
+    client_headers = _cabecalho(app)
+    erros = []
+    tempos = []
+    lock = threading.Lock()
+
+    def executar(indice):
+        client = app.test_client()
+        for i in range(operacoes):
+            inicio = time.perf_counter()
+            if (indice + i) % 2 == 0:
+                resposta = client.post('/api/pedidos', headers=client_headers, json={
+                    'titulo': f'Pedido {os.getpid()}-{indice}-{i}',
+                    'descricao': 'Teste de concorrência',
+                    'nome_solicitante': 'Benchmark'
+                })
+            else:
+                resposta = client.get('/api/pedidos?limit=20', headers=client_headers)
+            with lock:
+                tempos.append(time.perf_counter() - inicio)
+                if resposta.status_code >= 400:
+                    dados = resposta.get_json(silent=True) or {}
+                    erros.append(dados.get('error', resposta.status_code))
+
+    trabalhadores = [threading.Thread(target=executar, args=(n,)) for n in range(threads)]
+    for t in trabalhadores:
+        t.start()
+    for t in trabalhadores:
+        t.join()
+    fila.put((erros, tempos))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--processos', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--operacoes', type=int, default=50)
+    args = parser.parse_args()
+
+    diretorio = tempfile.mkdtemp(prefix='pedidos-concorrencia-')
+    os.environ['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(diretorio, 'app.db')}"
+    os.environ.setdefault('GUNICORN_THREADS', str(args.threads))
+
+    # Cria o schema e o admin uma única vez antes de subir os processos
+    from src.comandos import inicializar_banco, popular_dados_exemplo
+    from src.main import app
+    with app.app_context():
+        inicializar_banco()
+        popular_dados_exemplo()
+
+    contexto = multiprocessing.get_context('spawn')
+    fila = contexto.Queue()
+    processos = [
+        contexto.Process(target=_worker, args=(args.threads, args.operacoes, fila))
+        for _ in range(args.processos)
+    ]
+    inicio = time.perf_counter()
+    for p in processos:
+        p.start()
+    resultados = [fila.get() for _ in processos]
+    for p in processos:
+        p.join()
+    duracao = time.perf_counter() - inicio
+
+    erros = [e for lote, _ in resultados for e in lote]
+    tempos = sorted(t for _, lote in resultados for t in lote)
+    total = len(tempos)
+    print(f'{total} requisições em {duracao:.2f}s ({total / duracao:.0f} req/s)')
+    print(f'p50 {tempos[total // 2] * 1000:.1f} ms, p99 {tempos[int(total * 0.99) - 1] * 1000:.1f} ms')
+    print(f'{len(erros)} erros, {sum("locked" in str(e) for e in erros)} com "database is locked"')
+    for erro in erros[:10]:
+        print(f'  {erro}')
+    return 1 if erros else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""Gerador de dados sintéticos para os benchmarks.
+
+Carrega em lote, num SQLite preparado por `init-db`, N usuários e pedidos
+com status e visibilidades misturados. Os comentários seguem uma cauda
+longa (Pareto): a maioria dos pedidos tem poucos ou nenhum e alguns têm
+centenas. Com a mesma semente, o banco gerado é sempre o mesmo.
+
+    python benchmarks/dados_sinteticos.py --banco /tmp/carga.db --usuarios 200 --pedidos 20000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+SENHA_PADRAO = 'senha123'
+LOTE = 1000
+
+STATUS = ['Pendente', 'Em Oração', 'Respondido', 'Arquivado']
+PESOS_STATUS = [25, 40, 20, 15]
+VISIBILIDADES = ['Todos', 'Administradores', 'Criador']
+PESOS_VISIBILIDADE = [80, 12, 8]
+
+TEMAS = ['Saúde', 'Família', 'Emprego', 'Estudos', 'Casamento', 'Viagem',
+         'Finanças', 'Libertação', 'Gratidão', 'Missões']
+FRASES = [
+    'Peço oração pela recuperação da minha mãe, que está internada.',
+    'Estou desempregado há três meses e preciso de uma porta aberta.',
+    'Que Deus conceda paz e sabedoria para a nossa família.',
+    'Agradeço pelas orações, a cirurgia correu bem.',
+    'Oração pela aprovação no vestibular e pelos estudos do meu filho.',
+    'Pela restauração do meu casamento e reconciliação com meu irmão.',
+    'Proteção na viagem missionária para o interior do estado.',
+]
+COMENTARIOS = ['Estamos orando. Amém!', 'Deus é fiel!', 'Orando por vocês.',
+               'Glória a Deus pela resposta!', 'Conte com nossas orações.']
+NOMES = ['Maria Silva', 'Carlos Santos', 'Ana Souza', 'João Pereira',
+         'Francisca Lima', 'José Oliveira', 'Antônia Costa', 'Paulo Rodrigues']
+
+MAXIMO_COMENTARIOS = 300
+
+
+def _quantidade_comentarios(aleatorio):
+    """Cauda longa: mediana 0-1 comentário, alguns pedidos com centenas"""
+    return min(int(aleatorio.paretovariate(1.3)) - 1, MAXIMO_COMENTARIOS)
+
+
+def _inserir_em_lotes(modelo, linhas):
+    from sqlalchemy import insert
+    from src.models.user import db
+
+    for inicio in range(0, len(linhas), LOTE):
+        db.session.execute(insert(modelo), linhas[inicio:inicio + LOTE])
+    db.session.commit()
+
+
+def gerar_dados(usuarios=100, pedidos=10000, semente=42):
+    """Popula o banco da app atual (requer app context) e retorna um resumo"""
+    from werkzeug.security import generate_password_hash
+    from src.models.pedido import Comentario, Pedido
+    from src.models.user import User
+
+    aleatorio = random.Random(semente)
+    base = datetime(2024, 1, 1)
+    # Um único hash para todos: gerar milhares de hashes scrypt levaria minutos
+    hash_senha = generate_password_hash(SENHA_PADRAO)
+
+    _inserir_em_lotes(User, [
+        {
+            'username': 'admin' if i == 0 else f'usuario{i:05d}',
+            'email': 'admin@sistema.com' if i == 0 else f'usuario{i:05d}@email.com',
+            'password_hash': hash_senha,
+            'nome_completo': aleatorio.choice(NOMES),
+            'is_admin': i == 0 or i % 50 == 0,
+            'data_criacao': base,
+        }
+        for i in range(usuarios)
+    ])
+    ids_usuarios = list(range(1, usuarios + 1))
+
+    linhas_pedidos = []
+    datas_pedidos = []
+    for i in range(pedidos):
+        submissao = base + timedelta(minutes=aleatorio.randint(0, 365 * 24 * 60))
+        atualizacao = submissao + timedelta(minutes=aleatorio.randint(0, 30 * 24 * 60))
+        tema = aleatorio.choice(TEMAS)
+        linhas_pedidos.append({
+            'titulo': f'{tema} - pedido {i + 1}',
+            'descricao': ' '.join(aleatorio.sample(FRASES, aleatorio.randint(1, 3))),
+            'nome_solicitante': aleatorio.choice(NOMES),
+            'celular_solicitante': f'(11) 9{aleatorio.randint(1000, 9999)}-{aleatorio.randint(1000, 9999)}',
+            'email_solicitante': f'solicitante{i}@email.com',
+            'status': aleatorio.choices(STATUS, PESOS_STATUS)[0],
+            'data_submissao': submissao,
+            'data_ultima_atualizacao': atualizacao,
+            'visibilidade': aleatorio.choices(VISIBILIDADES, PESOS_VISIBILIDADE)[0],
+            'usuario_criador_id': aleatorio.choice(ids_usuarios),
+        })
+        datas_pedidos.append(submissao)
+    _inserir_em_lotes(Pedido, linhas_pedidos)
+
+    linhas_comentarios = []
+    for pedido_id, submissao in enumerate(datas_pedidos, start=1):
+        for _ in range(_quantidade_comentarios(aleatorio)):
+            linhas_comentarios.append({
+                'pedido_id': pedido_id,
+                'autor': aleatorio.choice(NOMES),
+                'conteudo': aleatorio.choice(COMENTARIOS),
+                'data_comentario': submissao + timedelta(minutes=aleatorio.randint(1, 60 * 24 * 60)),
+                'usuario_id': aleatorio.choice(ids_usuarios),
+            })
+    # Ordem cronológica, como chegariam em produção
+    linhas_comentarios.sort(key=lambda linha: linha['data_comentario'])
+    _inserir_em_lotes(Comentario, linhas_comentarios)
+
+    return {
+        'usuarios': usuarios,
+        'pedidos': pedidos,
+        'comentarios': len(linhas_comentarios),
+        'semente': semente,
+    }
+
+
+def preparar_banco(caminho, usuarios=100, pedidos=10000, semente=42):
+    """Cria um SQLite novo em `caminho`, aplica init-db e carrega os dados"""
+    if os.path.exists(caminho):
+        os.remove(caminho)
+    os.environ['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{caminho}'
+
+    from src.comandos import inicializar_banco
+    from src.main import create_app
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{caminho}'})
+    with app.app_context():
+        inicializar_banco()
+        return gerar_dados(usuarios, pedidos, semente)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--banco', required=True, help='Arquivo SQLite a criar (sobrescrito)')
+    parser.add_argument('--usuarios', type=int, default=100)
+    parser.add_argument('--pedidos', type=int, default=10000)
+    parser.add_argument('--semente', type=int, default=42)
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    resumo = preparar_banco(os.path.abspath(args.banco), args.usuarios, args.pedidos, args.semente)
+    resumo['segundos'] = round(time.perf_counter() - inicio, 2)
+    print(json.dumps(resumo, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Tempo de subida de um worker: import a frio e primeira requisição.
+
+Cada rodada é um processo Python novo (como um worker recém-criado do
+gunicorn) contra um SQLite temporário já preparado por `init-db`. Mede o
+tempo de `import src.main` e a latência do primeiro GET /api/pedidos.
+
+    python benchmarks/inicializacao.py --rodadas 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+MEDICAO = r'''
+import json, sys, time
+from datetime import datetime, timedelta
+sys.path.insert(0, sys.argv[1])
+inicio = time.perf_counter()
+from src.main import app
+importado = time.perf_counter()
+import jwt
+from src.routes.auth import JWT_SECRET
+token = jwt.encode({'user_id': 1, 'exp': datetime.utcnow() + timedelta(hours=1)},
+                   JWT_SECRET, algorithm='HS256')
+cliente = app.test_client()
+antes = time.perf_counter()
+resposta = cliente.get('/api/pedidos', headers={'Authorization': f'Bearer {token}'})
+depois = time.perf_counter()
+print(json.dumps({'import_ms': (importado - inicio) * 1000,
+                  'primeira_requisicao_ms': (depois - antes) * 1000,
+                  'status': resposta.status_code}))
+'''
+
+
+def _preparar_banco():
+    from src.comandos import inicializar_banco, popular_dados_exemplo
+    from src.main import app
+    with app.app_context():
+        inicializar_banco()
+        popular_dados_exemplo()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rodadas', type=int, default=5)
+    args = parser.parse_args()
+
+    diretorio = tempfile.mkdtemp(prefix='pedidos-inicializacao-')
+    os.environ['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(diretorio, 'app.db')}"
+    _preparar_banco()
+
+    medicoes = []
+    for _ in range(args.rodadas):
+        saida = subprocess.run(
+            [sys.executable, '-c', MEDICAO, RAIZ],
+            env=os.environ, capture_output=True, text=True, check=True
+        )
+        medicoes.append(json.loads(saida.stdout.strip().splitlines()[-1]))
+
+    falhas = [m for m in medicoes if m['status'] != 200]
+    for chave in ('import_ms', 'primeira_requisicao_ms'):
+        valores = [m[chave] for m in medicoes]
+        print(f"{chave}: mediana {statistics.median(valores):.1f} "
+              f"min {min(valores):.1f} max {max(valores):.1f}")
+    if falhas:
+        print(f"{len(falhas)} rodadas com resposta diferente de 200")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""Bytes na rede e tempo de serialização de uma lista de 5 mil pedidos.
+
+Compara o caminho antigo (DefaultJSONProvider do Flask, chaves ordenadas,
+ASCII escapado, datas convertidas com .isoformat() em cada to_dict, sem
+compressão) com o atual (ProvedorJSON + gzip da API).
+
+    python benchmarks/serializacao_json.py --pedidos 5000 --repeticoes 5
+"""
+import argparse
+import gzip
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+
+def _pedidos(quantidade):
+    from src.models.pedido import Comentario, Pedido
+    from src.models.user import User
+
+    autor = User(id=1, username='admin', email='admin@sistema.com', password_hash='x')
+    base = datetime(2024, 1, 1)
+    pedidos = []
+    for i in range(quantidade):
+        pedido = Pedido(
+            id=i + 1,
+            titulo=f'Oração pela família {i}',
+            descricao='Peço oração pela saúde da minha mãe, que está internada. '
+                      'Que Deus conceda paz e restauração a toda a família. ' * 3,
+            nome_solicitante='Maria da Conceição',
+            celular_solicitante='(11) 99999-9999',
+            email_solicitante='maria@email.com',
+            status='Em Oração',
+            data_submissao=base + timedelta(minutes=i),
+            data_ultima_atualizacao=base + timedelta(minutes=i, seconds=30),
+            visibilidade='Todos',
+            usuario_criador_id=1,
+            comentarios_count=2,
+            ultimo_comentario_em=base + timedelta(minutes=i, seconds=20),
+        )
+        pedido.usuario_criador = autor
+        pedido.comentarios = [
+            Comentario(id=i * 2 + n, pedido_id=i + 1, autor='Pastor João',
+                       conteudo='Estamos orando. Amém!', usuario_id=1, usuario=autor,
+                       data_comentario=base + timedelta(minutes=i, seconds=10 * n))
+            for n in range(2)
+        ]
+        pedidos.append(pedido)
+    return pedidos
+
+
+def _com_isoformat(valor):
+    """Reproduz o to_dict antigo, que convertia cada data antes do jsonify"""
+    if isinstance(valor, dict):
+        return {chave: _com_isoformat(v) for chave, v in valor.items()}
+    if isinstance(valor, list):
+        return [_com_isoformat(v) for v in valor]
+    return valor.isoformat() if isinstance(valor, datetime) else valor
+
+
+def _medir(funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos), resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pedidos', type=int, default=5000)
+    parser.add_argument('--repeticoes', type=int, default=5)
+    args = parser.parse_args()
+
+    diretorio = tempfile.mkdtemp(prefix='pedidos-json-')
+    os.environ['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(diretorio, 'app.db')}"
+    from flask.json.provider import DefaultJSONProvider
+    from src.main import app
+    from src.serializacao import orjson
+
+    pedidos = _pedidos(args.pedidos)
+    antigo = DefaultJSONProvider(app)
+    antigo.compact = True
+
+    with app.app_context():
+        def caminho_antigo():
+            corpo = {'pedidos': [_com_isoformat(p.to_dict()) for p in pedidos]}
+            return antigo.response(corpo).get_data()
+
+        def caminho_novo():
+            corpo = {'pedidos': [p.to_dict() for p in pedidos]}
+            return gzip.compress(app.json.response(corpo).get_data(), compresslevel=6, mtime=0)
+
+        def so_json_novo():
+            corpo = {'pedidos': [p.to_dict() for p in pedidos]}
+            return app.json.response(corpo).get_data()
+
+        t_antigo, b_antigo = _medir(caminho_antigo, args.repeticoes)
+        t_json, b_json = _medir(so_json_novo, args.repeticoes)
+        t_novo, b_novo = _medir(caminho_novo, args.repeticoes)
+
+    print(f'{args.pedidos} pedidos, mediana de {args.repeticoes} execuções '
+          f'(orjson {"ativo" if orjson else "ausente"})')
+    print(f'{"caminho":<28}{"bytes":>12}{"ms":>10}')
+    print(f'{"antes (jsonify padrão)":<28}{len(b_antigo):>12}{t_antigo * 1000:>10.1f}')
+    print(f'{"ProvedorJSON":<28}{len(b_json):>12}{t_json * 1000:>10.1f}')
+    print(f'{"ProvedorJSON + gzip":<28}{len(b_novo):>12}{t_novo * 1000:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
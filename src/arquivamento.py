@@ -0,0 +1,42 @@
+import time
+from datetime import datetime, timedelta
+
+from src.models.arquivo import arquivar_pedidos
+from src.models.user import db
+from src.utils.threads import ThreadPorProcesso
+
+
+def arquivar_antigos(app, idade_dias, tamanho_lote=200, pausa=0.05):
+    """Arquiva os pedidos 'Arquivado' sem alteração há `idade_dias` (requer app context).
+
+    Cada lote movido invalida as listagens e os pedidos no cache de respostas.
+    Retorna o total de pedidos movidos.
+    """
+    cache = app.extensions['cache_respostas']
+
+    def invalidar(ids):
+        cache.invalidar('pedidos', *(f'pedido:{i}' for i in ids))
+
+    antes_de = datetime.utcnow() - timedelta(days=idade_dias)
+    return arquivar_pedidos(db.engine, antes_de, tamanho_lote, pausa, ao_mover=invalidar)
+
+
+def instalar_arquivamento(app, intervalo, idade_dias, tamanho_lote=200, pausa=0.05):
+    """Arquiva em segundo plano a cada `intervalo` segundos, numa thread por processo.
+
+    A thread é iniciada na primeira requisição de cada worker (após o fork).
+    Com vários workers todos arquivam, mas as transações BEGIN IMMEDIATE se
+    revezam e cada pedido é movido uma só vez.
+    """
+    def arquivar_periodicamente():
+        while True:
+            time.sleep(intervalo)
+            try:
+                with app.app_context():
+                    movidos = arquivar_antigos(app, idade_dias, tamanho_lote, pausa)
+                if movidos:
+                    app.logger.info('Arquivamento: %d pedidos movidos para o arquivo', movidos)
+            except Exception:
+                app.logger.exception('Falha no arquivamento de pedidos')
+
+    app.before_request(ThreadPorProcesso(arquivar_periodicamente).iniciar)
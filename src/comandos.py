@@ -0,0 +1,161 @@
+import click
+from flask import current_app
+from werkzeug.security import generate_password_hash
+from src.arquivamento import arquivar_antigos
+from src.config import ARQUIVAMENTO_IDADE_DIAS, ARQUIVAMENTO_LOTE, ARQUIVAMENTO_PAUSA_MS
+from src.models.user import db, User
+from src.models.pedido import Pedido, Comentario
+from src.models.busca import instalar_indice_busca, reconstruir_indice_busca
+from src.models.estatistica import instalar_contadores, recalcular_contadores
+from src.models.migracoes import VERSAO_ATUAL, atualizar_schema, versao_schema
+from src.models.roteamento import BIND_LEITURA, atualizar_replica
+
+# Preparação do banco fica em comandos explícitos (flask init-db / seed), fora
+# da inicialização dos workers: subir o app não executa nenhuma consulta.
+
+def inicializar_banco():
+    """Cria/atualiza o schema e instala índice de busca e contadores"""
+    aplicadas = atualizar_schema()
+    busca = instalar_indice_busca(db.engine)
+    instalar_contadores(db.engine)
+    return aplicadas, busca
+
+def popular_dados_exemplo():
+    """Cria o administrador padrão e os pedidos de exemplo em um banco vazio"""
+    # Criar usuário administrador padrão se não existir
+    if User.query.count() == 0:
+        admin_user = User(
+            username='admin',
+            email='admin@sistema.com',
+            password_hash=generate_password_hash('admin123'),
+            nome_completo='Administrador do Sistema',
+            is_admin=True
+        )
+        db.session.add(admin_user)
+        db.session.commit()
+        print("Usuário administrador criado: admin / admin123")
+    
+    # Criar dados de exemplo se não existirem
+    if Pedido.query.count() == 0:
+        from datetime import datetime
+        
+        # Buscar o usuário admin para associar aos pedidos
+        admin_user = User.query.filter_by(username='admin').first()
+        
+        pedido1 = Pedido(
+            titulo='Saúde da família',
+            descricao='Pedindo oração pela recuperação da minha mãe que está internada no hospital.',
+            nome_solicitante='Maria Silva',
+            celular_solicitante='(11) 99999-9999',
+            email_solicitante='maria@email.com',
+            status='Em Oração',
+            data_submissao=datetime(2024, 1, 15),
+            data_ultima_atualizacao=datetime(2024, 1, 16),
+            usuario_criador_id=admin_user.id if admin_user else None
+        )
+        
+        pedido2 = Pedido(
+            titulo='Emprego',
+            descricao='Preciso de oração para conseguir um novo emprego. Estou desempregado há 3 meses.',
+            nome_solicitante='Carlos Santos',
+            celular_solicitante='(11) 88888-8888',
+            email_solicitante='carlos@email.com',
+            status='Respondido',
+            data_submissao=datetime(2024, 1, 10),
+            data_ultima_atualizacao=datetime(2024, 1, 20),
+            usuario_criador_id=admin_user.id if admin_user else None
+        )
+        
+        db.session.add(pedido1)
+        db.session.add(pedido2)
+        db.session.commit()
+        
+        # Adicionar comentários de exemplo
+        comentario1 = Comentario(
+            pedido_id=pedido1.id,
+            autor='Pastor João',
+            conteudo='Estamos orando pela sua mãe. Deus é fiel!',
+            data_comentario=datetime(2024, 1, 16),
+            usuario_id=admin_user.id if admin_user else None
+        )
+        
+        comentario2 = Comentario(
+            pedido_id=pedido2.id,
+            autor='Carlos Santos',
+            conteudo='Glória a Deus! Consegui um emprego ontem. Obrigado pelas orações!',
+            data_comentario=datetime(2024, 1, 20),
+            usuario_id=admin_user.id if admin_user else None
+        )
+        
+        db.session.add(comentario1)
+        db.session.add(comentario2)
+        db.session.commit()
+
+def registrar_comandos(app):
+    @app.cli.command('init-db')
+    @click.option('--seed', 'com_seed', is_flag=True, help='Também cria o admin e os dados de exemplo')
+    def init_db(com_seed):
+        """Cria ou atualiza o banco configurado (schema, migrações, busca, contadores)"""
+        aplicadas, busca = inicializar_banco()
+        if aplicadas:
+            print(f"Migrações aplicadas: {', '.join(map(str, aplicadas))}")
+        print(f"Schema na versão {VERSAO_ATUAL}")
+        if not busca:
+            print("FTS5 indisponível: a busca usará filtros LIKE")
+        if com_seed:
+            popular_dados_exemplo()
+
+    @app.cli.command('seed')
+    def seed():
+        """Cria o administrador padrão e pedidos de exemplo, se o banco estiver vazio"""
+        popular_dados_exemplo()
+
+    @app.cli.command('migrar')
+    def migrar():
+        """Aplica as migrações de schema pendentes no banco configurado"""
+        with db.engine.connect() as conn:
+            versao = versao_schema(conn)
+        aplicadas = atualizar_schema()
+        # Migrações podem recriar tabelas de contadores e remover seus triggers;
+        # tabelas novas (ex.: o arquivo) recebem aqui seus índices de busca
+        instalar_indice_busca(db.engine)
+        instalar_contadores(db.engine)
+        if aplicadas:
+            print(f"Schema atualizado da versão {versao} para {aplicadas[-1]}")
+        else:
+            print(f"Schema já está na versão {VERSAO_ATUAL}")
+
+    @app.cli.command('arquivar')
+    @click.option('--dias', type=float, default=None,
+                  help='Idade mínima, em dias sem alteração (padrão: ARQUIVAMENTO_IDADE_DIAS)')
+    @click.option('--lote', type=int, default=None, help='Pedidos por transação (padrão: ARQUIVAMENTO_LOTE)')
+    def arquivar(dias, lote):
+        """Move pedidos 'Arquivado' antigos, com os comentários, para as tabelas de arquivo"""
+        config = current_app.config
+        movidos = arquivar_antigos(
+            current_app,
+            dias if dias is not None else config.get('ARQUIVAMENTO_IDADE_DIAS', ARQUIVAMENTO_IDADE_DIAS),
+            tamanho_lote=lote or config.get('ARQUIVAMENTO_LOTE', ARQUIVAMENTO_LOTE),
+            pausa=config.get('ARQUIVAMENTO_PAUSA_MS', ARQUIVAMENTO_PAUSA_MS) / 1000,
+        )
+        print(f"Pedidos movidos para o arquivo: {movidos}")
+
+    @app.cli.command('atualizar-replica')
+    def atualizar_replica_leitura():
+        """Copia o banco principal sobre a réplica de leitura em arquivo separado (ex.: num cron)"""
+        if BIND_LEITURA not in db.engines:
+            raise click.ClickException('SQLALCHEMY_DATABASE_URI_LEITURA não está configurada')
+        atualizar_replica(db.engine, db.engines[BIND_LEITURA])
+        print("Réplica de leitura atualizada")
+
+    @app.cli.command('reindexar-busca')
+    def reindexar_busca():
+        """Reconstrói os índices de busca textual a partir das tabelas pedido e pedido_arquivado"""
+        reconstruir_indice_busca(db.engine)
+        print("Índice de busca reconstruído")
+
+    @app.cli.command('recalcular-estatisticas')
+    def recalcular_estatisticas():
+        """Recalcula os contadores de pedidos por status e de comentários por pedido"""
+        recalcular_contadores(db.engine)
+        print("Contadores de status recalculados")
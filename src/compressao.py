@@ -0,0 +1,45 @@
+import gzip
+
+from flask import request
+
+# Sufixo acrescentado ao ETag de respostas comprimidas aqui, para que a
+# variante gzip e a original não tenham o mesmo validador forte
+SUFIXO_ETAG_GZIP = '-gzip'
+
+_MIMETYPES_COMPRESSIVEIS = ('application/json', 'text/html', 'text/plain', 'text/csv')
+
+
+def instalar_compressao(app, tamanho_minimo=1024, nivel=6):
+    """Comprime com gzip respostas da API acima de `tamanho_minimo` bytes.
+
+    Respostas em streaming (SSE, exportação), já codificadas, sem corpo ou
+    pequenas demais para valer o custo passam direto.
+    """
+
+    @app.after_request
+    def comprimir_resposta(response):
+        if (
+            response.direct_passthrough
+            or response.is_streamed
+            or response.status_code < 200
+            or response.status_code >= 300
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in _MIMETYPES_COMPRESSIVEIS
+        ):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        if not request.accept_encodings['gzip']:
+            return response
+
+        corpo = response.get_data()
+        if len(corpo) < tamanho_minimo:
+            return response
+
+        response.set_data(gzip.compress(corpo, compresslevel=nivel, mtime=0))
+        response.headers['Content-Encoding'] = 'gzip'
+
+        etag, fraco = response.get_etag()
+        if etag and not fraco:
+            response.set_etag(etag + SUFIXO_ETAG_GZIP)
+        return response
@@ -0,0 +1,134 @@
+import os
+
+# Banco padrão: arquivo SQLite dentro do pacote. Pode ser trocado sem alterar
+# código definindo SQLALCHEMY_DATABASE_URI no ambiente.
+DATABASE_URI_PADRAO = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+
+# Perfil de produção do SQLite, aplicado a cada nova conexão:
+# - WAL deixa leitores e o escritor trabalharem ao mesmo tempo
+# - synchronous=NORMAL é seguro em WAL e evita um fsync por commit
+# - busy_timeout faz a conexão esperar pelo lock em vez de falhar com
+#   "database is locked"
+PRAGMAS_SQLITE = {
+    'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+    'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', '5000')),
+    'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024))),
+    'cache_size': int(os.environ.get('SQLITE_CACHE_SIZE', '-65536')),  # negativo = KiB
+    'temp_store': 'MEMORY',
+    'foreign_keys': 'ON',
+}
+
+# Conexões da réplica de leitura: sem journal_mode/synchronous, que exigiriam
+# escrever no arquivo, e com query_only como garantia contra escritas
+PRAGMAS_SQLITE_LEITURA = {
+    **{nome: valor for nome, valor in PRAGMAS_SQLITE.items() if nome not in ('journal_mode', 'synchronous')},
+    'query_only': 'ON',
+}
+
+
+def database_uri():
+    return os.environ.get('SQLALCHEMY_DATABASE_URI') or DATABASE_URI_PADRAO
+
+
+def database_uri_leitura():
+    """URI da réplica de leitura, ou None para ler do banco principal.
+
+    Ex.: sqlite:///file:/dados/app.db?mode=ro&uri=true (o próprio arquivo,
+    aberto só para leitura) ou o caminho de uma cópia atualizada por
+    `flask atualizar-replica`.
+    """
+    return os.environ.get('SQLALCHEMY_DATABASE_URI_LEITURA') or None
+
+
+def opcoes_engine(uri):
+    """SQLALCHEMY_ENGINE_OPTIONS adequadas ao banco e ao modelo de worker.
+
+    Com GUNICORN_THREADS definido, cada thread do worker pode segurar uma
+    conexão e o pool acompanha esse número. Sem ele (servidor de
+    desenvolvimento, comandos, scripts) valem os padrões do SQLAlchemy, que
+    comportam as threads em segundo plano e uma exportação em andamento.
+    DB_POOL_SIZE e DB_MAX_OVERFLOW têm precedência nos dois casos.
+    """
+    threads = os.environ.get('GUNICORN_THREADS')
+    pool = {'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', '30'))}
+    tamanho = os.environ.get('DB_POOL_SIZE', threads)
+    excedente = os.environ.get('DB_MAX_OVERFLOW', threads)
+    if tamanho:
+        pool['pool_size'] = int(tamanho)
+    if excedente:
+        pool['max_overflow'] = int(excedente)
+
+    if not uri.startswith('sqlite'):
+        return {**pool, 'pool_pre_ping': True}
+
+    if ':memory:' in uri or 'mode=memory' in uri or uri in ('sqlite://', 'sqlite:///'):
+        # O Flask-SQLAlchemy já escolhe StaticPool para bancos em memória
+        return {}
+
+    return {
+        **pool,
+        'connect_args': {
+            'check_same_thread': False,
+            'timeout': PRAGMAS_SQLITE['busy_timeout'] / 1000,
+        },
+    }
+
+# Server-Sent Events (/api/pedidos/stream). Cada conexão ocupa uma thread de
+# requisição por até SSE_DURACAO_MAXIMA segundos, e as conexões além de
+# SSE_MAX_ASSINANTES por processo recebem 503 na hora. O stream exige um
+# worker com threads ou assíncrono:
+#   gunicorn --worker-class gthread --threads 8   (com GUNICORN_THREADS=8)
+#   gunicorn --worker-class gevent                (defina SSE_MAX_ASSINANTES)
+# Com GUNICORN_THREADS o padrão é metade das threads do worker, para que a
+# API sempre tenha threads livres. Sem ele o padrão é 0: o endpoint responde
+# 503, porque no worker sync padrão cada assinante bloquearia o processo
+# inteiro por quase um minuto.
+SSE_DURACAO_MAXIMA = float(os.environ.get('SSE_DURACAO_MAXIMA', '55'))
+SSE_HEARTBEAT = float(os.environ.get('SSE_HEARTBEAT', '15'))
+SSE_MAX_ASSINANTES = int(
+    os.environ.get('SSE_MAX_ASSINANTES')
+    or (int(os.environ['GUNICORN_THREADS']) // 2 if os.environ.get('GUNICORN_THREADS') else 0)
+)
+
+# Limite de tentativas em login/registro/troca de senha, por IP e por usuário.
+# Os benchmarks de carga sobem esses valores para medir o login em si.
+AUTH_RAJADA = int(os.environ.get('AUTH_RAJADA', '10'))
+AUTH_POR_SEGUNDO = float(os.environ.get('AUTH_POR_SEGUNDO', '0.2'))
+
+# Métricas em /metrics. Com vários workers do gunicorn, defina
+# PROMETHEUS_MULTIPROC_DIR (vazio a cada início) para somar todos os processos.
+# REQUISICAO_LENTA_MS liga o log de requisições lentas com o SQL executado.
+METRICAS_DIR = os.environ.get('PROMETHEUS_MULTIPROC_DIR') or None
+METRICAS_TOKEN = os.environ.get('METRICAS_TOKEN') or None
+REQUISICAO_LENTA_MS = float(os.environ['REQUISICAO_LENTA_MS']) if os.environ.get('REQUISICAO_LENTA_MS') else None
+
+# Cache de respostas GET de pedidos: 'memoria' (por processo), 'sqlite'
+# (arquivo local compartilhado pelos workers do gunicorn) ou 'desligado'.
+# Com mais de um worker use 'sqlite', para que as invalidações valham para todos.
+CACHE_RESPOSTAS = os.environ.get('CACHE_RESPOSTAS', 'memoria')
+CACHE_RESPOSTAS_CAMINHO = os.environ.get('CACHE_RESPOSTAS_CAMINHO')  # obrigatório com 'sqlite'
+CACHE_RESPOSTAS_MAXIMO = int(os.environ.get('CACHE_RESPOSTAS_MAXIMO', '2048'))
+CACHE_RESPOSTAS_TTL = float(os.environ.get('CACHE_RESPOSTAS_TTL', '30'))
+
+# Commit agrupado de comentários e alterações de status: uma thread por
+# processo grava as escritas de várias requisições em uma só transação,
+# esperando até COMMIT_AGRUPADO_INTERVALO_MS por mais itens
+COMMIT_AGRUPADO = os.environ.get('COMMIT_AGRUPADO', '0') == '1'
+COMMIT_AGRUPADO_INTERVALO_MS = float(os.environ.get('COMMIT_AGRUPADO_INTERVALO_MS', '5'))
+COMMIT_AGRUPADO_MAXIMO = int(os.environ.get('COMMIT_AGRUPADO_MAXIMO', '200'))
+
+# Arquivamento: pedidos 'Arquivado' sem alteração há ARQUIVAMENTO_IDADE_DIAS
+# saem de pedido/comentario para pedido_arquivado/comentario_arquivado, em
+# transações de até ARQUIVAMENTO_LOTE pedidos com ARQUIVAMENTO_PAUSA_MS entre
+# elas. Com ARQUIVAMENTO_INTERVALO_S > 0 cada processo arquiva em segundo
+# plano nesse intervalo; com 0, rode `flask arquivar` (ex.: num cron)
+ARQUIVAMENTO_IDADE_DIAS = float(os.environ.get('ARQUIVAMENTO_IDADE_DIAS', '90'))
+ARQUIVAMENTO_LOTE = int(os.environ.get('ARQUIVAMENTO_LOTE', '200'))
+ARQUIVAMENTO_PAUSA_MS = float(os.environ.get('ARQUIVAMENTO_PAUSA_MS', '50'))
+ARQUIVAMENTO_INTERVALO_S = float(os.environ.get('ARQUIVAMENTO_INTERVALO_S', '0'))
+
+# Depois de uma escrita, as leituras do mesmo usuário ficam no banco principal
+# por LEITURA_PRIMARIO_APOS_ESCRITA_S segundos (read-your-writes). Com réplica
+# em cópia, use um valor acima do intervalo de `flask atualizar-replica`
+LEITURA_PRIMARIO_APOS_ESCRITA_S = float(os.environ.get('LEITURA_PRIMARIO_APOS_ESCRITA_S', '5'))
@@ -0,0 +1,119 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+
+from flask import Response, request, send_from_directory
+
+try:
+    import brotli
+except ImportError:  # opcional: sem o pacote, servimos só gzip
+    brotli = None
+
+# Saída do build com hash no nome (ex.: assets/index-4f3a9c1b.js,
+# assets/app.Bx7dK2_q.css), como a gerada pelo Vite, nunca muda de conteúdo e
+# pode ficar em cache para sempre no navegador e em CDNs. Só arquivos dentro
+# de DIRETORIOS_BUILD contam, e o hash precisa ter ao menos um dígito: nomes
+# como politica-privacidade.html ou logo-principal.svg são editados no lugar
+_FINGERPRINT = re.compile(r'[.-](?=[0-9A-Za-z_]*[0-9])[0-9A-Za-z_]{8,}\.[0-9a-z]+$')
+DIRETORIOS_BUILD = ('assets/',)
+
+_COMPRESSIVEIS = ('text/', 'application/javascript', 'application/json',
+                  'application/xml', 'image/svg+xml', 'image/x-icon',
+                  'image/vnd.microsoft.icon')
+
+TAMANHO_MINIMO_COMPRESSAO = 512
+TAMANHO_MAXIMO_MEMORIA = 2 * 1024 * 1024
+
+CACHE_IMUTAVEL = 'public, max-age=31536000, immutable'
+CACHE_REVALIDAR = 'public, no-cache'
+
+
+class ArquivoEstatico:
+    """Entrada do manifesto: metadados e, para arquivos pequenos, o conteúdo e suas versões comprimidas"""
+
+    def __init__(self, caminho_relativo, caminho_absoluto):
+        info = os.stat(caminho_absoluto)
+        self.caminho = caminho_relativo
+        self.tamanho = info.st_size
+        self.mtime = info.st_mtime
+        self.mimetype = mimetypes.guess_type(caminho_relativo)[0] or 'application/octet-stream'
+        self.imutavel = (
+            caminho_relativo.startswith(DIRETORIOS_BUILD) and bool(_FINGERPRINT.search(caminho_relativo))
+        )
+        self.variantes = {}
+
+        with open(caminho_absoluto, 'rb') as arquivo:
+            conteudo = arquivo.read()
+        self.etag = hashlib.sha256(conteudo).hexdigest()[:32]
+
+        if self.tamanho > TAMANHO_MAXIMO_MEMORIA:
+            return  # arquivo grande: servido do disco, só os metadados ficam em memória
+
+        self.variantes['identity'] = conteudo
+        if self.tamanho >= TAMANHO_MINIMO_COMPRESSAO and self.mimetype.startswith(_COMPRESSIVEIS):
+            comprimido = gzip.compress(conteudo, compresslevel=9, mtime=0)
+            if len(comprimido) < self.tamanho:
+                self.variantes['gzip'] = comprimido
+            if brotli is not None:
+                comprimido = brotli.compress(conteudo, quality=11)
+                if len(comprimido) < self.tamanho:
+                    self.variantes['br'] = comprimido
+
+    def escolher_codificacao(self):
+        aceitas = request.accept_encodings
+        for codificacao in ('br', 'gzip'):
+            if codificacao in self.variantes and aceitas[codificacao]:
+                return codificacao
+        return 'identity'
+
+
+class ManifestoEstatico:
+    """Índice em memória da pasta static/, montado uma vez na inicialização.
+
+    Cada requisição é resolvida por uma busca em dicionário, sem os.path.exists
+    nem leitura de disco. Rotas que não correspondem a arquivo caem no
+    index.html (SPA), também servido da memória.
+    """
+
+    def __init__(self, pasta):
+        self.pasta = pasta
+        self.arquivos = {}
+        if pasta and os.path.isdir(pasta):
+            for raiz, _, nomes in os.walk(pasta):
+                for nome in nomes:
+                    absoluto = os.path.join(raiz, nome)
+                    relativo = os.path.relpath(absoluto, pasta).replace(os.sep, '/')
+                    self.arquivos[relativo] = ArquivoEstatico(relativo, absoluto)
+
+    def responder(self, caminho):
+        arquivo = self.arquivos.get(caminho) if caminho else None
+        if arquivo is None:
+            arquivo = self.arquivos.get('index.html')
+            if arquivo is None:
+                return "index.html not found", 404
+
+        cache_control = CACHE_IMUTAVEL if arquivo.imutavel else CACHE_REVALIDAR
+
+        if not arquivo.variantes:
+            resposta = send_from_directory(self.pasta, arquivo.caminho, etag=arquivo.etag)
+            resposta.headers['Cache-Control'] = cache_control
+            return resposta
+
+        codificacao = arquivo.escolher_codificacao()
+        etag = arquivo.etag if codificacao == 'identity' else f'{arquivo.etag}-{codificacao}'
+
+        if request.if_none_match.contains(etag):
+            resposta = Response(status=304)
+        else:
+            resposta = Response(arquivo.variantes[codificacao], mimetype=arquivo.mimetype)
+            if codificacao != 'identity':
+                resposta.headers['Content-Encoding'] = codificacao
+
+        resposta.set_etag(etag)
+        resposta.last_modified = arquivo.mtime
+        resposta.headers['Cache-Control'] = cache_control
+        if len(arquivo.variantes) > 1:
+            resposta.vary.add('Accept-Encoding')
+        return resposta
@@ -3,126 +3,153 @@ import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory
+from flask import Flask
 from flask_cors import CORS
-from werkzeug.security import generate_password_hash
-from src.models.user import db, User
+from sqlalchemy import create_engine
+from src.arquivamento import instalar_arquivamento
+from src.comandos import inicializar_banco, popular_dados_exemplo, registrar_comandos
+from src.compressao import instalar_compressao
+from src.config import (
+    ARQUIVAMENTO_IDADE_DIAS, ARQUIVAMENTO_INTERVALO_S, ARQUIVAMENTO_LOTE, ARQUIVAMENTO_PAUSA_MS,
+    CACHE_RESPOSTAS, CACHE_RESPOSTAS_CAMINHO, CACHE_RESPOSTAS_MAXIMO, CACHE_RESPOSTAS_TTL,
+    COMMIT_AGRUPADO, COMMIT_AGRUPADO_INTERVALO_MS, COMMIT_AGRUPADO_MAXIMO,
+    LEITURA_PRIMARIO_APOS_ESCRITA_S, METRICAS_DIR, METRICAS_TOKEN, PRAGMAS_SQLITE, PRAGMAS_SQLITE_LEITURA,
+    REQUISICAO_LENTA_MS, database_uri, database_uri_leitura, opcoes_engine
+)
+from src.estaticos import ManifestoEstatico
+from src.metricas import instalar_metricas
+from src.serializacao import ProvedorJSON
+from src.models.user import db
+from src.models.roteamento import BIND_LEITURA, instalar_roteamento
+from src.models.sqlite import instalar_pragmas
 from src.routes.user import user_bp
 from src.routes.pedido import pedido_bp
 from src.routes.auth import auth_bp
+from src.utils.cache_respostas import criar_cache_respostas
+from src.utils.commit_agrupado import CommitAgrupado
 
-app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
-app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
-
-# Configurar CORS para permitir requisições do frontend
-# Configurar CORS para permitir requisições do frontend no Render
-CORS(app, origins=[
-    "http://localhost:5173",             # Para rodar local
-    "http://127.0.0.1:5173",             # Alternativa local
-    "https://pedido-oracao-frontend.onrender.com"  # Frontend hospedado no Render
-], supports_credentials=True)
-
-# Registrar blueprints
-app.register_blueprint(user_bp, url_prefix='/api')
-app.register_blueprint(pedido_bp, url_prefix='/api')
-app.register_blueprint(auth_bp, url_prefix='/api/auth')
-
-# Configuração do banco de dados
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db.init_app(app)
-
-# Importar todos os modelos para garantir que as tabelas sejam criadas
-from src.models.pedido import Pedido, Comentario
-
-with app.app_context():
-    db.create_all()
-    
-    # Criar usuário administrador padrão se não existir
-    if User.query.count() == 0:
-        admin_user = User(
-            username='admin',
-            email='admin@sistema.com',
-            password_hash=generate_password_hash('admin123'),
-            nome_completo='Administrador do Sistema',
-            is_admin=True
-        )
-        db.session.add(admin_user)
-        db.session.commit()
-        print("Usuário administrador criado: admin / admin123")
-    
-    # Criar dados de exemplo se não existirem
-    if Pedido.query.count() == 0:
-        from datetime import datetime
-        
-        # Buscar o usuário admin para associar aos pedidos
-        admin_user = User.query.filter_by(username='admin').first()
-        
-        pedido1 = Pedido(
-            titulo='Saúde da família',
-            descricao='Pedindo oração pela recuperação da minha mãe que está internada no hospital.',
-            nome_solicitante='Maria Silva',
-            celular_solicitante='(11) 99999-9999',
-            email_solicitante='maria@email.com',
-            status='Em Oração',
-            data_submissao=datetime(2024, 1, 15),
-            data_ultima_atualizacao=datetime(2024, 1, 16),
-            usuario_criador_id=admin_user.id if admin_user else None
-        )
-        
-        pedido2 = Pedido(
-            titulo='Emprego',
-            descricao='Preciso de oração para conseguir um novo emprego. Estou desempregado há 3 meses.',
-            nome_solicitante='Carlos Santos',
-            celular_solicitante='(11) 88888-8888',
-            email_solicitante='carlos@email.com',
-            status='Respondido',
-            data_submissao=datetime(2024, 1, 10),
-            data_ultima_atualizacao=datetime(2024, 1, 20),
-            usuario_criador_id=admin_user.id if admin_user else None
-        )
-        
-        db.session.add(pedido1)
-        db.session.add(pedido2)
-        db.session.commit()
-        
-        # Adicionar comentários de exemplo
-        comentario1 = Comentario(
-            pedido_id=pedido1.id,
-            autor='Pastor João',
-            conteudo='Estamos orando pela sua mãe. Deus é fiel!',
-            data_comentario=datetime(2024, 1, 16),
-            usuario_id=admin_user.id if admin_user else None
+
+def _engine_commit_agrupado(app):
+    """Engine da thread gravadora, com uma conexão própria fora do pool.
+
+    As requisições que aguardam a gravação seguram conexões do pool; se a
+    gravadora disputasse o mesmo pool, poderia nunca conseguir uma. Banco em
+    memória não pode ser aberto duas vezes e usa o engine compartilhado.
+    """
+    opcoes = app.config['SQLALCHEMY_ENGINE_OPTIONS']
+    if not opcoes:
+        return db.engine
+    engine = create_engine(db.engine.url, **{**opcoes, 'pool_size': 1, 'max_overflow': 0})
+    instalar_pragmas(engine, PRAGMAS_SQLITE)
+    return engine
+
+
+def create_app(config=None):
+    """Monta a aplicação sem tocar no banco.
+
+    Schema e dados iniciais ficam nos comandos `flask init-db` e `flask seed`,
+    executados uma vez no deploy, e não em cada worker do gunicorn.
+    """
+    app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+    app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
+    app.json = ProvedorJSON(app)
+
+    # Configuração do banco de dados
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_uri()
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config.update(config or {})
+    app.config.setdefault(
+        'SQLALCHEMY_ENGINE_OPTIONS', opcoes_engine(app.config['SQLALCHEMY_DATABASE_URI'])
+    )
+    # Réplica de leitura opcional: os SELECTs das requisições GET vão para o
+    # bind 'leitura' (ver src/models/roteamento.py)
+    uri_leitura = app.config.get('SQLALCHEMY_DATABASE_URI_LEITURA', database_uri_leitura())
+    if uri_leitura:
+        binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+        binds.setdefault(BIND_LEITURA, {'url': uri_leitura, **opcoes_engine(uri_leitura)})
+        app.config['SQLALCHEMY_BINDS'] = binds
+
+    # Configurar CORS para permitir requisições do frontend
+    # Configurar CORS para permitir requisições do frontend no Render
+    CORS(app, origins=[
+        "http://localhost:5173",             # Para rodar local
+        "http://127.0.0.1:5173",             # Alternativa local
+        "https://pedido-oracao-frontend.onrender.com"  # Frontend hospedado no Render
+    ], supports_credentials=True)
+
+    # Cache das respostas GET de pedidos, invalidado pelas rotas de escrita
+    app.extensions['cache_respostas'] = criar_cache_respostas(
+        app.config.get('CACHE_RESPOSTAS', CACHE_RESPOSTAS),
+        caminho=app.config.get('CACHE_RESPOSTAS_CAMINHO', CACHE_RESPOSTAS_CAMINHO),
+        maximo=app.config.get('CACHE_RESPOSTAS_MAXIMO', CACHE_RESPOSTAS_MAXIMO),
+        ttl=app.config.get('CACHE_RESPOSTAS_TTL', CACHE_RESPOSTAS_TTL),
+    )
+
+    # Registrar blueprints
+    app.register_blueprint(user_bp, url_prefix='/api')
+    app.register_blueprint(pedido_bp, url_prefix='/api')
+    app.register_blueprint(auth_bp, url_prefix='/api/auth')
+
+    db.init_app(app)
+    with app.app_context():
+        # Só registra o listener: nenhuma conexão é aberta aqui
+        instalar_pragmas(db.engine, PRAGMAS_SQLITE)
+        if BIND_LEITURA in db.engines:
+            instalar_pragmas(db.engines[BIND_LEITURA], PRAGMAS_SQLITE_LEITURA)
+            instalar_roteamento(
+                app, app.config.get('LEITURA_PRIMARIO_APOS_ESCRITA_S', LEITURA_PRIMARIO_APOS_ESCRITA_S)
+            )
+        # Latência, status e SQL por requisição, expostos em /metrics
+        instalar_metricas(
+            app, list(db.engines.values()),
+            diretorio=app.config.get('METRICAS_DIR', METRICAS_DIR),
+            lenta_ms=app.config.get('REQUISICAO_LENTA_MS', REQUISICAO_LENTA_MS),
+            token=app.config.get('METRICAS_TOKEN', METRICAS_TOKEN),
         )
-        
-        comentario2 = Comentario(
-            pedido_id=pedido2.id,
-            autor='Carlos Santos',
-            conteudo='Glória a Deus! Consegui um emprego ontem. Obrigado pelas orações!',
-            data_comentario=datetime(2024, 1, 20),
-            usuario_id=admin_user.id if admin_user else None
+        # Opcional: comentários e status gravados em lote por uma thread gravadora
+        if app.config.get('COMMIT_AGRUPADO', COMMIT_AGRUPADO):
+            app.extensions['commit_agrupado'] = CommitAgrupado(
+                _engine_commit_agrupado(app),
+                intervalo=app.config.get('COMMIT_AGRUPADO_INTERVALO_MS', COMMIT_AGRUPADO_INTERVALO_MS) / 1000,
+                maximo=app.config.get('COMMIT_AGRUPADO_MAXIMO', COMMIT_AGRUPADO_MAXIMO),
+            )
+
+    # Opcional: arquivamento periódico dos pedidos arquivados antigos
+    intervalo_arquivamento = app.config.get('ARQUIVAMENTO_INTERVALO_S', ARQUIVAMENTO_INTERVALO_S)
+    if intervalo_arquivamento > 0:
+        instalar_arquivamento(
+            app, intervalo_arquivamento,
+            idade_dias=app.config.get('ARQUIVAMENTO_IDADE_DIAS', ARQUIVAMENTO_IDADE_DIAS),
+            tamanho_lote=app.config.get('ARQUIVAMENTO_LOTE', ARQUIVAMENTO_LOTE),
+            pausa=app.config.get('ARQUIVAMENTO_PAUSA_MS', ARQUIVAMENTO_PAUSA_MS) / 1000,
         )
-        
-        db.session.add(comentario1)
-        db.session.add(comentario2)
-        db.session.commit()
-
-@app.route('/', defaults={'path': ''})
-@app.route('/<path:path>')
-def serve(path):
-    static_folder_path = app.static_folder
-    if static_folder_path is None:
-            return "Static folder not configured", 404
-
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
-    else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
-        else:
-            return "index.html not found", 404
+
+    # Compressão gzip das respostas da API acima de 1 KiB. Registrada depois
+    # das métricas para rodar antes delas: a latência medida inclui o gzip
+    instalar_compressao(app)
+
+    registrar_comandos(app)
+
+    # Manifesto da pasta static/ montado uma vez: servir arquivos não toca o disco
+    manifesto_estatico = ManifestoEstatico(app.static_folder)
+
+    @app.route('/', defaults={'path': ''})
+    @app.route('/<path:path>')
+    def serve(path):
+        if app.static_folder is None:
+                return "Static folder not configured", 404
+
+        return manifesto_estatico.responder(path)
+
+    return app
+
+
+app = create_app()
 
 
 if __name__ == '__main__':
+    # Execução local: prepara o banco antes de subir o servidor de desenvolvimento
+    with app.app_context():
+        inicializar_banco()
+        popular_dados_exemplo()
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,249 @@
+import glob
+import json
+import os
+import threading
+import time
+
+from flask import Response, current_app, g, has_request_context, request
+from sqlalchemy import event
+
+from src.utils.threads import ThreadPorProcesso
+
+# Buckets em segundos para latência da requisição e tempo de SQL, e em número
+# de consultas para a contagem por requisição
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BUCKETS_CONSULTAS = (1, 2, 3, 5, 8, 13, 21, 50, 100)
+
+# nome -> (tipo, ajuda, buckets)
+METRICAS = {
+    'http_requisicoes_total': (
+        'counter', 'Requisições atendidas por endpoint, método e status', None),
+    'http_requisicao_duracao_segundos': (
+        'histogram', 'Latência das requisições por endpoint', BUCKETS_LATENCIA),
+    'sql_consultas_requisicao': (
+        'histogram', 'Consultas SQL executadas por requisição', BUCKETS_CONSULTAS),
+    'sql_duracao_requisicao_segundos': (
+        'histogram', 'Tempo total de SQL por requisição', BUCKETS_LATENCIA),
+}
+
+# Intervalo entre gravações do arquivo de cada processo no modo multiprocesso
+INTERVALO_GRAVACAO = 1.0
+
+
+class RegistroMetricas:
+    """Contadores e histogramas em memória, seguros entre threads.
+
+    Em modo multiprocesso (gunicorn com vários workers) cada processo grava um
+    instantâneo em <diretorio>/metricas-<pid>.json, numa thread de fundo, no
+    máximo uma vez por INTERVALO_GRAVACAO, e /metrics soma os arquivos de
+    todos os processos.
+    Os arquivos de workers encerrados continuam contando, como contadores
+    Prometheus devem; limpe o diretório ao iniciar o servidor.
+    """
+
+    def __init__(self, diretorio=None):
+        self.diretorio = diretorio
+        self._contadores = {nome: {} for nome, (tipo, _, _) in METRICAS.items() if tipo == 'counter'}
+        self._histogramas = {nome: {} for nome, (tipo, _, _) in METRICAS.items() if tipo == 'histogram'}
+        self._lock = threading.Lock()
+        self._pendente = False
+        self._gravador = ThreadPorProcesso(self._gravar_periodicamente)
+
+    def incrementar(self, nome, rotulos, valor=1):
+        chave = tuple(sorted(rotulos.items()))
+        with self._lock:
+            serie = self._contadores[nome]
+            serie[chave] = serie.get(chave, 0) + valor
+
+    def observar(self, nome, rotulos, valor):
+        chave = tuple(sorted(rotulos.items()))
+        buckets = METRICAS[nome][2]
+        with self._lock:
+            serie = self._histogramas[nome]
+            # [contagem por bucket..., soma, total]; contagens não cumulativas
+            dados = serie.get(chave)
+            if dados is None:
+                dados = serie[chave] = [0] * len(buckets) + [0.0, 0]
+            for i, limite in enumerate(buckets):
+                if valor <= limite:
+                    dados[i] += 1
+                    break
+            dados[-2] += valor
+            dados[-1] += 1
+
+    def instantaneo(self):
+        with self._lock:
+            return {
+                'contadores': {
+                    nome: [[list(chave), valor] for chave, valor in serie.items()]
+                    for nome, serie in self._contadores.items()
+                },
+                'histogramas': {
+                    nome: [[list(chave), list(dados)] for chave, dados in serie.items()]
+                    for nome, serie in self._histogramas.items()
+                },
+            }
+
+    def marcar_alterado(self):
+        """Agenda a gravação do instantâneo deste processo (modo multiprocesso)"""
+        if not self.diretorio:
+            return
+        self._pendente = True
+        self._gravador.iniciar()
+
+    def _gravar_periodicamente(self):
+        while True:
+            time.sleep(INTERVALO_GRAVACAO)
+            if self._pendente:
+                self._pendente = False
+                self.gravar()
+
+    def gravar(self):
+        """Grava o instantâneo deste processo em <diretorio>/metricas-<pid>.json"""
+        caminho = os.path.join(self.diretorio, f'metricas-{os.getpid()}.json')
+        temporario = f'{caminho}.{threading.get_ident()}.tmp'
+        with open(temporario, 'w', encoding='utf-8') as arquivo:
+            json.dump(self.instantaneo(), arquivo, ensure_ascii=False)
+        os.replace(temporario, caminho)
+
+    def agregado(self):
+        """Instantâneo somado de todos os processos (ou só deste)"""
+        if not self.diretorio:
+            return self.instantaneo()
+        self.gravar()
+        total = RegistroMetricas()
+        for caminho in glob.glob(os.path.join(self.diretorio, 'metricas-*.json')):
+            try:
+                with open(caminho, encoding='utf-8') as arquivo:
+                    dados = json.load(arquivo)
+            except (OSError, ValueError):
+                continue
+            for nome, serie in dados['contadores'].items():
+                for chave, valor in serie:
+                    alvo = total._contadores.setdefault(nome, {})
+                    chave = tuple(map(tuple, chave))
+                    alvo[chave] = alvo.get(chave, 0) + valor
+            for nome, serie in dados['histogramas'].items():
+                for chave, valores in serie:
+                    alvo = total._histogramas.setdefault(nome, {})
+                    chave = tuple(map(tuple, chave))
+                    atual = alvo.get(chave)
+                    alvo[chave] = valores if atual is None else [a + b for a, b in zip(atual, valores)]
+        return total.instantaneo()
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _rotulos(pares):
+    if not pares:
+        return ''
+    return '{' + ','.join(f'{chave}="{_escapar(valor)}"' for chave, valor in pares) + '}'
+
+
+def formatar_prometheus(instantaneo):
+    """Converte um instantâneo no formato de texto de exposição do Prometheus"""
+    linhas = []
+    for nome, (tipo, ajuda, buckets) in METRICAS.items():
+        linhas.append(f'# HELP {nome} {ajuda}')
+        linhas.append(f'# TYPE {nome} {tipo}')
+        if tipo == 'counter':
+            for chave, valor in sorted(instantaneo['contadores'].get(nome, [])):
+                linhas.append(f'{nome}{_rotulos(chave)} {valor}')
+            continue
+        for chave, dados in sorted(instantaneo['histogramas'].get(nome, [])):
+            acumulado = 0
+            for limite, quantidade in zip(buckets, dados):
+                acumulado += quantidade
+                linhas.append(f'{nome}_bucket{_rotulos(chave + [["le", limite]])} {acumulado}')
+            linhas.append(f'{nome}_bucket{_rotulos(chave + [["le", "+Inf"]])} {dados[-1]}')
+            linhas.append(f'{nome}_sum{_rotulos(chave)} {dados[-2]}')
+            linhas.append(f'{nome}_count{_rotulos(chave)} {dados[-1]}')
+    return '\n'.join(linhas) + '\n'
+
+
+def instalar_metricas(app, engines, diretorio=None, lenta_ms=None, token=None):
+    """Mede cada requisição e expõe o resultado em GET /metrics.
+
+    Registra latência por endpoint, contagem por status e número/tempo das
+    consultas SQL de cada requisição (eventos dos `engines`: o principal e,
+    se houver, a réplica de leitura). Com `lenta_ms`, requisições mais lentas
+    que isso são registradas no log com as instruções SQL executadas. Com
+    `token`, /metrics exige `Authorization: Bearer <token>`.
+    """
+    if diretorio:
+        os.makedirs(diretorio, exist_ok=True)
+    registro = RegistroMetricas(diretorio)
+    app.extensions['metricas'] = registro
+
+    def _inicio_consulta(conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and 'metricas' in g:
+            conn.info.setdefault('inicio_consultas', []).append(time.perf_counter())
+
+    def _fim_consulta(conn, cursor, statement, parameters, context, executemany):
+        inicios = conn.info.get('inicio_consultas')
+        if not inicios or not has_request_context() or 'metricas' not in g:
+            return
+        duracao = time.perf_counter() - inicios.pop()
+        medicao = g.metricas
+        medicao['consultas'] += 1
+        medicao['tempo_sql'] += duracao
+        if lenta_ms is not None:
+            medicao['instrucoes'].append((duracao, statement))
+
+    def _erro_consulta(contexto):
+        # Consulta que falhou não chega ao after_cursor_execute
+        if contexto.connection is not None:
+            inicios = contexto.connection.info.get('inicio_consultas')
+            if inicios:
+                inicios.pop()
+
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', _inicio_consulta)
+        event.listen(engine, 'after_cursor_execute', _fim_consulta)
+        event.listen(engine, 'handle_error', _erro_consulta)
+
+    @app.before_request
+    def iniciar_medicao():
+        if request.endpoint == 'metricas':
+            return
+        g.metricas = {'inicio': time.perf_counter(), 'consultas': 0, 'tempo_sql': 0.0, 'instrucoes': []}
+
+    @app.after_request
+    def registrar_medicao(response):
+        medicao = g.pop('metricas', None)
+        if medicao is None:
+            return response
+        duracao = time.perf_counter() - medicao['inicio']
+        endpoint = request.endpoint or 'sem_rota'
+        registro.incrementar('http_requisicoes_total', {
+            'endpoint': endpoint, 'metodo': request.method, 'status': str(response.status_code)
+        })
+        registro.observar('http_requisicao_duracao_segundos', {'endpoint': endpoint}, duracao)
+        registro.observar('sql_consultas_requisicao', {'endpoint': endpoint}, medicao['consultas'])
+        registro.observar('sql_duracao_requisicao_segundos', {'endpoint': endpoint}, medicao['tempo_sql'])
+        registro.marcar_alterado()
+
+        if lenta_ms is not None and duracao * 1000 >= lenta_ms:
+            instrucoes = '\n'.join(
+                f'  [{tempo * 1000:.1f} ms] {sql}' for tempo, sql in medicao['instrucoes']
+            )
+            current_app.logger.warning(
+                'Requisição lenta: %s %s (%s) %d em %.1f ms, %d consultas em %.1f ms\n%s',
+                request.method, request.full_path.rstrip('?'), endpoint, response.status_code,
+                duracao * 1000, medicao['consultas'], medicao['tempo_sql'] * 1000, instrucoes
+            )
+        return response
+
+    # Expor métricas no formato de texto do Prometheus
+    @app.route('/metrics', methods=['GET'], endpoint='metricas')
+    def metricas():
+        if token and request.headers.get('Authorization') != f'Bearer {token}':
+            return Response('Não autorizado\n', status=401, mimetype='text/plain')
+        return Response(
+            formatar_prometheus(registro.agregado()),
+            content_type='text/plain; version=0.0.4; charset=utf-8'
+        )
+
+    return registro
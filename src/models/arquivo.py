@@ -0,0 +1,197 @@
+import time
+from datetime import datetime
+
+from sqlalchemy import bindparam, text
+from src.models.user import db
+from src.models.pedido import CAMPOS_PEDIDO, RELACOES_PEDIDO, Pedido, PedidoInexistente
+from src.models.sqlite import transacao_imediata
+
+# Pedidos 'Arquivado' sem alteração há muito tempo saem das tabelas pedido e
+# comentario para pedido_arquivado e comentario_arquivado, com as mesmas
+# colunas. Listagens, buscas e índices da tabela principal deixam de pagar
+# por eles; o detalhe do pedido, ?incluir_arquivados=1 e a restauração
+# continuam alcançando os arquivados. Os ids são preservados.
+STATUS_ARQUIVADO = 'Arquivado'
+
+
+class ConflitoRestauracao(RuntimeError):
+    """O id do pedido arquivado já está em uso na tabela pedido"""
+
+
+class PedidoArquivado(db.Model):
+    __tablename__ = 'pedido_arquivado'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    titulo = db.Column(db.String(255), nullable=False)
+    descricao = db.Column(db.Text, nullable=False)
+    nome_solicitante = db.Column(db.String(255), nullable=False)
+    celular_solicitante = db.Column(db.String(20), nullable=True)
+    email_solicitante = db.Column(db.String(255), nullable=True)
+    status = db.Column(db.String(50), nullable=False)
+    data_submissao = db.Column(db.DateTime, nullable=False)
+    data_ultima_atualizacao = db.Column(db.DateTime, nullable=False)
+    visibilidade = db.Column(db.String(50), nullable=False)
+    usuario_criador_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    comentarios_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    ultimo_comentario_em = db.Column(db.DateTime, nullable=True)
+    data_arquivamento = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    # Só os índices de ?incluir_arquivados=1 (ramos de consultas_visiveis)
+    __table_args__ = (
+        db.Index('ix_pedido_arquivado_atualizacao', 'data_ultima_atualizacao', 'id'),
+        db.Index('ix_pedido_arquivado_visibilidade_atualizacao', 'visibilidade', 'data_ultima_atualizacao', 'id'),
+        db.Index('ix_pedido_arquivado_criador_atualizacao', 'usuario_criador_id', 'data_ultima_atualizacao', 'id'),
+    )
+
+    comentarios = db.relationship('ComentarioArquivado', backref='pedido', lazy=True)
+    usuario_criador = db.relationship('User', lazy=True)
+
+    def __repr__(self):
+        return f'<PedidoArquivado {self.titulo}>'
+
+    def to_dict(self, campos=CAMPOS_PEDIDO, incluir=RELACOES_PEDIDO):
+        """Mesmo formato de Pedido.to_dict, com 'arquivado' e 'data_arquivamento'"""
+        dados = Pedido.to_dict(self, campos, incluir)
+        dados['arquivado'] = True
+        dados['data_arquivamento'] = self.data_arquivamento
+        return dados
+
+
+class ComentarioArquivado(db.Model):
+    __tablename__ = 'comentario_arquivado'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    pedido_id = db.Column(db.Integer, db.ForeignKey('pedido_arquivado.id'), nullable=False)
+    autor = db.Column(db.String(255), nullable=False)
+    conteudo = db.Column(db.Text, nullable=False)
+    data_comentario = db.Column(db.DateTime, nullable=False)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_comentario_arquivado_pedido_data', 'pedido_id', 'data_comentario', 'id'),
+    )
+
+    usuario = db.relationship('User', lazy=True)
+
+    def __repr__(self):
+        return f'<ComentarioArquivado {self.id}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'pedido_id': self.pedido_id,
+            'autor': self.autor,
+            'conteudo': self.conteudo,
+            'data_comentario': self.data_comentario,
+            'usuario_id': self.usuario_id,
+            'usuario': self.usuario.username if self.usuario else None
+        }
+
+
+_COLUNAS_PEDIDO = ', '.join(CAMPOS_PEDIDO)
+_COLUNAS_COMENTARIO = 'pedido_id, autor, conteudo, data_comentario, usuario_id'
+
+# Candidatos a arquivar, na ordem do índice (status, data_ultima_atualizacao, id).
+# pedido e comentario são AUTOINCREMENT (migração v5): os ids movidos para o
+# arquivo nunca são reaproveitados por pedidos e comentários novos.
+_CANDIDATOS = text("""
+    SELECT id FROM pedido
+    WHERE status = :status AND data_ultima_atualizacao < :antes_de
+      AND NOT EXISTS (SELECT 1 FROM pedido_arquivado a WHERE a.id = pedido.id)
+    ORDER BY data_ultima_atualizacao, id
+    LIMIT :limite
+""").bindparams(bindparam('antes_de', type_=db.DateTime))
+
+# Datas nos text() sempre com o tipo DateTime: gravadas e comparadas no mesmo
+# formato que o ORM usa, sem o adaptador de datetime do sqlite3 (obsoleto
+# desde o Python 3.12)
+_AGORA = bindparam('agora', type_=db.DateTime)
+
+
+def _copiar_comentarios(conn, origem, destino, pedido_ids):
+    # Comentários com id já usado no destino (só em bancos que reaproveitaram
+    # ids antes da migração v5) recebem um id novo: INSERT de NULL na chave
+    # primária inteira
+    conn.execute(text(f"""
+        INSERT INTO {destino} (id, {_COLUNAS_COMENTARIO})
+        SELECT CASE WHEN EXISTS (SELECT 1 FROM {destino} d WHERE d.id = o.id) THEN NULL ELSE o.id END,
+               {', '.join('o.' + coluna for coluna in _COLUNAS_COMENTARIO.split(', '))}
+        FROM {origem} o WHERE o.pedido_id IN :ids ORDER BY o.id
+    """).bindparams(bindparam('ids', value=list(pedido_ids), expanding=True)))
+
+
+def _mover_lote(conn, antes_de, tamanho_lote):
+    ids = conn.execute(
+        _CANDIDATOS, {'status': STATUS_ARQUIVADO, 'antes_de': antes_de, 'limite': tamanho_lote}
+    ).scalars().all()
+    if not ids:
+        return ids
+
+    lista = bindparam('ids', value=ids, expanding=True)
+    conn.execute(text(f"""
+        INSERT INTO pedido_arquivado ({_COLUNAS_PEDIDO}, data_arquivamento)
+        SELECT {_COLUNAS_PEDIDO}, :agora FROM pedido WHERE id IN :ids
+    """).bindparams(lista, _AGORA), {'agora': datetime.utcnow()})
+    _copiar_comentarios(conn, 'comentario', 'comentario_arquivado', ids)
+    # Comentários antes do pedido (foreign_keys=ON). Os triggers cuidam do
+    # índice de busca e dos contadores de status
+    conn.execute(text("DELETE FROM comentario WHERE pedido_id IN :ids").bindparams(lista))
+    conn.execute(text("DELETE FROM pedido WHERE id IN :ids").bindparams(lista))
+    return ids
+
+
+def arquivar_pedidos(engine, antes_de, tamanho_lote=200, pausa=0.05, ao_mover=None):
+    """Move pedidos 'Arquivado' sem alteração desde `antes_de` para o arquivo.
+
+    Cada lote de até `tamanho_lote` pedidos, com seus comentários, é movido
+    em uma transação curta, numa conexão tomada só para ela, e entre lotes há
+    `pausa` segundos para as escritas das requisições. ao_mover(ids), se
+    informado, é chamado após cada commit. Retorna o total de pedidos movidos.
+    """
+    total = 0
+    while True:
+        # BEGIN IMMEDIATE: dois processos arquivando ao mesmo tempo se revezam
+        # em vez de escolher os mesmos pedidos
+        with transacao_imediata(engine) as conn:
+            ids = _mover_lote(conn, antes_de, tamanho_lote)
+        if not ids:
+            return total
+        total += len(ids)
+        if ao_mover is not None:
+            ao_mover(ids)
+        if len(ids) < tamanho_lote:
+            return total
+        time.sleep(pausa)
+
+
+def restaurar_pedido(engine, pedido_id, status=None):
+    """Devolve um pedido arquivado, com os comentários, à tabela pedido.
+
+    data_ultima_atualizacao passa a ser agora (o pedido não volta ao arquivo
+    no próximo ciclo) e, se informado, o status é trocado. Os contadores de
+    comentários são refeitos pelos triggers ao reinserir os comentários.
+    Levanta PedidoInexistente se o pedido não estiver no arquivo.
+    """
+    agora = datetime.utcnow()
+    with transacao_imediata(engine) as conn:
+        parametros = {'id': pedido_id}
+        if conn.execute(text("SELECT 1 FROM pedido_arquivado WHERE id = :id"), parametros).first() is None:
+            raise PedidoInexistente(pedido_id)
+        if conn.execute(text("SELECT 1 FROM pedido WHERE id = :id"), parametros).first() is not None:
+            raise ConflitoRestauracao(f'O id {pedido_id} já está em uso por outro pedido')
+
+        colunas = [c for c in CAMPOS_PEDIDO if c not in ('comentarios_count', 'ultimo_comentario_em')]
+        valores = [
+            ':agora' if c == 'data_ultima_atualizacao'
+            else 'COALESCE(:status, status)' if c == 'status'
+            else c
+            for c in colunas
+        ]
+        conn.execute(text(f"""
+            INSERT INTO pedido ({', '.join(colunas)})
+            SELECT {', '.join(valores)} FROM pedido_arquivado WHERE id = :id
+        """).bindparams(_AGORA), {**parametros, 'agora': agora, 'status': status})
+        _copiar_comentarios(conn, 'comentario_arquivado', 'comentario', [pedido_id])
+        conn.execute(text("DELETE FROM comentario_arquivado WHERE pedido_id = :id"), parametros)
+        conn.execute(text("DELETE FROM pedido_arquivado WHERE id = :id"), parametros)
+    return agora
@@ -0,0 +1,159 @@
+import re
+
+from flask import current_app
+from sqlalchemy import column, func, literal_column, select, table, text
+from sqlalchemy.exc import OperationalError
+from src.models.user import db
+
+# Índice FTS5 de conteúdo externo sobre a tabela pedido. O tokenizer unicode61
+# com remove_diacritics 2 ignora acentos e cedilha, então "oracao" encontra
+# "Oração" e "acao" encontra "Ação".
+TABELA_BUSCA = 'pedido_busca'
+
+_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {TABELA_BUSCA} USING fts5(
+        titulo, descricao, nome_solicitante,
+        content='pedido', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS pedido_busca_ai AFTER INSERT ON pedido BEGIN
+        INSERT INTO {TABELA_BUSCA}(rowid, titulo, descricao, nome_solicitante)
+        VALUES (new.id, new.titulo, new.descricao, new.nome_solicitante);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS pedido_busca_ad AFTER DELETE ON pedido BEGIN
+        INSERT INTO {TABELA_BUSCA}({TABELA_BUSCA}, rowid, titulo, descricao, nome_solicitante)
+        VALUES ('delete', old.id, old.titulo, old.descricao, old.nome_solicitante);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS pedido_busca_au
+    AFTER UPDATE OF titulo, descricao, nome_solicitante ON pedido BEGIN
+        INSERT INTO {TABELA_BUSCA}({TABELA_BUSCA}, rowid, titulo, descricao, nome_solicitante)
+        VALUES ('delete', old.id, old.titulo, old.descricao, old.nome_solicitante);
+        INSERT INTO {TABELA_BUSCA}(rowid, titulo, descricao, nome_solicitante)
+        VALUES (new.id, new.titulo, new.descricao, new.nome_solicitante);
+    END
+    """,
+]
+
+# Índice separado para pedido_arquivado (src/models/arquivo.py). Linhas do
+# arquivo só são inseridas e removidas, nunca alteradas
+TABELA_BUSCA_ARQUIVO = 'pedido_arquivado_busca'
+
+_DDL_ARQUIVO = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {TABELA_BUSCA_ARQUIVO} USING fts5(
+        titulo, descricao, nome_solicitante,
+        content='pedido_arquivado', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS pedido_arquivado_busca_ai AFTER INSERT ON pedido_arquivado BEGIN
+        INSERT INTO {TABELA_BUSCA_ARQUIVO}(rowid, titulo, descricao, nome_solicitante)
+        VALUES (new.id, new.titulo, new.descricao, new.nome_solicitante);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS pedido_arquivado_busca_ad AFTER DELETE ON pedido_arquivado BEGIN
+        INSERT INTO {TABELA_BUSCA_ARQUIVO}({TABELA_BUSCA_ARQUIVO}, rowid, titulo, descricao, nome_solicitante)
+        VALUES ('delete', old.id, old.titulo, old.descricao, old.nome_solicitante);
+    END
+    """,
+]
+
+_INDICES = ((TABELA_BUSCA, _DDL), (TABELA_BUSCA_ARQUIVO, _DDL_ARQUIVO))
+
+pedido_busca = table(TABELA_BUSCA, column('rowid'))
+
+
+def instalar_indice_busca(engine):
+    """Cria os índices FTS5 e os triggers de sincronização, se ainda não existirem.
+
+    Em bancos que já tinham pedidos, um índice recém-criado é populado na hora.
+    Retorna False quando o banco não é SQLite ou não tem FTS5 compilado.
+    """
+    if engine.dialect.name != 'sqlite':
+        return False
+    try:
+        with engine.begin() as conn:
+            for tabela, ddls in _INDICES:
+                existia = conn.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE name = :nome"),
+                    {'nome': tabela}
+                ).first() is not None
+                for ddl in ddls:
+                    conn.execute(text(ddl))
+                if not existia:
+                    _reconstruir(conn, tabela)
+    except OperationalError:
+        return False
+    return True
+
+
+def indice_busca_disponivel(tabela=TABELA_BUSCA):
+    """Indica se o banco da app tem o índice FTS5 `tabela` (verificado uma vez por app)"""
+    chave = 'BUSCA_FTS' if tabela == TABELA_BUSCA else f'BUSCA_FTS_{tabela.upper()}'
+    disponivel = current_app.config.get(chave)
+    if disponivel is None:
+        if db.engine.dialect.name != 'sqlite':
+            disponivel = False
+        else:
+            with db.engine.connect() as conn:
+                disponivel = conn.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE name = :nome"),
+                    {'nome': tabela}
+                ).first() is not None
+        current_app.config[chave] = disponivel
+    return disponivel
+
+
+def reconstruir_indice_busca(engine):
+    """Reconstrói os índices a partir das tabelas pedido e pedido_arquivado"""
+    with engine.begin() as conn:
+        for tabela, _ in _INDICES:
+            _reconstruir(conn, tabela)
+
+
+def _reconstruir(conn, tabela):
+    conn.execute(text(f"INSERT INTO {tabela}({tabela}) VALUES ('rebuild')"))
+
+
+def expressao_busca(termo):
+    """Converte o texto digitado em uma consulta FTS5 segura.
+
+    Cada palavra vira uma frase entre aspas com busca por prefixo, e todas
+    precisam aparecer: 'saude fam' -> '"saude"* "fam"*'. Retorna None se não
+    sobrar nenhuma palavra.
+    """
+    palavras = re.findall(r'\w+', termo)
+    if not palavras:
+        return None
+    return ' '.join('"{}"*'.format(p.replace('"', '""')) for p in palavras)
+
+
+def ids_busca(expressao, tabela=TABELA_BUSCA):
+    """SELECT dos ids que casam com a expressão no índice `tabela`, sem ordenar"""
+    indice = table(tabela, column('rowid'))
+    return (
+        select(indice.c.rowid)
+        .where(literal_column(tabela).op('MATCH')(expressao))
+    )
+
+
+def resultados_busca(expressao):
+    """Subconsulta (rowid, rank) dos pedidos que casam com a expressão, por bm25"""
+    return (
+        pedido_busca.select()
+        .with_only_columns(
+            pedido_busca.c.rowid.label('pedido_id'),
+            func.bm25(literal_column(TABELA_BUSCA)).label('rank')
+        )
+        .where(literal_column(TABELA_BUSCA).op('MATCH')(expressao))
+        .subquery()
+    )
@@ -0,0 +1,151 @@
+from sqlalchemy import func, text
+from src.models.user import db
+from src.models.arquivo import PedidoArquivado
+from src.models.pedido import VISIBILIDADE_TODOS, Pedido
+
+class ContadorStatus(db.Model):
+    """Quantidade de pedidos por status e visibilidade, mantida por triggers em pedido e pedido_arquivado"""
+    __tablename__ = 'contador_status'
+
+    status = db.Column(db.String(50), primary_key=True)
+    visibilidade = db.Column(db.String(50), primary_key=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<ContadorStatus {self.status}/{self.visibilidade}={self.total}>'
+
+# Os triggers cobrem qualquer caminho de escrita (ORM, UPDATE em massa, SQL
+# manual, exclusão em cascata), então os contadores nunca divergem das tabelas
+_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS contador_status_ai AFTER INSERT ON pedido BEGIN
+        INSERT INTO contador_status(status, visibilidade, total) VALUES (new.status, new.visibilidade, 1)
+        ON CONFLICT(status, visibilidade) DO UPDATE SET total = total + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS contador_status_ad AFTER DELETE ON pedido BEGIN
+        UPDATE contador_status SET total = total - 1
+        WHERE status = old.status AND visibilidade = old.visibilidade;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS contador_status_au AFTER UPDATE OF status, visibilidade ON pedido
+    WHEN old.status IS NOT new.status OR old.visibilidade IS NOT new.visibilidade BEGIN
+        UPDATE contador_status SET total = total - 1
+        WHERE status = old.status AND visibilidade = old.visibilidade;
+        INSERT INTO contador_status(status, visibilidade, total) VALUES (new.status, new.visibilidade, 1)
+        ON CONFLICT(status, visibilidade) DO UPDATE SET total = total + 1;
+    END
+    """,
+    # Pedidos movidos para o arquivo continuam contados: mover é -1 em pedido
+    # e +1 em pedido_arquivado, e as estatísticas não mudam
+    """
+    CREATE TRIGGER IF NOT EXISTS contador_status_arquivo_ai AFTER INSERT ON pedido_arquivado BEGIN
+        INSERT INTO contador_status(status, visibilidade, total) VALUES (new.status, new.visibilidade, 1)
+        ON CONFLICT(status, visibilidade) DO UPDATE SET total = total + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS contador_status_arquivo_ad AFTER DELETE ON pedido_arquivado BEGIN
+        UPDATE contador_status SET total = total - 1
+        WHERE status = old.status AND visibilidade = old.visibilidade;
+    END
+    """,
+    # pedido.comentarios_count / ultimo_comentario_em
+    """
+    CREATE TRIGGER IF NOT EXISTS comentario_contador_ai AFTER INSERT ON comentario BEGIN
+        UPDATE pedido SET
+            comentarios_count = comentarios_count + 1,
+            ultimo_comentario_em = MAX(COALESCE(ultimo_comentario_em, new.data_comentario), new.data_comentario)
+        WHERE id = new.pedido_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS comentario_contador_ad AFTER DELETE ON comentario BEGIN
+        UPDATE pedido SET
+            comentarios_count = comentarios_count - 1,
+            ultimo_comentario_em = (
+                SELECT MAX(data_comentario) FROM comentario WHERE pedido_id = old.pedido_id
+            )
+        WHERE id = old.pedido_id;
+    END
+    """,
+]
+
+
+def instalar_contadores(engine):
+    """Cria os triggers dos contadores e recalcula os totais na primeira instalação.
+
+    Cada conjunto de triggers é verificado separadamente, para que bancos que
+    já tinham os contadores de status recebam os de comentários e os do arquivo.
+
+    Espera que a tabela contador_status já exista (db.create_all).
+    """
+    if engine.dialect.name != 'sqlite':
+        return False
+    with engine.begin() as conn:
+        existentes = set(conn.execute(text(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' "
+            "AND name IN ('contador_status_ai', 'contador_status_arquivo_ai', 'comentario_contador_ai')"
+        )).scalars())
+        for ddl in _TRIGGERS:
+            conn.execute(text(ddl))
+        if not {'contador_status_ai', 'contador_status_arquivo_ai'} <= existentes:
+            _recalcular_status(conn)
+        if 'comentario_contador_ai' not in existentes:
+            _recalcular_comentarios(conn)
+    return True
+
+
+def recalcular_contadores(engine):
+    """Recalcula os contadores de status e de comentários a partir das tabelas"""
+    with engine.begin() as conn:
+        _recalcular_status(conn)
+        _recalcular_comentarios(conn)
+
+
+def _recalcular_comentarios(conn):
+    conn.execute(text(
+        "UPDATE pedido SET "
+        "comentarios_count = (SELECT COUNT(*) FROM comentario WHERE pedido_id = pedido.id), "
+        "ultimo_comentario_em = (SELECT MAX(data_comentario) FROM comentario WHERE pedido_id = pedido.id)"
+    ))
+
+
+def _recalcular_status(conn):
+    conn.execute(text("DELETE FROM contador_status"))
+    conn.execute(text(
+        "INSERT INTO contador_status(status, visibilidade, total) "
+        "SELECT status, visibilidade, COUNT(*) FROM ("
+        "SELECT status, visibilidade FROM pedido "
+        "UNION ALL SELECT status, visibilidade FROM pedido_arquivado"
+        ") GROUP BY status, visibilidade"
+    ))
+
+
+def contagem_por_status(usuario=None):
+    """Lê {status: total} dos pedidos visíveis a `usuario` (todos, se None ou admin).
+
+    Inclui os pedidos arquivados. Para usuários comuns soma os contadores de
+    visibilidade 'Todos' e conta à parte os próprios pedidos restritos, nas
+    duas tabelas, pelos índices de usuario_criador_id.
+    """
+    linhas = db.session.query(
+        ContadorStatus.status, func.sum(ContadorStatus.total)
+    ).filter(ContadorStatus.total > 0).group_by(ContadorStatus.status)
+    if usuario is None or usuario.is_admin:
+        return {status: total for status, total in linhas}
+
+    por_status = {
+        status: total
+        for status, total in linhas.filter(ContadorStatus.visibilidade == VISIBILIDADE_TODOS)
+    }
+    for modelo in (Pedido, PedidoArquivado):
+        proprios = db.session.query(modelo.status, func.count()).filter(
+            modelo.usuario_criador_id == usuario.id,
+            modelo.visibilidade != VISIBILIDADE_TODOS
+        ).group_by(modelo.status)
+        for status, total in proprios:
+            por_status[status] = por_status.get(status, 0) + total
+    return por_status
@@ -0,0 +1,201 @@
+from sqlalchemy import inspect
+from src.models.user import db
+
+# Migrações versionadas do schema. A versão aplicada fica em PRAGMA
+# user_version, no próprio arquivo do banco. Bancos novos são criados direto
+# na versão mais recente por db.create_all(); as migrações só atualizam
+# arquivos app.db já existentes.
+#
+# Para alterar o schema: ajuste o modelo e acrescente aqui uma função com o
+# SQL equivalente para bancos antigos, com o próximo número de versão.
+
+
+def _v1_indices(conn):
+    """Índices secundários de pedido e comentario"""
+    for ddl in (
+        "CREATE INDEX IF NOT EXISTS ix_pedido_atualizacao ON pedido (data_ultima_atualizacao, id)",
+        "CREATE INDEX IF NOT EXISTS ix_pedido_status_atualizacao ON pedido (status, data_ultima_atualizacao, id)",
+        "CREATE INDEX IF NOT EXISTS ix_pedido_visibilidade_atualizacao ON pedido (visibilidade, data_ultima_atualizacao, id)",
+        "CREATE INDEX IF NOT EXISTS ix_pedido_criador_atualizacao ON pedido (usuario_criador_id, data_ultima_atualizacao, id)",
+        "CREATE INDEX IF NOT EXISTS ix_pedido_data_submissao ON pedido (data_submissao)",
+        "CREATE INDEX IF NOT EXISTS ix_comentario_pedido_data ON comentario (pedido_id, data_comentario, id)",
+        "CREATE INDEX IF NOT EXISTS ix_comentario_usuario ON comentario (usuario_id)",
+    ):
+        conn.exec_driver_sql(ddl)
+
+
+def _v2_contadores_comentarios(conn):
+    """Colunas pedido.comentarios_count e pedido.ultimo_comentario_em.
+
+    O preenchimento e os triggers ficam com instalar_contadores, que roda logo
+    após as migrações.
+    """
+    conn.exec_driver_sql(
+        "ALTER TABLE pedido ADD COLUMN comentarios_count INTEGER NOT NULL DEFAULT 0"
+    )
+    conn.exec_driver_sql("ALTER TABLE pedido ADD COLUMN ultimo_comentario_em DATETIME")
+
+
+def _v3_contador_status_visibilidade(conn):
+    """contador_status passa a ter chave (status, visibilidade).
+
+    A tabela é recriada vazia e os triggers antigos são removidos; em seguida
+    instalar_contadores recria os triggers e recalcula os totais.
+    """
+    for nome in ('contador_status_ai', 'contador_status_ad', 'contador_status_au'):
+        conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {nome}")
+    conn.exec_driver_sql("DROP TABLE IF EXISTS contador_status")
+    conn.exec_driver_sql(
+        "CREATE TABLE contador_status ("
+        "status VARCHAR(50) NOT NULL, "
+        "visibilidade VARCHAR(50) NOT NULL, "
+        "total INTEGER NOT NULL, "
+        "PRIMARY KEY (status, visibilidade))"
+    )
+
+
+def _v4_indices_usuario(conn):
+    """Índices da listagem paginada e da busca por prefixo de usuários"""
+    for ddl in (
+        'CREATE INDEX IF NOT EXISTS ix_user_criacao ON "user" (data_criacao, id)',
+        'CREATE INDEX IF NOT EXISTS ix_user_username_nocase ON "user" (username COLLATE NOCASE)',
+        'CREATE INDEX IF NOT EXISTS ix_user_email_nocase ON "user" (email COLLATE NOCASE)',
+        'CREATE INDEX IF NOT EXISTS ix_user_nome_nocase ON "user" (nome_completo COLLATE NOCASE)',
+    ):
+        conn.exec_driver_sql(ddl)
+
+
+_PEDIDO_V5 = """
+    CREATE TABLE pedido_v5 (
+        id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,
+        titulo VARCHAR(255) NOT NULL,
+        descricao TEXT NOT NULL,
+        nome_solicitante VARCHAR(255) NOT NULL,
+        celular_solicitante VARCHAR(20),
+        email_solicitante VARCHAR(255),
+        status VARCHAR(50) NOT NULL,
+        data_submissao DATETIME NOT NULL,
+        data_ultima_atualizacao DATETIME NOT NULL,
+        visibilidade VARCHAR(50) NOT NULL,
+        usuario_criador_id INTEGER,
+        comentarios_count INTEGER DEFAULT '0' NOT NULL,
+        ultimo_comentario_em DATETIME,
+        FOREIGN KEY(usuario_criador_id) REFERENCES user (id)
+    )
+"""
+
+_COMENTARIO_V5 = """
+    CREATE TABLE comentario_v5 (
+        id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,
+        pedido_id INTEGER NOT NULL,
+        autor VARCHAR(255) NOT NULL,
+        conteudo TEXT NOT NULL,
+        data_comentario DATETIME NOT NULL,
+        usuario_id INTEGER,
+        FOREIGN KEY(pedido_id) REFERENCES pedido (id),
+        FOREIGN KEY(usuario_id) REFERENCES user (id)
+    )
+"""
+
+
+def _v5_ids_autoincrement(conn):
+    """pedido e comentario passam a ter AUTOINCREMENT.
+
+    Sem ele o SQLite usa o maior id + 1, e os ids que só existem no arquivo
+    voltam a ser usados quando o pedido de maior id é excluído. O SQLite não
+    altera a chave primária no lugar: as tabelas são recriadas com os mesmos
+    ids e a sequência parte do maior id já usado, arquivo incluído. Os
+    triggers das duas tabelas são removidos; instalar_indice_busca e
+    instalar_contadores os recriam logo após as migrações.
+    """
+    colunas_pedido = (
+        'id, titulo, descricao, nome_solicitante, celular_solicitante, email_solicitante, status, '
+        'data_submissao, data_ultima_atualizacao, visibilidade, usuario_criador_id, '
+        'comentarios_count, ultimo_comentario_em'
+    )
+    colunas_comentario = 'id, pedido_id, autor, conteudo, data_comentario, usuario_id'
+    # Removidos antes: um trigger de comentario que cita pedido impediria o
+    # RENAME enquanto pedido não existe
+    triggers = conn.exec_driver_sql(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name IN ('pedido', 'comentario')"
+    ).scalars().all()
+    for nome in triggers:
+        conn.exec_driver_sql(f"DROP TRIGGER {nome}")
+    for (tabela, ddl, colunas) in (
+        ('pedido', _PEDIDO_V5, colunas_pedido),
+        ('comentario', _COMENTARIO_V5, colunas_comentario),
+    ):
+        conn.exec_driver_sql(ddl)
+        conn.exec_driver_sql(f"INSERT INTO {tabela}_v5 ({colunas}) SELECT {colunas} FROM {tabela}")
+        conn.exec_driver_sql(f"DROP TABLE {tabela}")
+        conn.exec_driver_sql(f"ALTER TABLE {tabela}_v5 RENAME TO {tabela}")
+        # O RENAME leva junto a linha da cópia em sqlite_sequence, que só
+        # conhece os ids da tabela principal
+        conn.exec_driver_sql(f"DELETE FROM sqlite_sequence WHERE name = '{tabela}'")
+        conn.exec_driver_sql(
+            f"INSERT INTO sqlite_sequence (name, seq) SELECT '{tabela}', COALESCE(MAX(id), 0) FROM "
+            f"(SELECT MAX(id) AS id FROM {tabela} UNION ALL SELECT MAX(id) FROM {tabela}_arquivado)"
+        )
+    # Os índices de pedido e comentario também foram removidos com as tabelas
+    _v1_indices(conn)
+
+
+MIGRACOES = [
+    (1, _v1_indices),
+    (2, _v2_contadores_comentarios),
+    (3, _v3_contador_status_visibilidade),
+    (4, _v4_indices_usuario),
+    (5, _v5_ids_autoincrement),
+]
+
+VERSAO_ATUAL = MIGRACOES[-1][0]
+
+
+def versao_schema(conn):
+    return conn.exec_driver_sql('PRAGMA user_version').scalar()
+
+
+def aplicar_migracoes(engine):
+    """Aplica as migrações pendentes e retorna as versões aplicadas.
+
+    Tudo roda em uma única transação BEGIN IMMEDIATE: se dois processos
+    subirem juntos, o segundo espera o lock e encontra o banco já atualizado.
+    Como pede a documentação do SQLite para recriar tabelas, foreign_keys fica
+    desligado durante a transação (só pode ser trocado fora dela) e
+    PRAGMA foreign_key_check confere as referências antes do COMMIT.
+    """
+    aplicadas = []
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        conn.exec_driver_sql('PRAGMA foreign_keys = OFF')
+        try:
+            conn.exec_driver_sql('BEGIN IMMEDIATE')
+            try:
+                versao = versao_schema(conn)
+                for numero, migracao in MIGRACOES:
+                    if numero > versao:
+                        migracao(conn)
+                        aplicadas.append(numero)
+                if aplicadas:
+                    violacao = conn.exec_driver_sql('PRAGMA foreign_key_check').first()
+                    if violacao is not None:
+                        raise RuntimeError(f'Referência inválida após as migrações: {tuple(violacao)}')
+                    conn.exec_driver_sql(f'PRAGMA user_version = {aplicadas[-1]}')
+                conn.exec_driver_sql('COMMIT')
+            except Exception:
+                conn.exec_driver_sql('ROLLBACK')
+                raise
+        finally:
+            conn.exec_driver_sql('PRAGMA foreign_keys = ON')
+    return aplicadas
+
+
+def atualizar_schema():
+    """Cria as tabelas que faltam e leva o banco à versão atual do schema"""
+    engine = db.engine
+    banco_novo = not inspect(engine).has_table('pedido')
+    db.create_all()
+    if banco_novo:
+        with engine.begin() as conn:
+            conn.exec_driver_sql(f'PRAGMA user_version = {VERSAO_ATUAL}')
+        return []
+    return aplicar_migracoes(engine)
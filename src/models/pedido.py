@@ -1,6 +1,23 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
-from src.models.user import db
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.orm import joinedload, load_only, selectinload
+from src.models.user import db, User
+
+# Colunas que podem ser pedidas em ?fields= e relações aceitas em ?include=
+CAMPOS_PEDIDO = (
+    'id', 'titulo', 'descricao', 'nome_solicitante', 'celular_solicitante',
+    'email_solicitante', 'status', 'data_submissao', 'data_ultima_atualizacao',
+    'visibilidade', 'usuario_criador_id', 'comentarios_count', 'ultimo_comentario_em'
+)
+RELACOES_PEDIDO = ('usuario_criador', 'comentarios')
+
+# Valores de Pedido.visibilidade: visível a todos, só a administradores, ou só
+# ao criador (e administradores). O criador sempre vê os próprios pedidos.
+VISIBILIDADE_TODOS = 'Todos'
+VISIBILIDADE_ADMINISTRADORES = 'Administradores'
+VISIBILIDADE_CRIADOR = 'Criador'
+VISIBILIDADES = (VISIBILIDADE_TODOS, VISIBILIDADE_ADMINISTRADORES, VISIBILIDADE_CRIADOR)
 
 class Pedido(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -14,6 +31,22 @@ class Pedido(db.Model):
     data_ultima_atualizacao = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     visibilidade = db.Column(db.String(50), nullable=False, default='Todos')
     usuario_criador_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    # Mantidos por triggers na tabela comentario (ver src/models/estatistica.py)
+    comentarios_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    ultimo_comentario_em = db.Column(db.DateTime, nullable=True)
+    
+    # Índices alinhados à listagem por cursor: cada filtro seguido da ordenação
+    # (data_ultima_atualizacao, id), para que o SQLite não precise ordenar.
+    # AUTOINCREMENT: um id nunca é reaproveitado, nem o de um pedido que está
+    # no arquivo (pedido_arquivado)
+    __table_args__ = (
+        db.Index('ix_pedido_atualizacao', 'data_ultima_atualizacao', 'id'),
+        db.Index('ix_pedido_status_atualizacao', 'status', 'data_ultima_atualizacao', 'id'),
+        db.Index('ix_pedido_visibilidade_atualizacao', 'visibilidade', 'data_ultima_atualizacao', 'id'),
+        db.Index('ix_pedido_criador_atualizacao', 'usuario_criador_id', 'data_ultima_atualizacao', 'id'),
+        db.Index('ix_pedido_data_submissao', 'data_submissao'),
+        {'sqlite_autoincrement': True},
+    )
     
     # Relacionamentos
     comentarios = db.relationship('Comentario', backref='pedido', lazy=True, cascade='all, delete-orphan')
@@ -22,22 +55,19 @@ class Pedido(db.Model):
     def __repr__(self):
         return f'<Pedido {self.titulo}>'
 
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'titulo': self.titulo,
-            'descricao': self.descricao,
-            'nome_solicitante': self.nome_solicitante,
-            'celular_solicitante': self.celular_solicitante,
-            'email_solicitante': self.email_solicitante,
-            'status': self.status,
-            'data_submissao': self.data_submissao.isoformat() if self.data_submissao else None,
-            'data_ultima_atualizacao': self.data_ultima_atualizacao.isoformat() if self.data_ultima_atualizacao else None,
-            'visibilidade': self.visibilidade,
-            'usuario_criador_id': self.usuario_criador_id,
-            'usuario_criador': self.usuario_criador.username if self.usuario_criador else None,
-            'comentarios': [comentario.to_dict() for comentario in self.comentarios]
-        }
+    def to_dict(self, campos=CAMPOS_PEDIDO, incluir=RELACOES_PEDIDO):
+        """Serializa apenas `campos` e as relações em `incluir`.
+
+        Só toca atributos que opcoes_serializacao(campos, incluir) carregou,
+        então uma projeção nunca dispara consultas extras. Datas ficam como
+        datetime; o ProvedorJSON as formata em ISO 8601.
+        """
+        dados = {campo: getattr(self, campo) for campo in campos}
+        if 'usuario_criador' in incluir:
+            dados['usuario_criador'] = self.usuario_criador.username if self.usuario_criador else None
+        if 'comentarios' in incluir:
+            dados['comentarios'] = [comentario.to_dict() for comentario in self.comentarios]
+        return dados
 
 class Comentario(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -47,6 +77,12 @@ class Comentario(db.Model):
     data_comentario = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     usuario_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
     
+    __table_args__ = (
+        db.Index('ix_comentario_pedido_data', 'pedido_id', 'data_comentario', 'id'),
+        db.Index('ix_comentario_usuario', 'usuario_id'),
+        {'sqlite_autoincrement': True},
+    )
+    
     # Relacionamento
     usuario = db.relationship('User', backref='comentarios', lazy=True)
 
@@ -59,7 +95,143 @@ class Comentario(db.Model):
             'pedido_id': self.pedido_id,
             'autor': self.autor,
             'conteudo': self.conteudo,
-            'data_comentario': self.data_comentario.isoformat() if self.data_comentario else None,
+            'data_comentario': self.data_comentario,
             'usuario_id': self.usuario_id,
             'usuario': self.usuario.username if self.usuario else None
         }
+
+
+def opcoes_serializacao(campos=CAMPOS_PEDIDO, incluir=RELACOES_PEDIDO, modelo=None):
+    """Opções de carregamento para Pedido.to_dict(campos, incluir) sem consultas N+1.
+
+    Só as colunas pedidas entram no SELECT (load_only), então uma listagem
+    sem 'descricao' nunca lê esse Text do banco. O criador vem no mesmo SELECT
+    (JOIN) e os comentários, com seus autores, em um único SELECT ... IN
+    adicional, independentemente de quantos pedidos. `modelo` é Pedido por
+    padrão, ou PedidoArquivado (src/models/arquivo.py).
+    """
+    modelo = modelo or Pedido
+    colunas = [getattr(modelo, campo) for campo in campos]
+    if hasattr(modelo, 'data_arquivamento'):
+        # PedidoArquivado.to_dict sempre lê data_arquivamento
+        colunas.append(modelo.data_arquivamento)
+    opcoes = [load_only(*colunas)]
+    if 'usuario_criador' in incluir:
+        opcoes.append(joinedload(modelo.usuario_criador).load_only(User.username))
+    if 'comentarios' in incluir:
+        comentario = modelo.comentarios.property.mapper.class_
+        opcoes.append(
+            selectinload(modelo.comentarios).joinedload(comentario.usuario).load_only(User.username)
+        )
+    return opcoes
+
+
+def carregar_pedido(pedido_id, campos=CAMPOS_PEDIDO, incluir=RELACOES_PEDIDO, modelo=None):
+    """Busca um pedido com o grafo a serializar ou aborta com 404"""
+    modelo = modelo or Pedido
+    return modelo.query.options(*opcoes_serializacao(campos, incluir, modelo)).get_or_404(pedido_id)
+
+
+def carregar_pedidos(ids, campos=CAMPOS_PEDIDO, incluir=RELACOES_PEDIDO, modelo=None):
+    """Busca os pedidos pelos ids, com o grafo a serializar, preservando a ordem dada"""
+    if not ids:
+        return []
+    modelo = modelo or Pedido
+    pedidos = modelo.query.options(
+        *opcoes_serializacao(campos, incluir, modelo)
+    ).filter(modelo.id.in_(ids)).all()
+    por_id = {pedido.id: pedido for pedido in pedidos}
+    return [por_id[i] for i in ids if i in por_id]
+
+
+def visivel_para(usuario, visibilidade, usuario_criador_id):
+    """Indica se `usuario` pode ver um pedido com essa visibilidade e criador"""
+    return (
+        usuario.is_admin
+        or visibilidade == VISIBILIDADE_TODOS
+        or (usuario_criador_id is not None and usuario_criador_id == usuario.id)
+    )
+
+
+def filtro_visibilidade(usuario, modelo=None):
+    """Predicado SQL dos pedidos que `usuario` pode ver (None para admins)"""
+    if usuario.is_admin:
+        return None
+    modelo = modelo or Pedido
+    return db.or_(
+        modelo.visibilidade == VISIBILIDADE_TODOS,
+        modelo.usuario_criador_id == usuario.id
+    )
+
+
+def consultas_visiveis(query, usuario, modelo=None):
+    """Divide `query` em ramos disjuntos que juntos cobrem o que `usuario` pode ver.
+
+    Um OR entre visibilidade e criador leva o SQLite a juntar os dois índices e
+    ordenar todas as linhas antes do LIMIT. Cada ramo aqui usa um índice já na
+    ordem (visibilidade, data_ultima_atualizacao, id) ou (usuario_criador_id,
+    data_ultima_atualizacao, id), e as páginas são intercaladas por
+    paginar_keyset_ramos.
+    """
+    if usuario.is_admin:
+        return [query]
+    modelo = modelo or Pedido
+    return [
+        query.filter(modelo.visibilidade == VISIBILIDADE_TODOS),
+        query.filter(
+            modelo.usuario_criador_id == usuario.id,
+            modelo.visibilidade != VISIBILIDADE_TODOS
+        ),
+    ]
+
+
+# Operações para o CommitAgrupado (src/utils/commit_agrupado.py). Rodam na
+# thread gravadora, numa conexão compartilhada pelo lote, sem sessão do ORM.
+
+class PedidoInexistente(LookupError):
+    """O pedido não existia mais quando a operação foi gravada"""
+
+
+def _tocar_pedido(pedido_id, data):
+    def tocar(conn):
+        # MAX: uma alteração de status mais recente no mesmo lote não é sobrescrita
+        conn.execute(
+            update(Pedido).where(Pedido.id == pedido_id)
+            .values(data_ultima_atualizacao=func.max(Pedido.data_ultima_atualizacao, data))
+        )
+    return tocar
+
+
+def operacao_comentario(pedido_id, autor, conteudo, usuario_id):
+    """Insere um comentário e retorna seu id.
+
+    A data_ultima_atualizacao do pedido é atualizada uma vez por lote, por
+    mais comentários que o pedido receba nele.
+    """
+    def operacao(conn, lote):
+        if conn.execute(select(Pedido.id).where(Pedido.id == pedido_id)).first() is None:
+            raise PedidoInexistente(pedido_id)
+        agora = datetime.utcnow()
+        comentario_id = conn.execute(
+            insert(Comentario).values(
+                pedido_id=pedido_id, autor=autor, conteudo=conteudo,
+                usuario_id=usuario_id, data_comentario=agora
+            ).returning(Comentario.id)
+        ).scalar_one()
+        lote.adiar(('pedido', pedido_id), _tocar_pedido(pedido_id, agora))
+        return comentario_id
+    return operacao
+
+
+def operacao_status(pedido_id, status):
+    """Altera o status de um pedido e retorna a nova data_ultima_atualizacao"""
+    def operacao(conn, lote):
+        agora = datetime.utcnow()
+        resultado = conn.execute(
+            update(Pedido).where(Pedido.id == pedido_id)
+            .values(status=status, data_ultima_atualizacao=agora)
+        )
+        if resultado.rowcount == 0:
+            raise PedidoInexistente(pedido_id)
+        return agora
+    return operacao
@@ -0,0 +1,91 @@
+import sqlite3
+
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql import Select
+
+from src.utils.cache import CacheLRU
+
+# Bind de leitura em SQLALCHEMY_BINDS. Nenhum modelo declara __bind_key__:
+# create_all e as migrações nunca tocam a réplica
+BIND_LEITURA = 'leitura'
+
+METODOS_LEITURA = frozenset(('GET', 'HEAD', 'OPTIONS'))
+
+
+class SessaoRoteada(Session):
+    """Sessão que envia os SELECTs das requisições de leitura ao bind 'leitura'.
+
+    Vão para a réplica só SELECTs fora de flush, em requisições GET/HEAD, de
+    usuários sem escrita recente (ver instalar_roteamento). Escritas,
+    requisições POST/PUT/DELETE, comandos e threads de fundo usam o banco
+    principal. Sem o bind configurado, nada muda.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and isinstance(clause, Select) and leitura_na_replica():
+            return self._db.engines[BIND_LEITURA]
+        return super().get_bind(mapper, clause=clause, bind=bind, **kwargs)
+
+
+def escrita_recente():
+    """Indica se o usuário da requisição escreveu há menos que a janela configurada"""
+    escritas = current_app.extensions.get('escritas_recentes')
+    usuario_id = g.get('usuario_id')
+    return escritas is not None and usuario_id is not None and escritas.obter(usuario_id) is not None
+
+
+def leitura_na_replica():
+    """Indica se os SELECTs da requisição atual podem ir para a réplica"""
+    return (
+        has_request_context()
+        and request.method in METODOS_LEITURA
+        and 'escritas_recentes' in current_app.extensions
+        and not escrita_recente()
+    )
+
+
+def instalar_roteamento(app, janela=5.0):
+    """Liga o roteamento de leituras e a consistência read-your-writes.
+
+    Depois de uma requisição de escrita bem-sucedida, as leituras do mesmo
+    usuário (g.usuario_id, definido por token_required) ficam no banco
+    principal por `janela` segundos, tempo para a réplica alcançá-lo.
+    A marca é por processo, como os caches de autenticação: com vários
+    workers, prefira a réplica mode=ro do próprio arquivo, que não tem atraso.
+    """
+    escritas = CacheLRU(maximo=8192, ttl=janela)
+    app.extensions['escritas_recentes'] = escritas
+
+    @app.after_request
+    def marcar_escrita(response):
+        if request.method not in METODOS_LEITURA and response.status_code < 400:
+            usuario_id = g.get('usuario_id')
+            if usuario_id is not None:
+                escritas.definir(usuario_id, True)
+        return response
+
+
+def _caminho_sqlite(url):
+    caminho = url.database or ''
+    return caminho[len('file:'):] if caminho.startswith('file:') else caminho
+
+
+def atualizar_replica(engine_principal, engine_leitura):
+    """Copia o banco principal sobre a réplica com a API de backup do SQLite.
+
+    Para réplicas em arquivo separado. A cópia é feita no próprio arquivo da
+    réplica, sob o lock dela: conexões abertas passam a ver a nova versão na
+    próxima transação.
+    """
+    origem = _caminho_sqlite(engine_principal.url)
+    destino = _caminho_sqlite(engine_leitura.url)
+    if not destino or destino == origem:
+        raise ValueError('A réplica de leitura é o próprio banco principal; não há o que copiar')
+    conexao_origem = sqlite3.connect(origem)
+    conexao_destino = sqlite3.connect(destino, timeout=30)
+    try:
+        conexao_origem.backup(conexao_destino)
+    finally:
+        conexao_destino.close()
+        conexao_origem.close()
@@ -0,0 +1,39 @@
+import sqlite3
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+
+def instalar_pragmas(engine, pragmas):
+    """Executa os PRAGMAs em toda conexão nova que o engine abrir"""
+    if engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _aplicar_pragmas(dbapi_connection, connection_record):
+        if not isinstance(dbapi_connection, sqlite3.Connection):
+            return
+        cursor = dbapi_connection.cursor()
+        try:
+            for nome, valor in pragmas.items():
+                cursor.execute(f'PRAGMA {nome}={valor}')
+        finally:
+            cursor.close()
+
+
+@contextmanager
+def transacao_imediata(engine):
+    """Conexão em BEGIN IMMEDIATE: o lock de escrita é tomado antes das leituras.
+
+    A conexão fica em AUTOCOMMIT para que o pysqlite não abra nem feche
+    transações por conta própria (ele não envia BEGIN antes de um SAVEPOINT,
+    e o RELEASE faria o commit): BEGIN e COMMIT são só os daqui.
+    """
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        conn.exec_driver_sql('BEGIN IMMEDIATE')
+        try:
+            yield conn
+            conn.exec_driver_sql('COMMIT')
+        except BaseException:
+            conn.exec_driver_sql('ROLLBACK')
+            raise
@@ -1,7 +1,17 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+from sqlalchemy import or_, text
+from sqlalchemy.orm import load_only
+from src.models.roteamento import SessaoRoteada
 
-db = SQLAlchemy()
+# Com um bind 'leitura' configurado, a sessão manda as leituras para a réplica
+db = SQLAlchemy(session_options={'class_': SessaoRoteada})
+
+# Colunas serializadas por User.to_dict, na ordem da resposta
+CAMPOS_USUARIO = ('id', 'username', 'email', 'nome_completo', 'is_admin', 'data_criacao', 'ultimo_login')
+
+# Colunas pesquisadas por prefixo em ?q=, cada uma com um índice NOCASE
+CAMPOS_BUSCA_USUARIO = ('username', 'email', 'nome_completo')
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -13,16 +23,42 @@ class User(db.Model):
     data_criacao = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     ultimo_login = db.Column(db.DateTime, nullable=True)
 
+    # (data_criacao, id) é a chave da listagem paginada. O LIKE do SQLite não
+    # diferencia maiúsculas, então a busca por prefixo só usa índices NOCASE
+    __table_args__ = (
+        db.Index('ix_user_criacao', 'data_criacao', 'id'),
+        db.Index('ix_user_username_nocase', text('username COLLATE NOCASE')),
+        db.Index('ix_user_email_nocase', text('email COLLATE NOCASE')),
+        db.Index('ix_user_nome_nocase', text('nome_completo COLLATE NOCASE')),
+    )
+
     def __repr__(self):
         return f'<User {self.username}>'
 
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'username': self.username,
-            'email': self.email,
-            'nome_completo': self.nome_completo,
-            'is_admin': self.is_admin,
-            'data_criacao': self.data_criacao.isoformat() if self.data_criacao else None,
-            'ultimo_login': self.ultimo_login.isoformat() if self.ultimo_login else None
-        }
+    def to_dict(self, campos=CAMPOS_USUARIO):
+        """Serializa apenas `campos` (todos por padrão)"""
+        return {campo: getattr(self, campo) for campo in campos}
+
+
+def _padrao_prefixo(prefixo):
+    """Padrão LIKE que casa o prefixo literalmente ('%' e '_' escapados)"""
+    escapado = prefixo.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return escapado + '%'
+
+
+def consulta_usuarios(busca=None, campos=CAMPOS_USUARIO):
+    """Query de usuários com só `campos` no SELECT, filtrada pelo prefixo `busca`.
+
+    O prefixo casa username, email ou nome_completo sem diferenciar
+    maiúsculas; o SQLite resolve o OR com uma busca por faixa em cada índice
+    NOCASE. id e data_criacao, a chave do cursor, sempre entram no SELECT.
+    """
+    colunas = [getattr(User, campo) for campo in CAMPOS_USUARIO
+               if campo in campos or campo in ('id', 'data_criacao')]
+    query = User.query.options(load_only(*colunas))
+    if busca:
+        padrao = _padrao_prefixo(busca)
+        query = query.filter(or_(
+            *(getattr(User, campo).like(padrao, escape='\\') for campo in CAMPOS_BUSCA_USUARIO)
+        ))
+    return query
@@ -1,15 +1,66 @@
-from flask import Blueprint, request, jsonify
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask import Blueprint, g, request, jsonify
 import jwt
+import time
 from datetime import datetime, timedelta
 from functools import wraps
-from src.models.user import db, User
+from sqlalchemy import exists, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import make_transient_to_detached
+from src.config import AUTH_POR_SEGUNDO, AUTH_RAJADA
+from src.models.user import CAMPOS_USUARIO, db, User, consulta_usuarios
+from src.utils.cache import CacheLRU
+from src.utils.cache_respostas import cache_respostas
+from src.utils.limitador import LimitadorTaxa, limitar_tentativas
+from src.utils.paginacao import CursorInvalido, ler_limite, paginar_keyset
+from src.utils.senhas import PoolSenhasOcupado, gerar_hash_senha, verificar_senha
 
 auth_bp = Blueprint('auth', __name__)
 
 # Chave secreta para JWT (em produção, deve ser uma variável de ambiente)
 JWT_SECRET = 'sua-chave-secreta-jwt-muito-segura'
 
+# Cache por processo dos tokens já validados (token -> user_id) e dos dados dos
+# usuários autenticados (user_id -> colunas), para que token_required não
+# precise decodificar o JWT nem consultar o banco a cada requisição.
+# O TTL curto limita a defasagem entre workers do gunicorn.
+cache_tokens = CacheLRU(maximo=4096, ttl=60)
+cache_usuarios = CacheLRU(maximo=2048, ttl=60)
+
+# Rajada de até 10 tentativas, depois uma a cada 5 segundos, por IP e por
+# usuário (na troca de senha, pelo id do usuário autenticado)
+limitador_auth = LimitadorTaxa(capacidade=AUTH_RAJADA, por_segundo=AUTH_POR_SEGUNDO)
+
+def invalidar_usuario(user_id):
+    """Descarta os dados em cache de um usuário alterado ou excluído"""
+    cache_usuarios.remover(user_id)
+
+def _usuario_autenticado(token):
+    """Resolve o token para um User da sessão atual, usando o cache quando possível"""
+    user_id = cache_tokens.obter(token)
+    if user_id is None:
+        data = jwt.decode(token, JWT_SECRET, algorithms=['HS256'])
+        user_id = data['user_id']
+        # Nunca mantém o token em cache além da sua expiração
+        restante = data['exp'] - time.time() if 'exp' in data else None
+        cache_tokens.definir(token, user_id, ttl=restante)
+    # Antes de qualquer consulta: o roteamento de leituras decide por usuário
+    g.usuario_id = user_id
+
+    colunas = cache_usuarios.obter(user_id)
+    if colunas is None:
+        user = db.session.get(User, user_id)
+        if user:
+            cache_usuarios.definir(user_id, {
+                coluna.key: getattr(user, coluna.key) for coluna in User.__table__.columns
+            })
+        return user
+
+    # Reconstrói o usuário e o anexa à sessão sem SELECT, para que as rotas
+    # possam alterá-lo e fazer commit normalmente
+    user = User(**colunas)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
 def token_required(f):
     """Decorator para verificar se o token JWT é válido"""
     @wraps(f)
@@ -24,8 +75,7 @@ def token_required(f):
             if token.startswith('Bearer '):
                 token = token[7:]
             
-            data = jwt.decode(token, JWT_SECRET, algorithms=['HS256'])
-            current_user = User.query.get(data['user_id'])
+            current_user = _usuario_autenticado(token)
             
             if not current_user:
                 return jsonify({'error': 'Token inválido'}), 401
@@ -50,7 +100,63 @@ def admin_required(f):
     
     return decorated
 
+def servidor_ocupado(e):
+    """Resposta 503 com Retry-After para recursos saturados (pool de senhas, gravador)"""
+    resposta = jsonify({'error': str(e)})
+    resposta.headers['Retry-After'] = '1'
+    return resposta, 503
+
+# Mensagem de cada restrição UNIQUE da tabela user
+_MENSAGENS_UNICIDADE = {
+    'user.username': 'Nome de usuário já existe',
+    'user.email': 'Email já está em uso',
+}
+
+def _conflito_unicidade(e):
+    """Resposta 400 para um IntegrityError de username/email duplicado, ou None.
+
+    As restrições UNIQUE da tabela decidem num só INSERT/UPDATE, sem o SELECT
+    prévio e sem a corrida entre a verificação e a escrita.
+    """
+    mensagem = str(e.orig)
+    for coluna, erro in _MENSAGENS_UNICIDADE.items():
+        if 'UNIQUE' in mensagem and coluna in mensagem:
+            return jsonify({'error': erro}), 400
+    return None
+
+def _ler_campos_usuario():
+    """Lê ?fields= da listagem de usuários; sem ele, todos os campos"""
+    fields = request.args.get('fields')
+    if not fields:
+        return CAMPOS_USUARIO
+    pedidos = [campo.strip() for campo in fields.split(',') if campo.strip()]
+    invalidos = [campo for campo in pedidos if campo not in CAMPOS_USUARIO]
+    if invalidos:
+        raise ValueError(f"Campos inválidos em fields: {', '.join(invalidos)}")
+    # O id sempre acompanha a resposta
+    return tuple(campo for campo in CAMPOS_USUARIO if campo == 'id' or campo in pedidos)
+
+def pagina_usuarios():
+    """Uma página da listagem de usuários, de ?limit=, ?cursor=, ?q= e ?fields=.
+
+    Do mais novo ao mais antigo, com cursor keyset em (data_criacao, id).
+    ?q= filtra por prefixo de username, email ou nome_completo. Levanta
+    CursorInvalido ou ValueError para parâmetros inválidos.
+    """
+    limite = ler_limite(request.args.get('limit'))
+    campos = _ler_campos_usuario()
+    busca = (request.args.get('q') or '').strip()
+    usuarios, proximo_cursor = paginar_keyset(
+        consulta_usuarios(busca, campos), User.data_criacao, User.id, request.args.get('cursor'), limite
+    )
+    return {
+        'users': [usuario.to_dict(campos) for usuario in usuarios],
+        'next_cursor': proximo_cursor,
+        'limit': limite
+    }
+
 @auth_bp.route('/register', methods=['POST'])
+@limitar_tentativas(limitador_auth)
 def register():
     """Registrar um novo usuário"""
     try:
@@ -60,40 +166,46 @@ def register():
         if not data.get('username') or not data.get('email') or not data.get('password'):
             return jsonify({'error': 'Nome de usuário, email e senha são obrigatórios'}), 400
         
-        # Verificar se o usuário já existe
-        if User.query.filter_by(username=data['username']).first():
-            return jsonify({'error': 'Nome de usuário já existe'}), 400
-        
-        if User.query.filter_by(email=data['email']).first():
-            return jsonify({'error': 'Email já está em uso'}), 400
-        
         # Criar novo usuário
-        hashed_password = generate_password_hash(data['password'])
-        
-        # O primeiro usuário registrado será automaticamente admin
-        is_first_user = User.query.count() == 0
-        
-        novo_usuario = User(
-            username=data['username'],
-            email=data['email'],
-            password_hash=hashed_password,
-            nome_completo=data.get('nome_completo', ''),
-            is_admin=is_first_user or data.get('is_admin', False)
-        )
-        
-        db.session.add(novo_usuario)
+        hashed_password = gerar_hash_senha(data['password'])
+        
+        # O primeiro usuário registrado será automaticamente admin: decidido
+        # no próprio INSERT, que devolve a linha criada (RETURNING). Usuário
+        # ou email repetido é recusado pelas restrições UNIQUE
+        is_admin = True if data.get('is_admin') else ~exists(select(User.id))
+        novo_usuario = db.session.scalars(
+            insert(User).values(
+                username=data['username'],
+                email=data['email'],
+                password_hash=hashed_password,
+                nome_completo=data.get('nome_completo', ''),
+                is_admin=is_admin
+            ).returning(User)
+        ).one()
+        # Serializado antes do commit, que expira o objeto
+        dados = novo_usuario.to_dict()
         db.session.commit()
         
         return jsonify({
             'message': 'Usuário registrado com sucesso',
-            'user': novo_usuario.to_dict()
+            'user': dados
         }), 201
         
+    except IntegrityError as e:
+        db.session.rollback()
+        conflito = _conflito_unicidade(e)
+        if conflito is None:
+            return jsonify({'error': str(e)}), 500
+        return conflito
+    except PoolSenhasOcupado as e:
+        db.session.rollback()
+        return servidor_ocupado(e)
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 @auth_bp.route('/login', methods=['POST'])
+@limitar_tentativas(limitador_auth)
 def login():
     """Fazer login e obter token JWT"""
     try:
@@ -105,7 +217,7 @@ def login():
         # Buscar usuário
         user = User.query.filter_by(username=data['username']).first()
         
-        if not user or not check_password_hash(user.password_hash, data['password']):
+        if not user or not verificar_senha(user.password_hash, data['password']):
             return jsonify({'error': 'Credenciais inválidas'}), 401
         
         # Gerar token JWT
@@ -124,6 +236,8 @@ def login():
             'user': user.to_dict()
         }), 200
         
+    except PoolSenhasOcupado as e:
+        return servidor_ocupado(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -153,25 +267,32 @@ def update_profile(current_user):
         if 'nome_completo' in data:
             current_user.nome_completo = data['nome_completo']
         if 'email' in data:
-            # Verificar se o email não está em uso por outro usuário
-            existing_user = User.query.filter_by(email=data['email']).first()
-            if existing_user and existing_user.id != current_user.id:
-                return jsonify({'error': 'Email já está em uso'}), 400
+            # Email de outro usuário é recusado pela restrição UNIQUE no UPDATE
             current_user.email = data['email']
         
+        # Serializado antes do commit, que expira o objeto
+        dados = current_user.to_dict()
         db.session.commit()
+        invalidar_usuario(current_user.id)
         
         return jsonify({
             'message': 'Perfil atualizado com sucesso',
-            'user': current_user.to_dict()
+            'user': dados
         }), 200
         
+    except IntegrityError as e:
+        db.session.rollback()
+        conflito = _conflito_unicidade(e)
+        if conflito is None:
+            return jsonify({'error': str(e)}), 500
+        return conflito
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 @auth_bp.route('/change-password', methods=['POST'])
 @token_required
+@limitar_tentativas(limitador_auth, autenticado=True)
 def change_password(current_user):
     """Alterar senha do usuário atual"""
     try:
@@ -181,15 +302,19 @@ def change_password(current_user):
             return jsonify({'error': 'Senha atual e nova senha são obrigatórias'}), 400
         
         # Verificar senha atual
-        if not check_password_hash(current_user.password_hash, data['current_password']):
+        if not verificar_senha(current_user.password_hash, data['current_password']):
             return jsonify({'error': 'Senha atual incorreta'}), 400
         
         # Atualizar senha
-        current_user.password_hash = generate_password_hash(data['new_password'])
+        current_user.password_hash = gerar_hash_senha(data['new_password'])
         db.session.commit()
+        invalidar_usuario(current_user.id)
         
         return jsonify({'message': 'Senha alterada com sucesso'}), 200
         
+    except PoolSenhasOcupado as e:
+        db.session.rollback()
+        return servidor_ocupado(e)
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -198,10 +323,14 @@ def change_password(current_user):
 @token_required
 @admin_required
 def list_users(current_user):
-    """Listar todos os usuários (apenas administradores)"""
+    """Listar usuários com paginação por cursor (apenas administradores).
+
+    Parâmetros: limit, cursor, q (prefixo de username, email ou nome), fields
+    """
     try:
-        users = User.query.all()
-        return jsonify([user.to_dict() for user in users]), 200
+        return jsonify(pagina_usuarios()), 200
+    except (CursorInvalido, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -219,6 +348,7 @@ def toggle_admin(current_user, user_id):
         
         user.is_admin = not user.is_admin
         db.session.commit()
+        invalidar_usuario(user.id)
         
         return jsonify({
             'message': f'Status de administrador {"ativado" if user.is_admin else "desativado"} para {user.username}',
@@ -228,3 +358,14 @@ def toggle_admin(current_user, user_id):
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
+
+@auth_bp.route('/cache', methods=['GET'])
+@token_required
+@admin_required
+def estatisticas_cache(current_user):
+    """Contadores de acertos/falhas dos caches de autenticação e de respostas"""
+    return jsonify({
+        'tokens': cache_tokens.estatisticas(),
+        'usuarios': cache_usuarios.estatisticas(),
+        'respostas': cache_respostas().estatisticas()
+    }), 200
@@ -1,28 +1,260 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
 from datetime import datetime
+import csv
+import io
+import threading
+from types import SimpleNamespace
+from src.config import SSE_DURACAO_MAXIMA, SSE_HEARTBEAT, SSE_MAX_ASSINANTES
 from src.models.user import db
-from src.models.pedido import Pedido, Comentario
-from src.routes.auth import token_required, admin_required
+from sqlalchemy import insert, literal, select, update
+from sqlalchemy.orm import joinedload
+from src.models.arquivo import ComentarioArquivado, ConflitoRestauracao, PedidoArquivado, restaurar_pedido
+from src.models.busca import (
+    TABELA_BUSCA, TABELA_BUSCA_ARQUIVO, expressao_busca, ids_busca, indice_busca_disponivel,
+    resultados_busca
+)
+from src.models.estatistica import contagem_por_status
+from src.models.pedido import (
+    CAMPOS_PEDIDO, RELACOES_PEDIDO, VISIBILIDADES, Pedido, PedidoInexistente, Comentario,
+    carregar_pedido, carregar_pedidos, consultas_visiveis, filtro_visibilidade,
+    opcoes_serializacao, operacao_comentario, operacao_status, visivel_para
+)
+from src.routes.auth import admin_required, servidor_ocupado, token_required
+from src.utils.cache_respostas import cache_respostas, resposta_com_cache
+from src.utils.commit_agrupado import ErroCommitAgrupado
+from src.utils.condicional import calcular_etag
+from src.utils.eventos import barramento, fluxo_sse
+from src.utils.paginacao import (
+    CursorInvalido, ler_limite, paginar_deslocamento, paginar_keyset, paginar_keyset_ramos
+)
 
 pedido_bp = Blueprint('pedido', __name__)
 
-# Listar todos os pedidos (requer autenticação)
+_vagas_stream = threading.BoundedSemaphore(SSE_MAX_ASSINANTES)
+
+STATUS_VALIDOS = ['Pendente', 'Em Oração', 'Respondido', 'Arquivado']
+
+# Máximo de itens aceitos por requisição nos endpoints em lote
+TAMANHO_MAXIMO_LOTE = 500
+
+# Linhas lidas do banco por vez na exportação
+LOTE_EXPORTACAO = 500
+
+COLUNAS_EXPORTACAO = [
+    'id', 'titulo', 'descricao', 'nome_solicitante', 'celular_solicitante',
+    'email_solicitante', 'status', 'data_submissao', 'data_ultima_atualizacao',
+    'visibilidade', 'usuario_criador_id', 'comentarios_count', 'ultimo_comentario_em',
+    'usuario_criador', 'comentarios'
+]
+
+def _ler_projecao():
+    """Lê ?fields= e ?include= e retorna (campos, relacoes).
+
+    Sem nenhum dos dois, a resposta é completa como antes. Com ?fields= e sem
+    ?include=, nenhuma relação é incluída. ?comentarios=contagem continua
+    aceito e equivale a omitir 'comentarios' do include.
+    """
+    fields = request.args.get('fields')
+    include = request.args.get('include')
+    
+    campos = CAMPOS_PEDIDO
+    if fields:
+        pedidos = [campo.strip() for campo in fields.split(',') if campo.strip()]
+        invalidos = [campo for campo in pedidos if campo not in CAMPOS_PEDIDO]
+        if invalidos:
+            raise ValueError(f"Campos inválidos em fields: {', '.join(invalidos)}")
+        # O id sempre acompanha a resposta (e é a chave do cursor)
+        campos = tuple(campo for campo in CAMPOS_PEDIDO if campo == 'id' or campo in pedidos)
+    
+    if include is not None:
+        relacoes = tuple(r.strip() for r in include.split(',') if r.strip())
+        invalidas = [r for r in relacoes if r not in RELACOES_PEDIDO]
+        if invalidas:
+            raise ValueError(f"Relações inválidas em include: {', '.join(invalidas)}")
+    elif fields:
+        relacoes = ()
+    else:
+        relacoes = RELACOES_PEDIDO
+    
+    if request.args.get('comentarios') == 'contagem':
+        relacoes = tuple(r for r in relacoes if r != 'comentarios')
+    return campos, relacoes
+
+def _validar_pedido(data):
+    """Mensagem de erro para um pedido novo inválido, ou None"""
+    if not isinstance(data, dict):
+        return 'Pedido deve ser um objeto JSON'
+    if not data.get('titulo') or not data.get('descricao') or not data.get('nome_solicitante'):
+        return 'Título, descrição e nome do solicitante são obrigatórios'
+    if data.get('visibilidade', 'Todos') not in VISIBILIDADES:
+        return 'Visibilidade inválida'
+    return None
+
+def _incluir_arquivados():
+    """?incluir_arquivados=1: listagem e busca também percorrem o arquivo"""
+    return request.args.get('incluir_arquivados', '').lower() in ('1', 'true', 'sim')
+
+def _classe_usuario(usuario):
+    """Parte da chave de cache: o que o usuário vê depende de ser admin e de quem é"""
+    return 'admin' if usuario.is_admin else f'usuario:{usuario.id}'
+
+def _invalidar_pedidos(*ids):
+    """Descarta do cache as listagens, as estatísticas e os pedidos `ids` (após o commit)"""
+    cache_respostas().invalidar('pedidos', *(f'pedido:{i}' for i in ids))
+
+def _negar_invisivel(usuario):
+    """autorizar() de resposta_com_cache: 404 para pedidos que `usuario` não pode ver"""
+    def autorizar(meta):
+        if not visivel_para(usuario, meta['visibilidade'], meta['usuario_criador_id']):
+            return jsonify({'error': 'Pedido não encontrado'}), 404
+        return None
+    return autorizar
+
+def _geracao_usuarios():
+    """Parte do ETag de respostas com usernames (criador, autores dos comentários).
+
+    Trocar um username não altera os pedidos; a geração 'usuarios', que as
+    rotas de usuário incrementam, muda o ETag.
+    """
+    return cache_respostas().geracoes(['usuarios'])[0]
+
+def _publicar_pedido(tipo, pedido):
+    """Publica no barramento um resumo do pedido (sem descrição nem comentários)"""
+    barramento.publicar(tipo, {
+        'pedido_id': pedido.id,
+        'status': pedido.status,
+        'visibilidade': pedido.visibilidade,
+        'usuario_criador_id': pedido.usuario_criador_id,
+        'data_ultima_atualizacao': pedido.data_ultima_atualizacao
+    })
+
+def _filtrar_listagem(modelo):
+    """(id, data_ultima_atualizacao, arquivado) de `modelo` com os filtros da query string"""
+    query = db.session.query(
+        modelo.id, modelo.data_ultima_atualizacao,
+        literal(modelo is PedidoArquivado).label('arquivado')
+    )
+
+    status = request.args.get('status')
+    if status and status != 'todos':
+        query = query.filter(modelo.status == status)
+
+    visibilidade = request.args.get('visibilidade')
+    if visibilidade:
+        query = query.filter(modelo.visibilidade == visibilidade)
+
+    criador = request.args.get('usuario_criador_id', type=int)
+    if criador is not None:
+        query = query.filter(modelo.usuario_criador_id == criador)
+    return query
+
+def _montar_listagem(current_user, limite, cursor, campos, relacoes):
+    """(etag, ultima_modificacao, gerar_corpo, meta) de uma página da listagem"""
+    modelos = (Pedido, PedidoArquivado) if _incluir_arquivados() else (Pedido,)
+    ramos = [
+        (query, modelo.data_ultima_atualizacao, modelo.id)
+        for modelo in modelos
+        for query in consultas_visiveis(_filtrar_listagem(modelo), current_user, modelo)
+    ]
+    chaves, proximo_cursor = paginar_keyset_ramos(
+        ramos, Pedido.data_ultima_atualizacao, Pedido.id, cursor, limite
+    )
+
+    etag = calcular_etag(
+        'pedidos', [tuple(chave) for chave in chaves], proximo_cursor, limite, campos, relacoes,
+        _geracao_usuarios() if relacoes else None
+    )
+    ultima_modificacao = max((chave.data_ultima_atualizacao for chave in chaves), default=None)
+
+    def gerar_corpo():
+        carregados = {}
+        for modelo in modelos:
+            ids = [chave.id for chave in chaves if chave.arquivado == (modelo is PedidoArquivado)]
+            for pedido in carregar_pedidos(ids, campos, relacoes, modelo):
+                carregados[(modelo is PedidoArquivado, pedido.id)] = pedido
+        pedidos = [carregados[chave.arquivado, chave.id] for chave in chaves
+                   if (chave.arquivado, chave.id) in carregados]
+        return {
+            'pedidos': [pedido.to_dict(campos, relacoes) for pedido in pedidos],
+            'next_cursor': proximo_cursor,
+            'limit': limite
+        }
+
+    return etag, ultima_modificacao, gerar_corpo, {}
+
+# Listar pedidos com paginação por cursor (requer autenticação)
+# Parâmetros: limit, cursor, status, visibilidade, usuario_criador_id, fields,
+# include, incluir_arquivados
+# Usuários comuns só veem pedidos 'Todos' e os próprios. Pedidos movidos para o
+# arquivo só aparecem com ?incluir_arquivados=1, intercalados pela mesma ordem
+# A página é resolvida primeiro só com (id, data_ultima_atualizacao), direto do
+# índice; isso basta para o ETag, e o grafo completo só é carregado se o
+# cliente não tiver a versão atual. A resposta pronta fica no cache de
+# respostas até a próxima escrita em pedidos
 @pedido_bp.route('/pedidos', methods=['GET'])
 @token_required
 def listar_pedidos(current_user):
     try:
-        pedidos = Pedido.query.all()
-        return jsonify([pedido.to_dict() for pedido in pedidos]), 200
+        limite = ler_limite(request.args.get('limit'))
+        cursor = request.args.get('cursor')
+        campos, relacoes = _ler_projecao()
+        return resposta_com_cache(
+            'pedidos', _classe_usuario(current_user), ['usuarios', 'pedidos'],
+            lambda: _montar_listagem(current_user, limite, cursor, campos, relacoes),
+            colecao=True
+        )
+    except (CursorInvalido, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _estado_pedido(pedido_id):
+    """(modelo, data_ultima_atualizacao, meta de visibilidade), ou None.
+
+    Busca na chave primária de pedido e, se não estiver lá, de pedido_arquivado.
+    """
+    for modelo in (Pedido, PedidoArquivado):
+        linha = db.session.query(
+            modelo.data_ultima_atualizacao, modelo.visibilidade, modelo.usuario_criador_id
+        ).filter(modelo.id == pedido_id).first()
+        if linha is not None:
+            break
+    else:
+        return None
+    return modelo, linha.data_ultima_atualizacao, {
+        'visibilidade': linha.visibilidade,
+        'usuario_criador_id': linha.usuario_criador_id
+    }
+
 # Obter um pedido específico (requer autenticação)
+# Aceita ?fields= e ?include= como a listagem. O corpo em cache é o mesmo para
+# todos; a visibilidade é conferida a cada requisição pelos metadados da entrada.
+# Pedidos movidos para o arquivo continuam acessíveis, com "arquivado": true
 @pedido_bp.route('/pedidos/<int:pedido_id>', methods=['GET'])
 @token_required
 def obter_pedido(current_user, pedido_id):
     try:
-        pedido = Pedido.query.get_or_404(pedido_id)
-        return jsonify(pedido.to_dict()), 200
+        campos, relacoes = _ler_projecao()
+        
+        def montar():
+            estado = _estado_pedido(pedido_id)
+            if estado is None:
+                return jsonify({'error': 'Pedido não encontrado'}), 404
+            modelo, atualizado_em, meta = estado
+            etag = calcular_etag(
+                'pedido', pedido_id, atualizado_em, campos, relacoes, modelo.__tablename__,
+                _geracao_usuarios() if relacoes else None
+            )
+            return etag, atualizado_em, (
+                lambda: carregar_pedido(pedido_id, campos, relacoes, modelo).to_dict(campos, relacoes)
+            ), meta
+        
+        return resposta_com_cache(
+            f'pedido:{pedido_id}', 'todos', ['usuarios', f'pedido:{pedido_id}'],
+            montar, autorizar=_negar_invisivel(current_user)
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -34,8 +266,9 @@ def criar_pedido(current_user):
         data = request.get_json()
         
         # Validação dos campos obrigatórios
-        if not data.get('titulo') or not data.get('descricao') or not data.get('nome_solicitante'):
-            return jsonify({'error': 'Título, descrição e nome do solicitante são obrigatórios'}), 400
+        erro = _validar_pedido(data)
+        if erro:
+            return jsonify({'error': erro}), 400
         
         novo_pedido = Pedido(
             titulo=data['titulo'],
@@ -50,8 +283,11 @@ def criar_pedido(current_user):
         
         db.session.add(novo_pedido)
         db.session.commit()
+        _invalidar_pedidos()
         
-        return jsonify(novo_pedido.to_dict()), 201
+        pedido = carregar_pedido(novo_pedido.id)
+        _publicar_pedido('pedido_criado', pedido)
+        return jsonify(pedido.to_dict()), 201
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -85,12 +321,17 @@ def atualizar_pedido(current_user, pedido_id):
             if 'status' in data:
                 pedido.status = data['status']
             if 'visibilidade' in data:
+                if data['visibilidade'] not in VISIBILIDADES:
+                    return jsonify({'error': 'Visibilidade inválida'}), 400
                 pedido.visibilidade = data['visibilidade']
         
         pedido.data_ultima_atualizacao = datetime.utcnow()
         
         db.session.commit()
+        _invalidar_pedidos(pedido_id)
         
+        pedido = carregar_pedido(pedido_id)
+        _publicar_pedido('pedido_atualizado', pedido)
         return jsonify(pedido.to_dict()), 200
     except Exception as e:
         db.session.rollback()
@@ -109,6 +350,8 @@ def excluir_pedido(current_user, pedido_id):
         
         db.session.delete(pedido)
         db.session.commit()
+        _invalidar_pedidos(pedido_id)
+        _publicar_pedido('pedido_excluido', pedido)
         
         return jsonify({'message': 'Pedido excluído com sucesso'}), 200
     except Exception as e:
@@ -121,87 +364,203 @@ def excluir_pedido(current_user, pedido_id):
 def adicionar_comentario(current_user, pedido_id):
     try:
         pedido = Pedido.query.get_or_404(pedido_id)
+        if not visivel_para(current_user, pedido.visibilidade, pedido.usuario_criador_id):
+            return jsonify({'error': 'Pedido não encontrado'}), 404
         data = request.get_json()
         
         if not data.get('conteudo'):
             return jsonify({'error': 'Conteúdo do comentário é obrigatório'}), 400
         
-        novo_comentario = Comentario(
-            pedido_id=pedido_id,
-            autor=current_user.nome_completo or current_user.username,
-            conteudo=data['conteudo'],
-            usuario_id=current_user.id
-        )
-        
-        # Atualizar data de última atualização do pedido
-        pedido.data_ultima_atualizacao = datetime.utcnow()
-        
-        db.session.add(novo_comentario)
-        db.session.commit()
+        autor = current_user.nome_completo or current_user.username
+        gravador = current_app.extensions.get('commit_agrupado')
+        if gravador is not None:
+            # Commit agrupado: a thread gravadora insere junto com outros comentários
+            comentario_id = gravador.executar(
+                operacao_comentario(pedido_id, autor, data['conteudo'], current_user.id)
+            )
+        else:
+            novo_comentario = Comentario(
+                pedido_id=pedido_id,
+                autor=autor,
+                conteudo=data['conteudo'],
+                usuario_id=current_user.id
+            )
+            
+            # Atualizar data de última atualização do pedido
+            pedido.data_ultima_atualizacao = datetime.utcnow()
+            
+            db.session.add(novo_comentario)
+            db.session.commit()
+            comentario_id = novo_comentario.id
+        _invalidar_pedidos(pedido_id)
         
+        novo_comentario = Comentario.query.options(
+            joinedload(Comentario.usuario)
+        ).get(comentario_id)
+        barramento.publicar('comentario_adicionado', {
+            'pedido_id': pedido_id,
+            'comentario_id': novo_comentario.id,
+            'visibilidade': pedido.visibilidade,
+            'usuario_criador_id': pedido.usuario_criador_id,
+            'data_comentario': novo_comentario.data_comentario
+        })
         return jsonify(novo_comentario.to_dict()), 201
+    except PedidoInexistente:
+        return jsonify({'error': 'Pedido não encontrado'}), 404
+    except ErroCommitAgrupado as e:
+        db.session.rollback()
+        return servidor_ocupado(e)
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
-# Obter comentários de um pedido (requer autenticação)
+# Obter comentários de um pedido, do mais antigo ao mais novo, paginados por
+# cursor em (data_comentario, id) (requer autenticação)
 @pedido_bp.route('/pedidos/<int:pedido_id>/comentarios', methods=['GET'])
 @token_required
 def obter_comentarios(current_user, pedido_id):
     try:
-        pedido = Pedido.query.get_or_404(pedido_id)
-        comentarios = Comentario.query.filter_by(pedido_id=pedido_id).all()
-        return jsonify([comentario.to_dict() for comentario in comentarios]), 200
+        limite = ler_limite(request.args.get('limit'))
+        cursor = request.args.get('cursor')
+        
+        def gerar_corpo(modelo):
+            query = modelo.query.options(
+                joinedload(modelo.usuario)
+            ).filter(modelo.pedido_id == pedido_id)
+            comentarios, proximo_cursor = paginar_keyset(
+                query, modelo.data_comentario, modelo.id, cursor, limite, crescente=True
+            )
+            return {
+                'comentarios': [comentario.to_dict() for comentario in comentarios],
+                'next_cursor': proximo_cursor,
+                'limit': limite
+            }
+        
+        def montar():
+            # Novos comentários atualizam data_ultima_atualizacao do pedido
+            estado = _estado_pedido(pedido_id)
+            if estado is None:
+                return jsonify({'error': 'Pedido não encontrado'}), 404
+            modelo, atualizado_em, meta = estado
+            comentario = Comentario if modelo is Pedido else ComentarioArquivado
+            etag = calcular_etag(
+                'comentarios', pedido_id, atualizado_em, cursor, limite, modelo.__tablename__,
+                _geracao_usuarios()
+            )
+            return etag, atualizado_em, lambda: gerar_corpo(comentario), meta
+        
+        return resposta_com_cache(
+            f'comentarios:{pedido_id}', 'todos', ['usuarios', f'pedido:{pedido_id}'],
+            montar, autorizar=_negar_invisivel(current_user), colecao=True
+        )
+    except (CursorInvalido, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-# Obter estatísticas dos pedidos (requer autenticação)
+# Obter estatísticas dos pedidos visíveis ao usuário (requer autenticação)
+# Lê a tabela contador_status (uma linha por status e visibilidade), mantida por triggers
 @pedido_bp.route('/pedidos/estatisticas', methods=['GET'])
 @token_required
 def obter_estatisticas(current_user):
     try:
-        total = Pedido.query.count()
-        pendentes = Pedido.query.filter_by(status='Pendente').count()
-        em_oracao = Pedido.query.filter_by(status='Em Oração').count()
-        respondidos = Pedido.query.filter_by(status='Respondido').count()
-        arquivados = Pedido.query.filter_by(status='Arquivado').count()
-        
-        estatisticas = {
-            'total': total,
-            'pendentes': pendentes,
-            'em_oracao': em_oracao,
-            'respondidos': respondidos,
-            'arquivados': arquivados
-        }
+        def montar():
+            por_status = contagem_por_status(current_user)
+            estatisticas = {
+                'total': sum(por_status.values()),
+                'pendentes': por_status.get('Pendente', 0),
+                'em_oracao': por_status.get('Em Oração', 0),
+                'respondidos': por_status.get('Respondido', 0),
+                'arquivados': por_status.get('Arquivado', 0),
+                'por_status': por_status
+            }
+            return calcular_etag('estatisticas', por_status), None, lambda: estatisticas, {}
         
-        return jsonify(estatisticas), 200
+        return resposta_com_cache(
+            'estatisticas', _classe_usuario(current_user), ['pedidos'], montar
+        )
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _filtrar_substring(query, modelo, termo):
+    """Busca por substring, quando não há índice FTS5"""
+    return query.filter(
+        db.or_(
+            modelo.titulo.contains(termo),
+            modelo.descricao.contains(termo),
+            modelo.nome_solicitante.contains(termo)
+        )
+    )
+
 # Buscar pedidos (requer autenticação)
+# Com termo, usa o índice FTS5 ordenado por relevância (bm25); sem termo,
+# pagina por data de atualização como a listagem. Com ?incluir_arquivados=1
+# busca também no arquivo, sempre por data de atualização: as relevâncias de
+# dois índices FTS5 diferentes não são comparáveis
 @pedido_bp.route('/pedidos/buscar', methods=['GET'])
 @token_required
 def buscar_pedidos(current_user):
     try:
         termo = request.args.get('q', '')
         status = request.args.get('status', '')
+        limite = ler_limite(request.args.get('limit'))
+        cursor = request.args.get('cursor')
+        campos, relacoes = _ler_projecao()
+        # data_ultima_atualizacao é a chave do cursor e da intercalação dos
+        # ramos: carregada mesmo fora de ?fields=, sem um SELECT por linha
+        carregados = tuple(
+            campo for campo in CAMPOS_PEDIDO
+            if campo in campos or campo == 'data_ultima_atualizacao'
+        )
         
-        query = Pedido.query
-        
-        if termo:
-            query = query.filter(
-                db.or_(
-                    Pedido.titulo.contains(termo),
-                    Pedido.descricao.contains(termo),
-                    Pedido.nome_solicitante.contains(termo)
-                )
-            )
+        query = Pedido.query.options(*opcoes_serializacao(carregados, relacoes))
         
         if status and status != 'todos':
             query = query.filter_by(status=status)
         
-        pedidos = query.all()
-        return jsonify([pedido.to_dict() for pedido in pedidos]), 200
+        expressao = expressao_busca(termo) if termo else None
+        if _incluir_arquivados():
+            ramos = []
+            for modelo, tabela in ((Pedido, TABELA_BUSCA), (PedidoArquivado, TABELA_BUSCA_ARQUIVO)):
+                query = modelo.query.options(*opcoes_serializacao(carregados, relacoes, modelo))
+                if status and status != 'todos':
+                    query = query.filter(modelo.status == status)
+                if expressao and indice_busca_disponivel(tabela):
+                    query = query.filter(modelo.id.in_(ids_busca(expressao, tabela)))
+                elif termo:
+                    query = _filtrar_substring(query, modelo, termo)
+                ramos.extend(
+                    (ramo, modelo.data_ultima_atualizacao, modelo.id)
+                    for ramo in consultas_visiveis(query, current_user, modelo)
+                )
+            pedidos, proximo_cursor = paginar_keyset_ramos(
+                ramos, Pedido.data_ultima_atualizacao, Pedido.id, cursor, limite
+            )
+        elif expressao and indice_busca_disponivel():
+            # O conjunto já vem restrito pelo índice FTS: basta o predicado direto
+            filtro = filtro_visibilidade(current_user)
+            if filtro is not None:
+                query = query.filter(filtro)
+            resultados = resultados_busca(expressao)
+            query = query.join(resultados, resultados.c.pedido_id == Pedido.id)
+            query = query.order_by(resultados.c.rank, Pedido.id)
+            pedidos, proximo_cursor = paginar_deslocamento(query, cursor, limite)
+        else:
+            if termo:
+                # Sem FTS5 disponível: recai nas buscas por substring
+                query = _filtrar_substring(query, Pedido, termo)
+            pedidos, proximo_cursor = paginar_keyset_ramos(
+                consultas_visiveis(query, current_user),
+                Pedido.data_ultima_atualizacao, Pedido.id, cursor, limite
+            )
+        
+        return jsonify({
+            'pedidos': [pedido.to_dict(campos, relacoes) for pedido in pedidos],
+            'next_cursor': proximo_cursor,
+            'limit': limite
+        }), 200
+    except (CursorInvalido, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -217,16 +576,261 @@ def atualizar_status(current_user, pedido_id):
         if not data.get('status'):
             return jsonify({'error': 'Status é obrigatório'}), 400
         
-        status_validos = ['Pendente', 'Em Oração', 'Respondido', 'Arquivado']
-        if data['status'] not in status_validos:
+        if data['status'] not in STATUS_VALIDOS:
             return jsonify({'error': 'Status inválido'}), 400
         
-        pedido.status = data['status']
-        pedido.data_ultima_atualizacao = datetime.utcnow()
+        gravador = current_app.extensions.get('commit_agrupado')
+        if gravador is not None:
+            gravador.executar(operacao_status(pedido_id, data['status']))
+            # A gravação foi feita fora desta sessão
+            db.session.expire_all()
+        else:
+            pedido.status = data['status']
+            pedido.data_ultima_atualizacao = datetime.utcnow()
+            
+            db.session.commit()
+        _invalidar_pedidos(pedido_id)
         
-        db.session.commit()
+        pedido = carregar_pedido(pedido_id)
+        _publicar_pedido('status_alterado', pedido)
+        return jsonify(pedido.to_dict()), 200
+    except PedidoInexistente:
+        return jsonify({'error': 'Pedido não encontrado'}), 404
+    except ErroCommitAgrupado as e:
+        db.session.rollback()
+        return servidor_ocupado(e)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+# Devolver um pedido do arquivo à tabela principal, com os comentários (apenas admins)
+# Corpo opcional: {"status": "Pendente"}; sem status, continua 'Arquivado'
+@pedido_bp.route('/pedidos/<int:pedido_id>/restaurar', methods=['POST'])
+@token_required
+@admin_required
+def restaurar_pedido_arquivado(current_user, pedido_id):
+    try:
+        data = request.get_json(silent=True) or {}
+        status = data.get('status')
+        if status is not None and status not in STATUS_VALIDOS:
+            return jsonify({'error': 'Status inválido'}), 400
         
+        restaurar_pedido(db.engine, pedido_id, status)
+        _invalidar_pedidos(pedido_id)
+        
+        pedido = carregar_pedido(pedido_id)
+        _publicar_pedido('pedido_atualizado', pedido)
         return jsonify(pedido.to_dict()), 200
+    except PedidoInexistente:
+        return jsonify({'error': 'Pedido não encontrado no arquivo'}), 404
+    except ConflitoRestauracao as e:
+        return jsonify({'error': str(e)}), 409
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
+
+# Fluxo de alterações em pedidos e comentários via Server-Sent Events
+# (requer autenticação). Retoma a partir do cabeçalho Last-Event-ID
+# Desabilitado (503) sem um worker com threads ou assíncrono: ver
+# SSE_MAX_ASSINANTES em src/config.py
+@pedido_bp.route('/pedidos/stream', methods=['GET'])
+@token_required
+def stream_pedidos(current_user):
+    if not SSE_MAX_ASSINANTES:
+        return jsonify({'error': 'Tempo real desabilitado neste servidor'}), 503
+    if not _vagas_stream.acquire(blocking=False):
+        resposta = jsonify({'error': 'Limite de conexões de tempo real atingido'})
+        resposta.headers['Retry-After'] = '5'
+        return resposta, 503
+    
+    ultimo_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    
+    # Mesma regra da listagem: cada assinante só recebe eventos de pedidos que pode ver
+    usuario = SimpleNamespace(id=current_user.id, is_admin=current_user.is_admin)
+    def pode_ver(dados):
+        return visivel_para(usuario, dados.get('visibilidade'), dados.get('usuario_criador_id'))
+    
+    resposta = Response(
+        fluxo_sse(ultimo_id, SSE_DURACAO_MAXIMA, SSE_HEARTBEAT, filtro=pode_ver),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    resposta.call_on_close(_vagas_stream.release)
+    return resposta
+
+# Criar vários pedidos de uma vez, em uma única transação (requer autenticação)
+# Corpo: {"pedidos": [{...}, ...]}. Se algum item for inválido nada é gravado
+@pedido_bp.route('/pedidos/batch', methods=['POST'])
+@token_required
+def criar_pedidos_lote(current_user):
+    try:
+        data = request.get_json()
+        itens = data.get('pedidos') if isinstance(data, dict) else None
+        
+        if not isinstance(itens, list) or not itens:
+            return jsonify({'error': 'Informe a lista "pedidos"'}), 400
+        if len(itens) > TAMANHO_MAXIMO_LOTE:
+            return jsonify({'error': f'Máximo de {TAMANHO_MAXIMO_LOTE} pedidos por lote'}), 400
+        
+        erros = [
+            {'indice': indice, 'error': erro}
+            for indice, erro in enumerate(_validar_pedido(item) for item in itens) if erro
+        ]
+        if erros:
+            return jsonify({'error': 'Lote contém pedidos inválidos', 'itens': erros}), 400
+        
+        agora = datetime.utcnow()
+        usuario_id = current_user.id
+        linhas = [{
+            'titulo': item['titulo'],
+            'descricao': item['descricao'],
+            'nome_solicitante': item['nome_solicitante'],
+            'celular_solicitante': item.get('celular_solicitante'),
+            'email_solicitante': item.get('email_solicitante'),
+            'status': item.get('status', 'Pendente'),
+            'visibilidade': item.get('visibilidade', 'Todos'),
+            'data_submissao': agora,
+            'data_ultima_atualizacao': agora,
+            'usuario_criador_id': usuario_id
+        } for item in itens]
+        
+        # INSERT com RETURNING na mesma transação. O SQLite não garante a ordem
+        # das linhas do RETURNING: com sort_by_parameter_order o SQLAlchemy
+        # devolve os ids na ordem dos itens (no SQLite, um INSERT por item,
+        # ainda com um único commit)
+        ids = db.session.scalars(
+            insert(Pedido).returning(Pedido.id, sort_by_parameter_order=True), linhas
+        ).all()
+        db.session.commit()
+        _invalidar_pedidos()
+        
+        for pedido_id, linha in zip(ids, linhas):
+            barramento.publicar('pedido_criado', {
+                'pedido_id': pedido_id,
+                'status': linha['status'],
+                'visibilidade': linha['visibilidade'],
+                'usuario_criador_id': usuario_id,
+                'data_ultima_atualizacao': agora
+            })
+        
+        return jsonify({
+            'criados': len(ids),
+            'itens': [{'indice': indice, 'id': pedido_id} for indice, pedido_id in enumerate(ids)]
+        }), 201
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+# Alterar o status de vários pedidos com um único UPDATE (apenas admins)
+# Corpo: {"ids": [1, 2, 3], "status": "Em Oração"}
+@pedido_bp.route('/pedidos/status/batch', methods=['PUT'])
+@token_required
+@admin_required
+def atualizar_status_lote(current_user):
+    try:
+        data = request.get_json()
+        ids = data.get('ids') if isinstance(data, dict) else None
+        
+        # bool é subclasse de int: true/false no JSON não são ids
+        if not isinstance(ids, list) or not ids or not all(
+            isinstance(i, int) and not isinstance(i, bool) for i in ids
+        ):
+            return jsonify({'error': 'Informe a lista "ids" com números inteiros'}), 400
+        if len(ids) > TAMANHO_MAXIMO_LOTE:
+            return jsonify({'error': f'Máximo de {TAMANHO_MAXIMO_LOTE} pedidos por lote'}), 400
+        if data.get('status') not in STATUS_VALIDOS:
+            return jsonify({'error': 'Status inválido'}), 400
+        
+        agora = datetime.utcnow()
+        alterados = db.session.execute(
+            update(Pedido)
+            .where(Pedido.id.in_(set(ids)))
+            .values(status=data['status'], data_ultima_atualizacao=agora)
+            .returning(Pedido.id, Pedido.visibilidade, Pedido.usuario_criador_id)
+            .execution_options(synchronize_session=False)
+        ).all()
+        db.session.commit()
+        _invalidar_pedidos(*(linha.id for linha in alterados))
+        
+        for linha in alterados:
+            barramento.publicar('status_alterado', {
+                'pedido_id': linha.id,
+                'status': data['status'],
+                'visibilidade': linha.visibilidade,
+                'usuario_criador_id': linha.usuario_criador_id,
+                'data_ultima_atualizacao': agora
+            })
+        
+        encontrados = {linha.id for linha in alterados}
+        return jsonify({
+            'status': data['status'],
+            'atualizados': len(encontrados),
+            'itens': [
+                {'id': i, 'ok': True} if i in encontrados else {'id': i, 'ok': False, 'error': 'Pedido não encontrado'}
+                for i in ids
+            ]
+        }), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+def _pedidos_exportacao():
+    """Percorre todos os pedidos em lotes de LOTE_EXPORTACAO com cursor no servidor.
+
+    Os comentários de cada lote vêm em um único SELECT ... IN (selectinload).
+    O identity map guarda referências fracas, então os objetos de lotes já
+    enviados são liberados e a memória não cresce com o tamanho da tabela.
+    """
+    resultado = db.session.execute(
+        select(Pedido)
+        .options(*opcoes_serializacao())
+        .order_by(Pedido.id)
+        .execution_options(yield_per=LOTE_EXPORTACAO)
+    )
+    for lote in resultado.scalars().partitions():
+        for pedido in lote:
+            yield pedido.to_dict()
+
+def _exportar_ndjson():
+    for pedido in _pedidos_exportacao():
+        yield current_app.json.dumps(pedido) + '\n'
+
+def _exportar_csv():
+    buffer = io.StringIO()
+    escritor = csv.DictWriter(buffer, fieldnames=COLUNAS_EXPORTACAO)
+    # O cabeçalho sai antes da primeira consulta: o primeiro byte é imediato
+    escritor.writeheader()
+    yield buffer.getvalue()
+    for pedido in _pedidos_exportacao():
+        buffer.seek(0)
+        buffer.truncate()
+        pedido['comentarios'] = current_app.json.dumps(pedido['comentarios'])
+        escritor.writerow({
+            campo: valor.isoformat() if isinstance(valor, datetime) else valor
+            for campo, valor in pedido.items()
+        })
+        yield buffer.getvalue()
+
+# Exportar todos os pedidos com comentários em NDJSON ou CSV (apenas admins)
+# A resposta é gerada aos poucos, sem montar a lista inteira em memória
+@pedido_bp.route('/pedidos/export', methods=['GET'])
+@token_required
+@admin_required
+def exportar_pedidos(current_user):
+    formato = request.args.get('format', 'ndjson')
+    if formato == 'ndjson':
+        gerador, mimetype = _exportar_ndjson(), 'application/x-ndjson'
+    elif formato == 'csv':
+        gerador, mimetype = _exportar_csv(), 'text/csv'
+    else:
+        return jsonify({'error': 'Formato deve ser ndjson ou csv'}), 400
+    
+    nome_arquivo = f"pedidos-{datetime.utcnow():%Y%m%d%H%M%S}.{formato}"
+    return Response(
+        stream_with_context(gerador),
+        mimetype=mimetype,
+        headers={
+            'Content-Disposition': f'attachment; filename="{nome_arquivo}"',
+            'X-Accel-Buffering': 'no'
+        }
+    )
@@ -1,12 +1,19 @@
 from flask import Blueprint, jsonify, request
 from src.models.user import User, db
+from src.routes.auth import invalidar_usuario, pagina_usuarios
+from src.utils.cache_respostas import cache_respostas
+from src.utils.paginacao import CursorInvalido
 
 user_bp = Blueprint('user', __name__)
 
+# Listar usuários com paginação por cursor
+# Parâmetros: limit, cursor, q (prefixo de username, email ou nome), fields
 @user_bp.route('/users', methods=['GET'])
 def get_users():
-    users = User.query.all()
-    return jsonify([user.to_dict() for user in users])
+    try:
+        return jsonify(pagina_usuarios())
+    except (CursorInvalido, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
 
 @user_bp.route('/users', methods=['POST'])
 def create_user():
@@ -29,6 +36,9 @@ def update_user(user_id):
     user.username = data.get('username', user.username)
     user.email = data.get('email', user.email)
     db.session.commit()
+    invalidar_usuario(user_id)
+    # O username aparece nos pedidos e comentários em cache
+    cache_respostas().invalidar('usuarios')
     return jsonify(user.to_dict())
 
 @user_bp.route('/users/<int:user_id>', methods=['DELETE'])
@@ -36,4 +46,6 @@ def delete_user(user_id):
     user = User.query.get_or_404(user_id)
     db.session.delete(user)
     db.session.commit()
+    invalidar_usuario(user_id)
+    cache_respostas().invalidar('usuarios')
     return '', 204
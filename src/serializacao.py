@@ -0,0 +1,42 @@
+from datetime import date, datetime
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # opcional: sem o pacote, usa o json da biblioteca padrão
+    orjson = None
+
+
+class ProvedorJSON(DefaultJSONProvider):
+    """Provedor JSON da API, ajustado para os nossos modelos.
+
+    - datas saem em ISO 8601 direto do datetime, sem .isoformat() em cada to_dict
+    - saída sempre compacta, sem ordenar chaves e sem escapar acentos
+    - usa orjson quando instalado, que serializa datetime nativamente
+    """
+
+    sort_keys = False
+    ensure_ascii = False
+    compact = True
+
+    @staticmethod
+    def default(o):
+        # O provedor padrão do Flask formataria datas como data HTTP (RFC 822)
+        if isinstance(o, (datetime, date)):
+            return o.isoformat()
+        return DefaultJSONProvider.default(o)
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+        kwargs.setdefault('separators', (',', ':'))
+        return super().dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if orjson is not None:
+            corpo = orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS)
+        else:
+            corpo = self.dumps(obj).encode('utf-8')
+        return self._app.response_class(corpo + b'\n', mimetype=self.mimetype)
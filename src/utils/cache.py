@@ -0,0 +1,60 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheLRU:
+    """Cache em memória com limite de entradas (LRU) e expiração por TTL.
+
+    Seguro para uso por várias threads do mesmo processo (gunicorn --threads).
+    Cada processo tem sua própria instância: entre workers não há partilha.
+    """
+
+    def __init__(self, maximo=1024, ttl=60):
+        self.maximo = maximo
+        self.ttl = ttl
+        self._dados = OrderedDict()
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+
+    def obter(self, chave, padrao=None):
+        agora = time.monotonic()
+        with self._lock:
+            item = self._dados.get(chave)
+            if item is None or item[0] <= agora:
+                if item is not None:
+                    del self._dados[chave]
+                self.falhas += 1
+                return padrao
+            self._dados.move_to_end(chave)
+            self.acertos += 1
+            return item[1]
+
+    def definir(self, chave, valor, ttl=None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._dados[chave] = (time.monotonic() + ttl, valor)
+            self._dados.move_to_end(chave)
+            while len(self._dados) > self.maximo:
+                self._dados.popitem(last=False)
+
+    def remover(self, chave):
+        with self._lock:
+            self._dados.pop(chave, None)
+
+    def limpar(self):
+        with self._lock:
+            self._dados.clear()
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                'entradas': len(self._dados),
+                'maximo': self.maximo,
+                'ttl': self.ttl,
+                'acertos': self.acertos,
+                'falhas': self.falhas
+            }
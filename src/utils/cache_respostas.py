@@ -0,0 +1,291 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import NamedTuple
+
+from flask import current_app, request
+
+from src.models.roteamento import escrita_recente
+from src.utils.cache import CacheLRU
+from src.utils.condicional import resposta_condicional
+
+
+class EntradaResposta(NamedTuple):
+    """Resposta já serializada, com os validadores e os dados de permissão"""
+    etag: str
+    ultima_modificacao: datetime
+    corpo: bytes
+    meta: dict
+
+
+class BackendMemoria:
+    """Entradas e gerações na memória do processo.
+
+    Com vários workers do gunicorn cada um tem suas gerações: uma escrita em
+    um worker só invalida o cache dele, e os outros podem servir a versão
+    anterior até o TTL. Para vários workers use BackendSQLite.
+    """
+
+    def __init__(self, maximo=2048, ttl=30):
+        self._entradas = CacheLRU(maximo=maximo, ttl=ttl)
+        self._geracoes = {}
+        self._lock = threading.Lock()
+
+    def obter(self, chave):
+        return self._entradas.obter(chave)
+
+    def definir(self, chave, entrada):
+        self._entradas.definir(chave, entrada)
+
+    def geracoes(self, nomes):
+        with self._lock:
+            return [self._geracoes.get(nome, 0) for nome in nomes]
+
+    def incrementar(self, nomes):
+        with self._lock:
+            for nome in nomes:
+                self._geracoes[nome] = self._geracoes.get(nome, 0) + 1
+
+    def estatisticas(self):
+        dados = self._entradas.estatisticas()
+        dados['backend'] = 'memoria'
+        return dados
+
+
+class BackendSQLite:
+    """Entradas e gerações num arquivo SQLite local, compartilhado pelos workers.
+
+    Uma escrita em qualquer worker incrementa a geração no arquivo, então
+    nenhum processo volta a usar as chaves antigas. O LRU é aproximado: o
+    horário de acesso só é atualizado se tiver mais de um segundo.
+    """
+
+    _DDL = (
+        "CREATE TABLE IF NOT EXISTS resposta ("
+        "chave TEXT PRIMARY KEY, valor BLOB NOT NULL, expira REAL NOT NULL, acesso REAL NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS ix_resposta_acesso ON resposta (acesso)",
+        "CREATE TABLE IF NOT EXISTS geracao (nome TEXT PRIMARY KEY, valor INTEGER NOT NULL)",
+    )
+
+    # Limpeza de expiradas e excedentes a cada N inserções
+    INTERVALO_LIMPEZA = 100
+
+    def __init__(self, caminho, maximo=10000, ttl=30):
+        self.caminho = caminho
+        self.maximo = maximo
+        self.ttl = ttl
+        self._local = threading.local()
+        self._insercoes = 0
+        self.acertos = 0
+        self.falhas = 0
+        conexao = self._conexao()
+        for ddl in self._DDL:
+            conexao.execute(ddl)
+
+    def _conexao(self):
+        # Uma conexão por thread e por processo (nunca herdada pelo fork)
+        conexao = getattr(self._local, 'conexao', None)
+        if conexao is None or self._local.pid != os.getpid():
+            conexao = sqlite3.connect(self.caminho, timeout=5, isolation_level=None)
+            conexao.execute('PRAGMA journal_mode=WAL')
+            # Perder o cache numa queda de energia é aceitável
+            conexao.execute('PRAGMA synchronous=OFF')
+            self._local.conexao = conexao
+            self._local.pid = os.getpid()
+        return conexao
+
+    @staticmethod
+    def _serializar(entrada):
+        cabecalho = json.dumps({
+            'etag': entrada.etag,
+            'ultima_modificacao': entrada.ultima_modificacao.isoformat() if entrada.ultima_modificacao else None,
+            'meta': entrada.meta,
+        }, separators=(',', ':')).encode('utf-8')
+        return cabecalho + b'\n' + entrada.corpo
+
+    @staticmethod
+    def _desserializar(valor):
+        cabecalho, corpo = bytes(valor).split(b'\n', 1)
+        dados = json.loads(cabecalho)
+        ultima_modificacao = dados['ultima_modificacao']
+        return EntradaResposta(
+            dados['etag'],
+            datetime.fromisoformat(ultima_modificacao) if ultima_modificacao else None,
+            corpo,
+            dados['meta'],
+        )
+
+    def obter(self, chave):
+        agora = time.time()
+        conexao = self._conexao()
+        linha = conexao.execute(
+            "SELECT valor FROM resposta WHERE chave = ? AND expira > ?", (chave, agora)
+        ).fetchone()
+        if linha is None:
+            self.falhas += 1
+            return None
+        self.acertos += 1
+        conexao.execute(
+            "UPDATE resposta SET acesso = ? WHERE chave = ? AND acesso < ?", (agora, chave, agora - 1)
+        )
+        return self._desserializar(linha[0])
+
+    def definir(self, chave, entrada):
+        agora = time.time()
+        conexao = self._conexao()
+        conexao.execute(
+            "INSERT OR REPLACE INTO resposta (chave, valor, expira, acesso) VALUES (?, ?, ?, ?)",
+            (chave, self._serializar(entrada), agora + self.ttl, agora)
+        )
+        self._insercoes += 1
+        if self._insercoes % self.INTERVALO_LIMPEZA == 0:
+            self._limpar(conexao, agora)
+
+    def _limpar(self, conexao, agora):
+        conexao.execute("DELETE FROM resposta WHERE expira <= ?", (agora,))
+        excesso = conexao.execute("SELECT COUNT(*) FROM resposta").fetchone()[0] - self.maximo
+        if excesso > 0:
+            conexao.execute(
+                "DELETE FROM resposta WHERE chave IN "
+                "(SELECT chave FROM resposta ORDER BY acesso LIMIT ?)", (excesso,)
+            )
+
+    def geracoes(self, nomes):
+        marcadores = ','.join('?' * len(nomes))
+        valores = dict(self._conexao().execute(
+            f"SELECT nome, valor FROM geracao WHERE nome IN ({marcadores})", list(nomes)
+        ).fetchall())
+        return [valores.get(nome, 0) for nome in nomes]
+
+    def incrementar(self, nomes):
+        self._conexao().executemany(
+            "INSERT INTO geracao (nome, valor) VALUES (?, 1) "
+            "ON CONFLICT(nome) DO UPDATE SET valor = valor + 1",
+            [(nome,) for nome in nomes]
+        )
+
+    def estatisticas(self):
+        entradas = self._conexao().execute("SELECT COUNT(*) FROM resposta").fetchone()[0]
+        return {
+            'backend': 'sqlite',
+            'entradas': entradas,
+            'maximo': self.maximo,
+            'ttl': self.ttl,
+            'acertos': self.acertos,
+            'falhas': self.falhas
+        }
+
+
+class CacheRespostas:
+    """Cache de respostas GET com invalidação por contadores de geração.
+
+    A chave inclui a geração atual de cada nome de que a resposta depende
+    ('pedidos', 'pedido:<id>', 'usuarios'). Uma escrita incrementa esses
+    contadores depois do commit e as chaves antigas simplesmente deixam de ser
+    consultadas; saem pelo LRU ou pelo TTL. Sem backend, nada é guardado e
+    as gerações ficam só na memória do processo (usadas nos ETags).
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend
+        self._geracoes = {}
+        self._lock = threading.Lock()
+
+    def geracoes(self, nomes):
+        """Geração atual de cada nome, para compor ETags que dependem deles"""
+        if self.backend is not None:
+            return self.backend.geracoes(nomes)
+        with self._lock:
+            return [self._geracoes.get(nome, 0) for nome in nomes]
+
+    def chave(self, rota, classe, argumentos, dependencias):
+        if self.backend is None:
+            return None
+        geracoes = self.backend.geracoes(dependencias)
+        partes = [rota, classe, json.dumps(argumentos, separators=(',', ':'), default=str)]
+        partes.extend(f'{nome}={valor}' for nome, valor in zip(dependencias, geracoes))
+        return '|'.join(partes)
+
+    def obter(self, chave):
+        return self.backend.obter(chave) if chave is not None else None
+
+    def definir(self, chave, entrada):
+        if chave is not None:
+            self.backend.definir(chave, entrada)
+
+    def invalidar(self, *nomes):
+        if not nomes:
+            return
+        if self.backend is not None:
+            self.backend.incrementar(nomes)
+            return
+        with self._lock:
+            for nome in nomes:
+                self._geracoes[nome] = self._geracoes.get(nome, 0) + 1
+
+    def estatisticas(self):
+        return self.backend.estatisticas() if self.backend is not None else None
+
+
+def criar_cache_respostas(tipo, caminho=None, maximo=2048, ttl=30):
+    """Cria o cache a partir da configuração: 'memoria', 'sqlite' ou 'desligado'"""
+    if tipo == 'desligado':
+        return CacheRespostas()
+    if tipo == 'sqlite':
+        if not caminho:
+            raise ValueError('CACHE_RESPOSTAS_CAMINHO é obrigatório com o backend sqlite')
+        return CacheRespostas(BackendSQLite(caminho, maximo=maximo, ttl=ttl))
+    if tipo == 'memoria':
+        return CacheRespostas(BackendMemoria(maximo=maximo, ttl=ttl))
+    raise ValueError(f'Backend de cache de respostas desconhecido: {tipo}')
+
+
+def cache_respostas():
+    """Cache de respostas da app atual"""
+    return current_app.extensions['cache_respostas']
+
+
+def argumentos_requisicao():
+    """Parâmetros da query string em ordem estável, para compor a chave"""
+    return sorted(request.args.items(multi=True))
+
+
+def resposta_com_cache(rota, classe, dependencias, montar, autorizar=None, colecao=False):
+    """Responde do cache ou de montar(), guardando o corpo serializado.
+
+    montar() retorna (etag, ultima_modificacao, gerar_corpo, meta) ou uma
+    resposta pronta (erro), que não é guardada. autorizar(meta), se informado,
+    roda também nos acertos e retorna uma resposta de erro ou None. Um acerto
+    responde sem nenhuma consulta ao banco; um cliente com o ETag atual
+    recebe 304 como antes. Logo após uma escrita do usuário a resposta é
+    sempre remontada do banco principal: uma entrada montada da réplica
+    atrasada não pode esconder dele a própria escrita. colecao segue para
+    resposta_condicional.
+    """
+    cache = cache_respostas()
+    chave = cache.chave(rota, classe, argumentos_requisicao(), dependencias)
+    entrada = None if escrita_recente() else cache.obter(chave)
+
+    if entrada is None:
+        montado = montar()
+        if not (isinstance(montado, tuple) and len(montado) == 4):
+            return montado
+        etag, ultima_modificacao, gerar_corpo, meta = montado
+        negado = autorizar(meta) if autorizar else None
+        if negado is not None:
+            return negado
+
+        def serializar():
+            corpo = current_app.json.dumps(gerar_corpo()).encode('utf-8') + b'\n'
+            cache.definir(chave, EntradaResposta(etag, ultima_modificacao, corpo, meta))
+            return corpo
+
+        return resposta_condicional(etag, ultima_modificacao, serializar, colecao)
+
+    negado = autorizar(entrada.meta) if autorizar else None
+    if negado is not None:
+        return negado
+    return resposta_condicional(entrada.etag, entrada.ultima_modificacao, lambda: entrada.corpo, colecao)
@@ -0,0 +1,141 @@
+import queue
+import threading
+import time
+
+from src.models.sqlite import transacao_imediata
+from src.utils.threads import ThreadPorProcesso
+
+
+class ErroCommitAgrupado(RuntimeError):
+    """O lote não pôde ser gravado, ou a gravação não terminou a tempo"""
+
+
+class Lote:
+    """Estado compartilhado pelas operações de um mesmo lote.
+
+    adiar(chave, funcao) agenda funcao(conn) para o fim do lote, antes do
+    commit; com a mesma chave, só a última agendada roda. Serve para juntar
+    vários UPDATEs da mesma linha (ex.: data_ultima_atualizacao de um pedido
+    muito comentado) em um só.
+    """
+
+    def __init__(self):
+        self._adiadas = {}
+
+    def adiar(self, chave, funcao):
+        self._adiadas.pop(chave, None)
+        self._adiadas[chave] = funcao
+
+    def executar_adiadas(self, conn):
+        for funcao in self._adiadas.values():
+            funcao(conn)
+
+
+# Estados de um item na fila: a requisição só desiste de um item PENDENTE;
+# depois de GRAVANDO o resultado dela é o do lote
+PENDENTE, GRAVANDO, CANCELADO = 'pendente', 'gravando', 'cancelado'
+
+
+class _Item:
+    __slots__ = ('operacao', 'estado', 'concluido', 'resultado', 'erro')
+
+    def __init__(self, operacao):
+        self.operacao = operacao
+        self.estado = PENDENTE
+        self.concluido = threading.Event()
+        self.resultado = None
+        self.erro = None
+
+
+class CommitAgrupado:
+    """Uma thread gravadora que junta as escritas de várias requisições em um commit.
+
+    Cada requisição enfileira operacao(conn, lote) e espera. A thread pega o
+    que estiver na fila, aguarda até `intervalo` segundos por mais itens (no
+    máximo `maximo`) e executa tudo em uma transação BEGIN IMMEDIATE, com um
+    único COMMIT, cada operação no próprio SAVEPOINT: uma operação que falha
+    devolve o erro só à sua requisição. Se o commit falhar, nada do lote é
+    gravado e todas as requisições recebem ErroCommitAgrupado.
+
+    Uma requisição que espera mais de `espera_maxima` segundos recebe
+    ErroCommitAgrupado só se a operação ainda não entrou em um lote; ela é
+    cancelada e nunca será gravada, então repetir a requisição é seguro. Se
+    o lote já começou, a requisição espera o resultado dele.
+    """
+
+    def __init__(self, engine, intervalo=0.005, maximo=200, espera_maxima=30):
+        self.engine = engine
+        self.intervalo = intervalo
+        self.maximo = maximo
+        self.espera_maxima = espera_maxima
+        self._fila = queue.Queue()
+        self._trava = threading.Lock()
+        self._gravador = ThreadPorProcesso(self._gravar_continuamente)
+        self.lotes = 0
+        self.operacoes = 0
+
+    def executar(self, operacao):
+        """Enfileira operacao(conn, lote), espera o commit e retorna seu resultado"""
+        self._gravador.iniciar()
+        item = _Item(operacao)
+        self._fila.put(item)
+        if not item.concluido.wait(self.espera_maxima):
+            with self._trava:
+                cancelado = item.estado == PENDENTE
+                if cancelado:
+                    item.estado = CANCELADO
+            if cancelado:
+                raise ErroCommitAgrupado('Tempo esgotado aguardando a gravação')
+            item.concluido.wait()
+        if item.erro is not None:
+            raise item.erro
+        return item.resultado
+
+    def _gravar_continuamente(self):
+        while True:
+            itens = [self._fila.get()]
+            limite = time.monotonic() + self.intervalo
+            while len(itens) < self.maximo:
+                restante = limite - time.monotonic()
+                try:
+                    itens.append(self._fila.get(timeout=restante) if restante > 0 else self._fila.get_nowait())
+                except queue.Empty:
+                    break
+            self._gravar(itens)
+
+    def _gravar(self, itens):
+        with self._trava:
+            itens = [item for item in itens if item.estado == PENDENTE]
+            for item in itens:
+                item.estado = GRAVANDO
+        if not itens:
+            return
+        lote = Lote()
+        try:
+            with transacao_imediata(self.engine) as conn:
+                for item in itens:
+                    conn.exec_driver_sql('SAVEPOINT operacao')
+                    try:
+                        item.resultado = item.operacao(conn, lote)
+                    except Exception as e:
+                        conn.exec_driver_sql('ROLLBACK TO operacao')
+                        item.erro = e
+                    conn.exec_driver_sql('RELEASE operacao')
+                lote.executar_adiadas(conn)
+        except Exception as e:
+            for item in itens:
+                if item.erro is None:
+                    item.resultado = None
+                    item.erro = ErroCommitAgrupado(f'Falha ao gravar o lote: {e}')
+        self.lotes += 1
+        self.operacoes += len(itens)
+        for item in itens:
+            item.concluido.set()
+
+    def estatisticas(self):
+        return {
+            'lotes': self.lotes,
+            'operacoes': self.operacoes,
+            'media_por_lote': round(self.operacoes / self.lotes, 2) if self.lotes else 0,
+            'pendentes': self._fila.qsize()
+        }
@@ -0,0 +1,59 @@
+import hashlib
+import json
+from datetime import timezone
+
+from flask import Response, jsonify, request
+
+from src.compressao import SUFIXO_ETAG_GZIP
+
+
+def calcular_etag(*partes):
+    """ETag forte derivado de valores baratos de consultar (ids, datas, contagens)"""
+    bruto = json.dumps(partes, default=str, separators=(',', ':'), sort_keys=True)
+    return hashlib.sha1(bruto.encode('utf-8')).hexdigest()
+
+
+def _cliente_atualizado(etag, ultima_modificacao, colecao):
+    # If-None-Match tem precedência sobre If-Modified-Since (RFC 9110, 13.2.2)
+    if request.if_none_match:
+        # O cliente pode ter guardado a variante comprimida pelo gzip da API
+        return (
+            request.if_none_match.contains(etag)
+            or request.if_none_match.contains(etag + SUFIXO_ETAG_GZIP)
+        )
+    # Numa coleção a maior data não muda quando um item sai (exclusão,
+    # arquivamento): só o ETag, que lista os itens, decide
+    if request.if_modified_since and ultima_modificacao and not colecao:
+        return request.if_modified_since >= _data_http(ultima_modificacao)
+    return False
+
+
+def _data_http(data):
+    # As datas são gravadas em UTC sem fuso; o cabeçalho HTTP tem resolução de segundos
+    return data.replace(tzinfo=timezone.utc, microsecond=0)
+
+
+def resposta_condicional(etag, ultima_modificacao, gerar_corpo, colecao=False):
+    """Responde 304 se o cliente já tem a versão atual; senão serializa gerar_corpo().
+
+    gerar_corpo só é chamado quando o conteúdo precisa ser enviado, então a
+    verificação de frescor custa apenas a consulta usada para montar o ETag.
+    gerar_corpo pode devolver JSON já serializado (bytes), vindo do cache.
+    Com colecao=True o Last-Modified é só informativo e If-Modified-Since
+    nunca produz 304.
+    """
+    if request.method in ('GET', 'HEAD') and _cliente_atualizado(etag, ultima_modificacao, colecao):
+        resposta = Response(status=304)
+    else:
+        corpo = gerar_corpo()
+        if isinstance(corpo, bytes):
+            resposta = Response(corpo, mimetype='application/json')
+        else:
+            resposta = jsonify(corpo)
+
+    resposta.set_etag(etag)
+    if ultima_modificacao:
+        resposta.last_modified = _data_http(ultima_modificacao)
+    # Dados autenticados: só o navegador do usuário pode guardar, sempre revalidando
+    resposta.headers['Cache-Control'] = 'private, no-cache'
+    return resposta
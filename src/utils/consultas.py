@@ -0,0 +1,48 @@
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from src.models.user import db
+
+
+class ContadorConsultas:
+    """Acumula as instruções SQL executadas enquanto o contador está ativo"""
+
+    def __init__(self):
+        self.instrucoes = []
+
+    @property
+    def total(self):
+        return len(self.instrucoes)
+
+    def _registrar(self, conn, cursor, statement, parameters, context, executemany):
+        self.instrucoes.append(statement)
+
+
+@contextmanager
+def contar_consultas(engine=None):
+    """Conta as consultas enviadas ao banco dentro do bloco (requer app context)"""
+    engine = engine or db.engine
+    contador = ContadorConsultas()
+    event.listen(engine, 'before_cursor_execute', contador._registrar)
+    try:
+        yield contador
+    finally:
+        event.remove(engine, 'before_cursor_execute', contador._registrar)
+
+
+@contextmanager
+def limite_consultas(maximo, engine=None):
+    """Falha com AssertionError se o bloco executar mais de `maximo` consultas.
+
+    Uso em testes:
+        with app.app_context(), limite_consultas(3):
+            client.get('/api/pedidos', headers=headers)
+    """
+    with contar_consultas(engine) as contador:
+        yield contador
+    if contador.total > maximo:
+        detalhes = '\n'.join(contador.instrucoes)
+        raise AssertionError(
+            f'{contador.total} consultas executadas (máximo {maximo}):\n{detalhes}'
+        )
@@ -0,0 +1,104 @@
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+
+
+class BarramentoEventos:
+    """Publish/subscribe em memória com buffer de replay limitado.
+
+    Todos os assinantes esperam na mesma Condition e leem do mesmo buffer
+    circular: não há fila por assinante, e publicar custa O(1) não importa
+    quantas conexões estejam abertas.
+
+    Os ids têm o formato "<instancia>:<sequencia>". A instância muda a cada
+    processo, então um Last-Event-ID vindo de outro worker (ou de antes de um
+    restart) é reconhecido como lacuna em vez de ser comparado às cegas.
+    """
+
+    def __init__(self, tamanho_replay=1000):
+        self.instancia = uuid.uuid4().hex[:8]
+        self._eventos = deque(maxlen=tamanho_replay)
+        self._sequencia = itertools.count(1)
+        self._ultima_sequencia = 0
+        self._condicao = threading.Condition()
+
+    def publicar(self, tipo, dados):
+        with self._condicao:
+            sequencia = next(self._sequencia)
+            self._eventos.append((sequencia, tipo, dados))
+            self._ultima_sequencia = sequencia
+            self._condicao.notify_all()
+        return f'{self.instancia}:{sequencia}'
+
+    def posicao_atual(self):
+        return self._ultima_sequencia
+
+    def interpretar_id(self, ultimo_id):
+        """Converte um Last-Event-ID em sequência local; None se não puder retomar"""
+        instancia, _, sequencia = (ultimo_id or '').partition(':')
+        if instancia != self.instancia or not sequencia.isdigit():
+            return None
+        return int(sequencia)
+
+    def retomavel(self, sequencia):
+        """Indica se todos os eventos após `sequencia` ainda estão no buffer"""
+        with self._condicao:
+            if not self._eventos:
+                return sequencia <= self._ultima_sequencia
+            return sequencia >= self._eventos[0][0] - 1
+
+    def aguardar(self, sequencia, timeout):
+        """Retorna os eventos posteriores a `sequencia`, esperando até `timeout` segundos"""
+        with self._condicao:
+            if self._ultima_sequencia <= sequencia:
+                self._condicao.wait(timeout)
+            return [
+                (f'{self.instancia}:{seq}', tipo, dados)
+                for seq, tipo, dados in self._eventos if seq > sequencia
+            ]
+
+
+barramento = BarramentoEventos(tamanho_replay=int(os.environ.get('SSE_REPLAY', '1000')))
+
+
+def _json_padrao(valor):
+    return valor.isoformat() if isinstance(valor, datetime) else str(valor)
+
+
+def formatar_sse(evento_id, tipo, dados):
+    return f'id: {evento_id}\nevent: {tipo}\ndata: {json.dumps(dados, default=_json_padrao)}\n\n'
+
+
+def fluxo_sse(ultimo_id, duracao_maxima, intervalo_heartbeat, filtro=None):
+    """Gerador de mensagens SSE a partir do barramento.
+
+    A conexão é encerrada após `duracao_maxima` segundos com uma dica de
+    `retry`; o navegador reconecta sozinho enviando Last-Event-ID. Assim um
+    worker síncrono não fica preso indefinidamente a um assinante ocioso.
+    """
+    sequencia = barramento.interpretar_id(ultimo_id) if ultimo_id else None
+    if sequencia is None or not barramento.retomavel(sequencia):
+        if ultimo_id:
+            # Eventos perdidos: o cliente deve recarregar a listagem
+            yield formatar_sse(f'{barramento.instancia}:{barramento.posicao_atual()}', 'reset', {})
+        sequencia = barramento.posicao_atual()
+
+    yield 'retry: 2000\n\n'
+    limite = time.monotonic() + duracao_maxima
+    while True:
+        restante = limite - time.monotonic()
+        if restante <= 0:
+            return
+        eventos = barramento.aguardar(sequencia, min(intervalo_heartbeat, restante))
+        if not eventos:
+            yield ': heartbeat\n\n'
+            continue
+        for evento_id, tipo, dados in eventos:
+            sequencia = int(evento_id.rpartition(':')[2])
+            if filtro is None or filtro(dados):
+                yield formatar_sse(evento_id, tipo, dados)
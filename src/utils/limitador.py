@@ -0,0 +1,68 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import g, jsonify, request
+
+
+class LimitadorTaxa:
+    """Token bucket em memória por chave (IP, nome de usuário...).
+
+    Cada chave acumula até `capacidade` fichas, repostas à razão de
+    `por_segundo`. O número de chaves é limitado para que uma varredura de
+    IPs não esgote a memória: as menos usadas são descartadas primeiro.
+    """
+
+    def __init__(self, capacidade, por_segundo, maximo_chaves=10000):
+        self.capacidade = capacidade
+        self.por_segundo = por_segundo
+        self.maximo_chaves = maximo_chaves
+        self._baldes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consumir(self, chave):
+        """Consome uma ficha; retorna 0 se permitido ou os segundos até a próxima ficha"""
+        agora = time.monotonic()
+        with self._lock:
+            fichas, ultimo = self._baldes.pop(chave, (self.capacidade, agora))
+            fichas = min(self.capacidade, fichas + (agora - ultimo) * self.por_segundo)
+            if fichas >= 1:
+                espera = 0
+                fichas -= 1
+            else:
+                espera = (1 - fichas) / self.por_segundo
+            self._baldes[chave] = (fichas, agora)
+            while len(self._baldes) > self.maximo_chaves:
+                self._baldes.popitem(last=False)
+        return espera
+
+
+def limitar_tentativas(limitador, autenticado=False):
+    """Decorator que aplica o limitador por IP e, se informado, por nome de usuário.
+
+    Com autenticado=True (rotas abaixo de token_required) a chave é só o id
+    do usuário do token: usuários atrás do mesmo NAT não dividem o balde, e
+    trocar de IP não renova as tentativas contra a mesma conta.
+    Atrás de proxy, configure ProxyFix para que remote_addr seja o IP do cliente.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            if autenticado:
+                chaves = [f'usuario_id:{g.usuario_id}']
+            else:
+                chaves = [f'ip:{request.remote_addr}']
+                data = request.get_json(silent=True)
+                if isinstance(data, dict) and data.get('username'):
+                    chaves.append(f"usuario:{str(data['username']).lower()}")
+
+            espera = max(limitador.consumir(chave) for chave in chaves)
+            if espera:
+                resposta = jsonify({'error': 'Muitas tentativas. Tente novamente mais tarde.'})
+                resposta.headers['Retry-After'] = str(int(espera) + 1)
+                return resposta, 429
+
+            return f(*args, **kwargs)
+        return decorated
+    return decorator
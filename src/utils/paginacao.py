@@ -0,0 +1,132 @@
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import tuple_
+
+LIMITE_PADRAO = 20
+LIMITE_MAXIMO = 100
+
+
+class CursorInvalido(ValueError):
+    """Cursor de paginação malformado ou adulterado"""
+
+
+def codificar_cursor(*valores):
+    """Gera um cursor opaco a partir dos valores da última linha da página"""
+    serializados = [v.isoformat() if isinstance(v, datetime) else v for v in valores]
+    bruto = json.dumps(serializados, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(bruto).decode('ascii').rstrip('=')
+
+
+def _ler_valores(cursor):
+    preenchimento = '=' * (-len(cursor) % 4)
+    return json.loads(base64.urlsafe_b64decode(cursor + preenchimento))
+
+
+def decodificar_cursor(cursor):
+    """Recupera (data, id) de um cursor gerado por codificar_cursor"""
+    try:
+        data, ident = _ler_valores(cursor)
+        return datetime.fromisoformat(data), int(ident)
+    except (ValueError, TypeError):
+        raise CursorInvalido('Cursor de paginação inválido')
+
+
+def decodificar_deslocamento(cursor):
+    """Recupera o deslocamento de um cursor de resultados ordenados por relevância"""
+    try:
+        (deslocamento,) = _ler_valores(cursor)
+        deslocamento = int(deslocamento)
+    except (ValueError, TypeError):
+        raise CursorInvalido('Cursor de paginação inválido')
+    if deslocamento < 0:
+        raise CursorInvalido('Cursor de paginação inválido')
+    return deslocamento
+
+
+def ler_limite(valor, padrao=LIMITE_PADRAO, maximo=LIMITE_MAXIMO):
+    """Converte o parâmetro ?limit= garantindo 1 <= limite <= maximo"""
+    if valor in (None, ''):
+        return padrao
+    try:
+        limite = int(valor)
+    except (TypeError, ValueError):
+        raise ValueError('Parâmetro limit deve ser um número inteiro')
+    return max(1, min(limite, maximo))
+
+
+def paginar_keyset(query, coluna_data, coluna_id, cursor, limite, crescente=False):
+    """Aplica paginação keyset em (coluna_data, coluna_id), decrescente por padrão.
+
+    Busca limite + 1 linhas para saber se existe próxima página sem COUNT.
+    Retorna (itens, proximo_cursor).
+    """
+    if cursor:
+        data, ident = decodificar_cursor(cursor)
+        # Comparação por row value: o SQLite percorre o índice a partir do cursor
+        chave = tuple_(coluna_data, coluna_id)
+        query = query.filter(chave > (data, ident) if crescente else chave < (data, ident))
+
+    if crescente:
+        query = query.order_by(coluna_data.asc(), coluna_id.asc())
+    else:
+        query = query.order_by(coluna_data.desc(), coluna_id.desc())
+    itens = query.limit(limite + 1).all()
+
+    proximo_cursor = None
+    if len(itens) > limite:
+        itens = itens[:limite]
+        ultimo = itens[-1]
+        proximo_cursor = codificar_cursor(
+            getattr(ultimo, coluna_data.key), getattr(ultimo, coluna_id.key)
+        )
+    return itens, proximo_cursor
+
+
+def paginar_keyset_ramos(consultas, coluna_data, coluna_id, cursor, limite, crescente=False):
+    """paginar_keyset sobre a união de consultas disjuntas.
+
+    Cada ramo busca no máximo limite + 1 linhas no próprio índice; as páginas
+    são intercaladas aqui pela mesma chave. Um ramo de outra tabela com
+    colunas de mesmo nome (ex.: pedido_arquivado) é passado como
+    (query, coluna_data, coluna_id). Retorna (itens, proximo_cursor).
+    """
+    ramos = [
+        ramo if isinstance(ramo, tuple) else (ramo, coluna_data, coluna_id)
+        for ramo in consultas
+    ]
+    if len(ramos) == 1:
+        return paginar_keyset(*ramos[0], cursor, limite, crescente)
+
+    itens = []
+    tem_mais = False
+    for query, data_ramo, id_ramo in ramos:
+        ramo, proximo = paginar_keyset(query, data_ramo, id_ramo, cursor, limite, crescente)
+        itens.extend(ramo)
+        tem_mais = tem_mais or proximo is not None
+
+    def chave(item):
+        return getattr(item, coluna_data.key), getattr(item, coluna_id.key)
+    itens.sort(key=chave, reverse=not crescente)
+
+    proximo_cursor = None
+    if tem_mais or len(itens) > limite:
+        itens = itens[:limite]
+        proximo_cursor = codificar_cursor(*chave(itens[-1]))
+    return itens, proximo_cursor
+
+
+def paginar_deslocamento(query, cursor, limite):
+    """Pagina uma consulta já ordenada (ex.: por bm25), onde keyset não se aplica.
+
+    Retorna (itens, proximo_cursor).
+    """
+    deslocamento = decodificar_deslocamento(cursor) if cursor else 0
+    itens = query.offset(deslocamento).limit(limite + 1).all()
+
+    proximo_cursor = None
+    if len(itens) > limite:
+        itens = itens[:limite]
+        proximo_cursor = codificar_cursor(deslocamento + limite)
+    return itens, proximo_cursor
@@ -0,0 +1,37 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+# Os KDFs de senha são caros de propósito. Rodá-los num pool próprio e pequeno
+# limita quantos núcleos uma rajada de logins consegue ocupar; quem não obtém
+# vaga dentro do tempo de espera recebe 503 em vez de segurar o worker.
+THREADS_HASH = int(os.environ.get('HASH_SENHA_THREADS', max(1, (os.cpu_count() or 2) // 2)))
+ESPERA_MAXIMA = float(os.environ.get('HASH_SENHA_ESPERA', '2.0'))
+
+_executor = ThreadPoolExecutor(max_workers=THREADS_HASH, thread_name_prefix='hash-senha')
+_vagas = threading.BoundedSemaphore(THREADS_HASH)
+
+
+class PoolSenhasOcupado(Exception):
+    """Nenhuma vaga no pool de hashing dentro do tempo de espera"""
+
+
+def _executar(funcao, *args):
+    if not _vagas.acquire(timeout=ESPERA_MAXIMA):
+        raise PoolSenhasOcupado('Servidor ocupado, tente novamente em instantes')
+    try:
+        return _executor.submit(funcao, *args).result()
+    finally:
+        _vagas.release()
+
+
+def gerar_hash_senha(senha):
+    """generate_password_hash executado no pool de hashing"""
+    return _executar(generate_password_hash, senha)
+
+
+def verificar_senha(password_hash, senha):
+    """check_password_hash executado no pool de hashing"""
+    return _executar(check_password_hash, password_hash, senha)
@@ -0,0 +1,24 @@
+import os
+import threading
+
+
+class ThreadPorProcesso:
+    """Uma thread daemon por processo, iniciada sob demanda.
+
+    iniciar() cria a thread na primeira chamada de cada processo, já no
+    worker: uma thread criada antes do fork do gunicorn não existe nos
+    filhos. As chamadas seguintes custam só a comparação do pid.
+    """
+
+    def __init__(self, alvo):
+        self._alvo = alvo
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def iniciar(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                threading.Thread(target=self._alvo, daemon=True).start()
@@ -0,0 +1,119 @@
+"""Escritores e leitores concorrentes contra um SQLite temporário.
+
+Vários processos (como workers do gunicorn), cada um com várias threads,
+alternam POST /api/pedidos e GET /api/pedidos no mesmo arquivo. Com o perfil
+de engine de src/config.py (WAL, busy_timeout) nenhuma requisição pode falhar
+com "database is locked" e todo pedido criado tem que estar no banco.
+Para medir vazão e latência: benchmarks/concorrencia_sqlite.py.
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from datetime import datetime, timedelta
+
+import jwt
+
+from src.comandos import inicializar_banco
+from src.main import create_app
+from src.models.pedido import Pedido
+from src.models.user import User, db
+from src.routes.auth import JWT_SECRET
+
+PROCESSOS = 3
+THREADS = 4
+OPERACOES = 20
+
+
+def _configuracao(diretorio):
+    return {
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(diretorio, 'app.db')}",
+        'CACHE_RESPOSTAS': 'desligado',
+    }
+
+
+def _worker(diretorio, cabecalhos, fila):
+    app = create_app(_configuracao(diretorio))
+    criados = []
+    erros = []
+    lock = threading.Lock()
+
+    def executar(indice):
+        client = app.test_client()
+        for i in range(OPERACOES):
+            if (indice + i) % 2 == 0:
+                resposta = client.post('/api/pedidos', headers=cabecalhos, json={
+                    'titulo': f'Pedido {os.getpid()}-{indice}-{i}',
+                    'descricao': 'Teste de concorrência',
+                    'nome_solicitante': 'Teste'
+                })
+            else:
+                resposta = client.get('/api/pedidos?limit=20', headers=cabecalhos)
+            with lock:
+                if resposta.status_code >= 400:
+                    dados = resposta.get_json(silent=True) or {}
+                    erros.append(f"{resposta.status_code}: {dados.get('error', resposta.get_data(as_text=True))}")
+                elif resposta.status_code == 201:
+                    criados.append(i)
+
+    trabalhadores = [threading.Thread(target=executar, args=(n,)) for n in range(THREADS)]
+    for t in trabalhadores:
+        t.start()
+    for t in trabalhadores:
+        t.join()
+    with app.app_context():
+        db.engine.dispose()
+    fila.put((len(criados), erros))
+
+
+class ConcorrenciaSQLiteTest(unittest.TestCase):
+
+    def setUp(self):
+        self.diretorio = tempfile.mkdtemp(prefix='pedidos-concorrencia-')
+        app = create_app(_configuracao(self.diretorio))
+        with app.app_context():
+            inicializar_banco()
+            admin = User(username='admin', email='admin@teste', password_hash='x', is_admin=True)
+            db.session.add(admin)
+            db.session.commit()
+            token = jwt.encode({
+                'user_id': admin.id,
+                'is_admin': True,
+                'exp': datetime.utcnow() + timedelta(hours=1)
+            }, JWT_SECRET, algorithm='HS256')
+            db.engine.dispose()
+        self.app = app
+        self.cabecalhos = {'Authorization': f'Bearer {token}'}
+
+    def tearDown(self):
+        shutil.rmtree(self.diretorio, ignore_errors=True)
+
+    def test_escritores_e_leitores_sem_database_locked(self):
+        contexto = multiprocessing.get_context('spawn')
+        fila = contexto.Queue()
+        processos = [
+            contexto.Process(target=_worker, args=(self.diretorio, self.cabecalhos, fila))
+            for _ in range(PROCESSOS)
+        ]
+        for p in processos:
+            p.start()
+        resultados = [fila.get(timeout=120) for _ in processos]
+        for p in processos:
+            p.join()
+
+        erros = [erro for _, lote in resultados for erro in lote]
+        self.assertEqual([e for e in erros if 'locked' in e], [])
+        self.assertEqual(erros, [])
+
+        # Metade das operações de cada thread é POST
+        esperados = PROCESSOS * THREADS * OPERACOES // 2
+        self.assertEqual(sum(criados for criados, _ in resultados), esperados)
+        with self.app.app_context():
+            self.assertEqual(db.session.query(Pedido).count(), esperados)
+            db.engine.dispose()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+"""Subida de um worker: create_app() e o import de src.main não tocam o banco.
+
+Schema e dados iniciais ficam em `flask init-db` / `flask migrar` / `flask
+seed`. Se create_app() voltar a rodar create_all, migrações ou consultas de
+seed, cada worker do gunicorn repete isso no boot e os testes abaixo falham.
+Para medir o tempo de import e da primeira requisição:
+benchmarks/inicializacao.py.
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool
+
+from src.main import create_app
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class InicializacaoTest(unittest.TestCase):
+
+    def setUp(self):
+        self.diretorio = tempfile.mkdtemp(prefix='pedidos-inicializacao-')
+        self.caminho = os.path.join(self.diretorio, 'app.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.diretorio, ignore_errors=True)
+
+    def test_create_app_nao_executa_sql(self):
+        instrucoes = []
+        conexoes = []
+
+        def registrar(conn, cursor, statement, parameters, context, executemany):
+            instrucoes.append(statement)
+
+        def conectar(dbapi_conn, registro):
+            conexoes.append(dbapi_conn)
+
+        event.listen(Engine, 'before_cursor_execute', registrar)
+        event.listen(Pool, 'connect', conectar)
+        try:
+            app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{self.caminho}'})
+        finally:
+            event.remove(Engine, 'before_cursor_execute', registrar)
+            event.remove(Pool, 'connect', conectar)
+
+        self.assertEqual(instrucoes, [])
+        self.assertEqual(conexoes, [])
+        self.assertFalse(os.path.exists(self.caminho))
+        # Os comandos de preparação continuam disponíveis
+        self.assertTrue({'init-db', 'migrar', 'seed'} <= set(app.cli.commands))
+
+    def test_import_a_frio_nao_cria_o_banco(self):
+        # Processo novo, como um worker recém-criado: o import monta `app`
+        ambiente = dict(os.environ, SQLALCHEMY_DATABASE_URI=f'sqlite:///{self.caminho}')
+        processo = subprocess.run(
+            [sys.executable, '-c', 'import src.main'],
+            cwd=RAIZ, env=ambiente, capture_output=True, text=True, timeout=60
+        )
+        self.assertEqual(processo.returncode, 0, processo.stderr)
+        self.assertFalse(os.path.exists(self.caminho))
+
+
+if __name__ == '__main__':
+    unittest.main()
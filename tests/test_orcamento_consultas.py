@@ -0,0 +1,145 @@
+"""Orçamento de consultas SQL por endpoint de pedidos.
+
+Cada endpoint roda pelo test client dentro de limite_consultas(N). N não
+depende do tamanho da página: um relacionamento carregado sob demanda
+(N+1) ou uma consulta a mais estoura o limite e o teste falha mostrando o
+SQL executado.
+
+    python -m unittest discover -s tests -t .   (ou python -m pytest tests)
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+import jwt
+
+from src.comandos import inicializar_banco
+from src.main import create_app
+from src.models.arquivo import arquivar_pedidos
+from src.models.pedido import Comentario, Pedido
+from src.models.user import User, db
+from src.routes.auth import JWT_SECRET
+from src.utils.consultas import limite_consultas
+
+PEDIDOS = 30
+COMENTARIOS_POR_PEDIDO = 3
+# Os últimos pedidos vão para o arquivo (pedido_arquivado)
+ARQUIVADOS = 6
+
+
+def _cabecalhos(usuario):
+    token = jwt.encode({
+        'user_id': usuario.id,
+        'is_admin': usuario.is_admin,
+        'exp': datetime.utcnow() + timedelta(hours=1)
+    }, JWT_SECRET, algorithm='HS256')
+    return {'Authorization': f'Bearer {token}'}
+
+
+class OrcamentoConsultasTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.diretorio = tempfile.mkdtemp(prefix='pedidos-testes-')
+        cls.app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(cls.diretorio, 'app.db')}",
+            'CACHE_RESPOSTAS': 'desligado',
+        })
+        cls.client = cls.app.test_client()
+
+        with cls.app.app_context():
+            inicializar_banco()
+            admin = User(username='admin', email='admin@teste', password_hash='x', is_admin=True)
+            comum = User(username='comum', email='comum@teste', password_hash='x')
+            db.session.add_all([admin, comum])
+            db.session.flush()
+            agora = datetime.utcnow()
+            for i in range(PEDIDOS):
+                arquivado = i >= PEDIDOS - ARQUIVADOS
+                pedido = Pedido(
+                    titulo=f'Oração pela família {i}',
+                    descricao='Pedido de oração pela saúde da família',
+                    nome_solicitante='Maria',
+                    status='Arquivado' if arquivado else 'Pendente',
+                    visibilidade=('Todos', 'Administradores', 'Criador')[i % 3],
+                    data_submissao=agora,
+                    data_ultima_atualizacao=agora - timedelta(days=400 if arquivado else 0, minutes=i),
+                    usuario_criador_id=(admin.id, comum.id)[i % 2]
+                )
+                db.session.add(pedido)
+                for j in range(COMENTARIOS_POR_PEDIDO):
+                    pedido.comentarios.append(Comentario(
+                        autor='Pastor', conteudo=f'Amém {j}', data_comentario=agora, usuario_id=admin.id
+                    ))
+            db.session.commit()
+            arquivar_pedidos(db.engine, agora - timedelta(days=365))
+            cls.admin = _cabecalhos(admin)
+            cls.comum = _cabecalhos(comum)
+
+        # Aquece os caches de token e de usuário: os orçamentos medem o
+        # estado estável, sem a consulta do usuário no primeiro acesso
+        for cabecalhos in (cls.admin, cls.comum):
+            cls.client.get('/api/auth/verify-token', headers=cabecalhos)
+
+    @classmethod
+    def tearDownClass(cls):
+        with cls.app.app_context():
+            db.engine.dispose()
+        shutil.rmtree(cls.diretorio, ignore_errors=True)
+
+    def _get(self, maximo, caminho, cabecalhos):
+        with self.app.app_context(), limite_consultas(maximo):
+            resposta = self.client.get(caminho, headers=cabecalhos)
+        self.assertEqual(resposta.status_code, 200, resposta.get_data(as_text=True))
+        return resposta.get_json()
+
+    def test_listagem_admin(self):
+        dados = self._get(3, '/api/pedidos?limit=20', self.admin)
+        self.assertEqual(len(dados['pedidos']), 20)
+
+    def test_listagem_usuario_comum(self):
+        # Um ramo por regra de visibilidade ('Todos' e os próprios pedidos)
+        dados = self._get(4, '/api/pedidos?limit=20', self.comum)
+        self.assertTrue(dados['pedidos'])
+
+    def test_listagem_pagina_seguinte(self):
+        primeira = self._get(3, '/api/pedidos?limit=10', self.admin)
+        self._get(3, f"/api/pedidos?limit=10&cursor={primeira['next_cursor']}", self.admin)
+
+    def test_listagem_com_arquivados(self):
+        # Chaves: um ramo por tabela. Grafo: pedidos e comentários de cada tabela
+        dados = self._get(6, '/api/pedidos?incluir_arquivados=1&limit=30', self.admin)
+        self.assertEqual(sum(1 for p in dados['pedidos'] if p.get('arquivado')), ARQUIVADOS)
+
+    def test_detalhe(self):
+        dados = self._get(3, '/api/pedidos/1', self.admin)
+        self.assertEqual(len(dados['comentarios']), COMENTARIOS_POR_PEDIDO)
+
+    def test_busca(self):
+        dados = self._get(3, '/api/pedidos/buscar?q=familia&limit=20', self.admin)
+        self.assertEqual(len(dados['pedidos']), 20)
+
+    def test_busca_projecao_usuario_comum(self):
+        # Sem termo: ramos de visibilidade intercalados por data_ultima_atualizacao,
+        # que fica fora de ?fields= mas é carregada com a página
+        dados = self._get(2, '/api/pedidos/buscar?fields=titulo&limit=20', self.comum)
+        self.assertTrue(dados['pedidos'])
+        self.assertNotIn('data_ultima_atualizacao', dados['pedidos'][0])
+
+    def test_busca_com_arquivados(self):
+        # Pedidos e comentários de cada tabela, mais a checagem do índice FTS5
+        dados = self._get(5, '/api/pedidos/buscar?q=familia&incluir_arquivados=1&limit=30', self.admin)
+        self.assertEqual(sum(1 for p in dados['pedidos'] if p.get('arquivado')), ARQUIVADOS)
+
+    def test_estatisticas(self):
+        self._get(3, '/api/pedidos/estatisticas', self.comum)
+
+    def test_comentarios(self):
+        dados = self._get(2, '/api/pedidos/1/comentarios', self.admin)
+        self.assertEqual(len(dados['comentarios']), COMENTARIOS_POR_PEDIDO)
+
+
+if __name__ == '__main__':
+    unittest.main()